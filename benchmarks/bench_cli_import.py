@@ -0,0 +1,56 @@
+"""Startup cost of the hot CLI path vs. the full typer app.
+
+Run from the repo root:
+
+    uv run python benchmarks/bench_cli_import.py [--runs 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def import_us(module: str) -> int:
+    """Cumulative `-X importtime` microseconds for importing `module`."""
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError(f"{module} not in importtime output")
+
+
+def wall_ms(argv: list[str], runs: int, env: dict[str, str]) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "amux", *argv], env=env, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=20)
+    args = ap.parse_args()
+
+    for module in ("amux.fastcli", "amux.cli"):
+        print(f"import {module:<14} {import_us(module) / 1000:7.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "XDG_STATE_HOME": tmp}
+        for argv in (["daemon", "where"], ["daemon", "status"], ["daemon", "where", "--help"]):
+            print(f"amux {' '.join(argv):<22} {wall_ms(argv, args.runs, env):7.1f} ms (best of {args.runs})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""End-to-end daemon numbers against the fake `tmux -C` (amux.faketmux).
+
+Run from the repo root:
+
+    uv run python benchmarks/bench_e2e.py [--panes 2000] [--output-rate 20000] [--duration 10]
+    uv run python benchmarks/bench_e2e.py --trace session.trace --speed 4
+
+Reports full-resync time, event-to-state latency (a `%window-add` written by
+the fake until its pane is in the daemon's pane map), daemon CPU per 1k
+control lines, and reconnect time after the fake disconnects.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from amux.runtime import DaemonRuntime
+from amux.tmux_async import AsyncTmuxControlClient
+from amux.tmux_target import TmuxTarget
+
+
+class MeasuredRuntime(DaemonRuntime):
+    def __init__(self, *a, **kw) -> None:
+        super().__init__(*a, **kw)
+        self.lines = 0
+        self.resyncs: list[float] = []  # monotonic time each full resync finished
+        self.resync_s: list[float] = []
+        self.disconnects: list[float] = []
+        self.window_seen: dict[str, float] = {}
+
+    def handle_event(self, raw: bytes) -> None:
+        self.lines += 1
+        super().handle_event(raw)
+
+    async def resync(self) -> None:
+        t0 = time.monotonic()
+        await super().resync()
+        now = time.monotonic()
+        self.resync_s.append(now - t0)
+        self.resyncs.append(now)
+        self._note_windows(now)
+        client = self.client
+        if client is not None:
+            asyncio.get_running_loop().create_task(self._note_close(client))
+
+    async def _note_close(self, client: AsyncTmuxControlClient) -> None:
+        await client.wait_closed()
+        self.disconnects.append(time.monotonic())
+
+    async def _refresh_dirty(self) -> None:
+        await super()._refresh_dirty()
+        self._note_windows(time.monotonic())
+
+    def _note_windows(self, now: float) -> None:
+        seen = self.window_seen
+        for pane in self.tracker.panes.values():
+            if pane.window and pane.window not in seen:
+                seen[pane.window] = now
+
+
+def _emitted_window_adds(log: Path) -> dict[str, float]:
+    out: dict[str, float] = {}
+    if not log.exists():
+        return out
+    for line in log.read_bytes().splitlines():
+        t, _, ev = line.partition(b"\t")
+        if ev.startswith(b"%window-add "):
+            out.setdefault(ev.split()[1].decode(), float(t))
+    return out
+
+
+def _pct(xs: list[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> MeasuredRuntime:
+    emit_log = tmp / "emit.log"
+    fake = [sys.executable, "-m", "amux.faketmux"]
+    if args.trace:
+        fake += ["replay", "--trace", str(args.trace), "--speed", str(args.speed), "--panes", str(args.panes)]
+    else:
+        fake += [
+            "synthetic",
+            "--panes", str(args.panes),
+            "--output-rate", str(args.output_rate),
+            "--burst", str(args.burst),
+            "--lifecycle-rate", str(args.lifecycle_rate),
+        ]
+    fake += ["--emit-log", str(emit_log), "--response-delay-ms", str(args.response_delay_ms)]
+    if args.disconnect_after:
+        fake += ["--exit-after", str(args.disconnect_after)]
+
+    rt = MeasuredRuntime(
+        TmuxTarget(socket_path=tmp / "fake.sock"),
+        tmp / "state.json",
+        client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=fake),
+    )
+    task = asyncio.create_task(rt.run())
+    await asyncio.sleep(args.duration)
+    rt.request_stop()
+    await task
+    return rt
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--panes", type=int, default=2000)
+    ap.add_argument("--output-rate", type=float, default=20_000.0)
+    ap.add_argument("--burst", type=int, default=200)
+    ap.add_argument("--lifecycle-rate", type=float, default=5.0)
+    ap.add_argument("--response-delay-ms", type=float, default=0.0)
+    ap.add_argument("--disconnect-after", type=float, default=4.0, help="0 = never")
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--trace", type=Path, help="replay this trace instead of synthetic load")
+    ap.add_argument("--speed", type=float, default=1.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="amux-e2e-") as d:
+        tmp = Path(d)
+        cpu0 = time.process_time()
+        rt = asyncio.run(_run(args, tmp))
+        cpu = time.process_time() - cpu0
+        emitted = _emitted_window_adds(tmp / "emit.log")
+
+    print(f"control lines handled   {rt.lines:,}")
+    print(f"daemon CPU              {cpu:.2f}s  ({cpu / max(rt.lines, 1) * 1e6:.1f} ms per 1k lines)")
+    if rt.resync_s:
+        print(f"full resync             {statistics.median(rt.resync_s) * 1000:.1f} ms median over {len(rt.resync_s)}")
+
+    # Window ids restart with each fake process; only score the first connection.
+    first_end = rt.disconnects[0] if rt.disconnects else float("inf")
+    lat = [rt.window_seen[w] - t for w, t in emitted.items() if w in rt.window_seen and rt.window_seen[w] >= t and t < first_end]
+    if lat:
+        print(
+            f"event->state latency    p50 {_pct(lat, 0.5) * 1000:.1f} ms  p99 {_pct(lat, 0.99) * 1000:.1f} ms"
+            f"  max {max(lat) * 1000:.1f} ms  (n={len(lat)})"
+        )
+    for gone in rt.disconnects:
+        back = next((t for t in rt.resyncs if t > gone), None)
+        if back is not None:
+            print(f"reconnect               {(back - gone) * 1000:.0f} ms (includes the 1 s first backoff)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Micro-benchmarks for the control-mode parsing and state hot paths.
+
+Run from the repo root:
+
+    uv run python benchmarks/bench_hotpaths.py                  # all cases
+    uv run python benchmarks/bench_hotpaths.py -k list_panes    # name filter
+    uv run python benchmarks/bench_hotpaths.py --save benchmarks/baseline.json
+    uv run python benchmarks/bench_hotpaths.py --compare benchmarks/baseline.json
+
+Each case reports ops/s (best of `--repeat` timed runs) and the peak bytes a
+single call allocates (tracemalloc). `--compare` prints the change against a
+saved baseline and exits 1 if any case got slower than `--threshold`.
+Baselines are machine-specific: regenerate one before comparing on a new box.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from amux.resync import parse_list_panes_payload
+from amux.state import AmuxState, DaemonStatus, load_state, save_state
+from amux.tmux import ControlLine, ResponseCollector, is_output_line, wait_for_response
+
+Case = Callable[[], object]
+CASES: dict[str, Callable[[], Case]] = {}
+
+
+def case(name: str) -> Callable[[Callable[[], Case]], Callable[[], Case]]:
+    """Register a setup function; it returns the callable that gets timed."""
+
+    def deco(setup: Callable[[], Case]) -> Callable[[], Case]:
+        CASES[name] = setup
+        return setup
+
+    return deco
+
+
+def _list_panes_payload(n: int) -> str:
+    cmds = ("zsh", "node", "claude", "python3", "vim")
+    return "".join(
+        f"%{i}\t{10_000 + i}\t{cmds[i % len(cmds)]}\t/home/dev/src/project-{i % 40}\t@{i // 4}\n"
+        for i in range(n)
+    )
+
+
+def _response_block(n_lines: int, cmd_id: int = 1) -> list[str]:
+    body = [f"%{i}\t{10_000 + i}\tzsh\t/home/dev/src\t@{i // 4}" for i in range(n_lines)]
+    return [f"%begin 1700000000 {cmd_id} 1", *body, f"%end 1700000000 {cmd_id} 1"]
+
+
+@case("control_line_parse")
+def _control_line_parse() -> Case:
+    lines = ["%begin 1700000000 17 1", "%5\t123\tzsh\t/tmp\t@1", "%end 1700000000 17 1",
+             "%window-add @3", "%error 1700000000 18 1", "%layout-change @1 b25d,80x24,0,0,2"]
+
+    def run() -> object:
+        for line in lines:
+            ControlLine.parse(line)
+        return None
+
+    run.ops_per_call = len(lines)  # type: ignore[attr-defined]
+    return run
+
+
+@case("is_output_line")
+def _is_output_line() -> Case:
+    lines = ["%output %5 hello\\015\\012", "%window-add @3", "%5\t1\tzsh\t/\t@1", "%output %7 x"]
+
+    def run() -> object:
+        for line in lines:
+            is_output_line(line)
+        return None
+
+    run.ops_per_call = len(lines)  # type: ignore[attr-defined]
+    return run
+
+
+@case("response_collector_feed_100")
+def _response_collector_feed() -> Case:
+    block = _response_block(98)
+    collector = ResponseCollector()
+
+    def run() -> object:
+        feed = collector.feed_line
+        for line in block:
+            resp = feed(line)
+        return resp
+
+    run.ops_per_call = len(block)  # type: ignore[attr-defined]
+    return run
+
+
+@case("wait_for_response_10")
+def _wait_for_response() -> Case:
+    block = _response_block(8)
+    collector = ResponseCollector()
+
+    def run() -> object:
+        it = iter(block)
+        return wait_for_response(collector, lambda: next(it, None), timeout_s=1.0, sleep=lambda _s: None)
+
+    return run
+
+
+def _parse_list_panes(n: int) -> Callable[[], Case]:
+    def setup() -> Case:
+        payload = _list_panes_payload(n)
+        return lambda: parse_list_panes_payload(payload)
+
+    return setup
+
+
+case("parse_list_panes_1k")(_parse_list_panes(1_000))
+case("parse_list_panes_10k")(_parse_list_panes(10_000))
+
+
+def _state(n: int) -> AmuxState:
+    st = AmuxState(daemon=DaemonStatus(pid=1, started_at=time.time(), tmux_state="connected"))
+    st.panes = parse_list_panes_payload(_list_panes_payload(n))
+    for i, pane in enumerate(st.panes.values()):
+        if i % 3 == 0:
+            pane.agent, pane.status = "claude", "busy"
+    st.watches = [{"id": f"w{i}", "pattern": f"error {i}"} for i in range(50)]
+    return st
+
+
+def _state_io(n: int, op: str) -> Callable[[], Case]:
+    def setup() -> Case:
+        path = Path(tempfile.mkdtemp(prefix="amux-bench-")) / "state.json"
+        st = _state(n)
+        save_state(path, st)
+        if op == "save":
+            return lambda: save_state(path, st)
+        return lambda: load_state(path)
+
+    return setup
+
+
+for _n, _label in ((1_000, "1k"), (5_000, "5k")):
+    case(f"save_state_{_label}")(_state_io(_n, "save"))
+    case(f"load_state_{_label}")(_state_io(_n, "load"))
+
+
+def measure(fn: Case, *, min_time: float, repeat: int) -> tuple[float, int]:
+    """(ops/s, peak bytes allocated by one call)."""
+
+    ops_per_call = getattr(fn, "ops_per_call", 1)
+    fn()  # warm up caches / lazy imports
+
+    # As timeit does: keep the cyclic GC from landing in random timed runs.
+    gc.collect()
+    gc.disable()
+    try:
+        # Pick a loop count that runs for about `min_time`.
+        loops = 1
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            elapsed = time.perf_counter() - t0
+            if elapsed >= min_time / 2 or loops >= 1 << 24:
+                break
+            loops *= 2
+
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return loops * ops_per_call / best, max(0, peak - before)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-k", dest="filter", default="", help="only cases whose name contains this")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds per timed run")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--save", type=Path, help="write results as a baseline JSON file")
+    ap.add_argument("--compare", type=Path, help="baseline JSON file to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else {}
+    results: dict[str, dict[str, float]] = {}
+    regressions = []
+
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        ops, alloc = measure(setup(), min_time=args.min_time, repeat=args.repeat)
+        results[name] = {"ops_per_s": round(ops, 1), "alloc_bytes": alloc}
+        line = f"{name:28s} {ops:>14,.0f} ops/s {alloc:>12,d} B/call"
+        base = baseline.get(name)
+        if base:
+            change = ops / base["ops_per_s"] - 1
+            line += f"   {change:+7.1%} vs baseline"
+            if change < -args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line, flush=True)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Throughput: per-line select+readline vs. the chunked control-stream reader.
+
+Run from the repo root:
+
+    uv run python benchmarks/bench_reader.py [--lines N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import selectors
+import threading
+import time
+
+from amux.linereader import ChunkedLineReader
+
+LINE = b"%output %5 \\033[32mRunning tests... 42/300 passed\\033[0m\\015\\012\n"
+
+
+def _writer(fd: int, n: int) -> threading.Thread:
+    def run() -> None:
+        batch = LINE * 256
+        left = n
+        with os.fdopen(fd, "wb", buffering=0) as f:
+            while left > 0:
+                k = min(256, left)
+                f.write(batch if k == 256 else LINE * k)
+                left -= k
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+def bench_readline(n: int) -> float:
+    """The pre-chunking `poll_line()`: one select + one text readline per line."""
+
+    r, w = os.pipe()
+    t = _writer(w, n)
+    f = os.fdopen(r, "r", buffering=1, encoding="utf-8")
+    sel = selectors.DefaultSelector()
+    sel.register(f, selectors.EVENT_READ)
+
+    got = 0
+    start = time.perf_counter()
+    while got < n:
+        if not sel.select(timeout=1.0):
+            continue
+        line = f.readline()
+        if not line:
+            break
+        line.rstrip("\n")
+        got += 1
+    elapsed = time.perf_counter() - start
+    sel.close()
+    f.close()
+    t.join()
+    return elapsed
+
+
+def bench_chunked(n: int) -> float:
+    r, w = os.pipe()
+    t = _writer(w, n)
+    os.set_blocking(r, False)
+    sel = selectors.DefaultSelector()
+    sel.register(r, selectors.EVENT_READ)
+    reader = ChunkedLineReader(r)
+
+    got = 0
+    start = time.perf_counter()
+    while got < n:
+        if not sel.select(timeout=1.0):
+            continue
+        lines = reader.read_lines()
+        if lines is None:
+            break
+        got += len(lines)
+    elapsed = time.perf_counter() - start
+    sel.close()
+    os.close(r)
+    t.join()
+    return elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--lines", type=int, default=500_000)
+    args = ap.parse_args()
+
+    for name, fn in (("select+readline", bench_readline), ("chunked", bench_chunked)):
+        elapsed = fn(args.lines)
+        print(f"{name:16s} {args.lines / elapsed:>12,.0f} lines/s  ({elapsed:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
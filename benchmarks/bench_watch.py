@@ -0,0 +1,87 @@
+"""Lines/s for the watch engine vs. running every rule on every line.
+
+Run from the repo root:
+
+    uv run python benchmarks/bench_watch.py [--rules 200] [--panes 300] [--lines 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from amux.watch import WatchEngine, WatchRule
+
+WORDS = "build test lint deploy agent task file module error warning step done ok".split()
+TEMPLATES = [
+    r"{w} FAILED",
+    r"(?i){w} error",
+    r"^\[{w}\] \d+ passed",
+    r"{w}: exit code [1-9]\d*",
+    r"Waiting for {w} input",
+    r"{w}-\w+ timed out",
+]
+
+
+def make_rules(n: int, rng: random.Random) -> list[WatchRule]:
+    rules = []
+    for i in range(n):
+        tmpl = TEMPLATES[i % len(TEMPLATES)]
+        rules.append(WatchRule(id=f"r{i}", pattern=tmpl.format(w=f"{rng.choice(WORDS)}{i}"), cooldown_s=0))
+    return rules
+
+
+def make_lines(n: int, rng: random.Random) -> list[bytes]:
+    out = []
+    for _ in range(n):
+        k = rng.randint(4, 14)
+        line = " ".join(rng.choice(WORDS) for _ in range(k))
+        if rng.random() < 0.3:
+            line = f"\x1b[3{rng.randint(1, 7)}m{line}\x1b[0m"
+        out.append(line.encode())
+    # A few real hits.
+    for i in range(0, n, 5000):
+        out[i] = b"test7 FAILED"
+    return out
+
+
+def bench_engine(rules: list[WatchRule], lines: list[bytes], panes: int) -> float:
+    eng = WatchEngine(rules)
+    start = time.perf_counter()
+    for i, line in enumerate(lines):
+        eng.feed(f"%{i % panes}", line + b"\n")
+    return time.perf_counter() - start
+
+
+def bench_naive(rules: list[WatchRule], lines: list[bytes]) -> float:
+    compiled = [re.compile(r.pattern) for r in rules]
+    start = time.perf_counter()
+    for line in lines:
+        text = line.decode()
+        for rx in compiled:
+            rx.search(text)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rules", type=int, default=200)
+    ap.add_argument("--panes", type=int, default=300)
+    ap.add_argument("--lines", type=int, default=200_000)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    rules = make_rules(args.rules, rng)
+    lines = make_lines(args.lines, rng)
+
+    naive_lines = lines[: max(1, args.lines // 10)]
+    elapsed = bench_naive(rules, naive_lines)
+    print(f"{'every rule/line':16s} {len(naive_lines) / elapsed:>12,.0f} lines/s")
+    elapsed = bench_engine(rules, lines, args.panes)
+    print(f"{'WatchEngine':16s} {len(lines) / elapsed:>12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
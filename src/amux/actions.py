@@ -0,0 +1,284 @@
+"""What a watch rule does when it matches, run off the control-stream loop.
+
+Actions are `send-keys` (through the daemon's control client), `shell` (a
+`/bin/sh -c` hook, killed on timeout) and `webhook` (a JSON POST to a loopback
+URL, on a small thread pool since urllib blocks). Every action is its own
+task; `ActionExecutor` caps how many run at once overall and per rule, and
+queues or drops the rest, so one slow hook delays only its own rule.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shlex
+import signal
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlsplit
+
+from .state import atomic_write_text
+
+KINDS = ("send-keys", "shell", "webhook")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+def actions_stats_path(state_path: Path) -> Path:
+    return state_path.with_name("actions.json")
+
+
+@dataclass(frozen=True, slots=True)
+class Action:
+    kind: str
+    command: str = ""  # shell
+    url: str = ""  # webhook
+    keys: tuple[str, ...] = ()  # send-keys, as tmux key names (`C-c`, `Enter`, ...)
+    timeout_s: float | None = None  # None: the executor's default
+
+    @staticmethod
+    def from_dict(d: dict[str, Any]) -> "Action":
+        kind = d.get("type")
+        timeout = d.get("timeout_s")
+        action = Action(
+            kind=str(kind),
+            command=str(d.get("command", "")),
+            url=str(d.get("url", "")),
+            keys=tuple(str(k) for k in d.get("keys", ())),
+            timeout_s=float(timeout) if timeout is not None else None,
+        )
+        if kind not in KINDS:
+            raise ValueError(f"unknown action type: {kind!r}")
+        if kind == "shell" and not action.command:
+            raise ValueError("shell action needs a command")
+        if kind == "send-keys" and not action.keys:
+            raise ValueError("send-keys action needs keys")
+        if kind == "webhook":
+            url = urlsplit(action.url)
+            # Hooks are for local tooling; the daemon does not call out to the network.
+            if url.scheme not in ("http", "https") or url.hostname not in LOOPBACK_HOSTS:
+                raise ValueError(f"webhook url must be http(s) on a loopback host: {action.url!r}")
+        return action
+
+
+@dataclass(frozen=True, slots=True)
+class ActionJob:
+    rule_id: str
+    pane_id: str
+    line: str
+    action: Action
+
+
+class ActionStats:
+    """Outcomes and latency for one (rule, action kind)."""
+
+    __slots__ = ("ok", "failed", "timeouts", "dropped", "total_s", "max_s", "last_error")
+
+    def __init__(self) -> None:
+        self.ok = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.dropped = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.last_error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        runs = self.ok + self.failed + self.timeouts
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "dropped": self.dropped,
+            "mean_s": round(self.total_s / runs, 6) if runs else None,
+            "max_s": round(self.max_s, 6),
+            "last_error": self.last_error,
+        }
+
+
+class ActionExecutor:
+    """At most `workers` actions at once, `per_rule` of them for any one rule."""
+
+    def __init__(
+        self,
+        *,
+        send_keys: Callable[[str, tuple[str, ...]], Awaitable[None]],
+        workers: int = 4,
+        per_rule: int = 1,
+        queue_size: int = 64,
+        policy: str = "queue",  # queue|drop, when `workers` or `per_rule` is saturated
+        timeout_s: float = 10.0,
+        on_done: Callable[[str, float | None], None] | None = None,
+    ) -> None:
+        self.send_keys = send_keys
+        self.workers = max(1, workers)
+        self.per_rule = max(1, per_rule)
+        self.queue_size = queue_size
+        self.policy = policy
+        self.timeout_s = timeout_s
+        self.on_done = on_done
+        self.stats: dict[tuple[str, str], ActionStats] = {}
+        self._running: dict[str, int] = {}
+        self._pending: dict[str, deque[ActionJob]] = {}  # rule_id -> jobs, FIFO
+        self._queued = 0
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._threads: ThreadPoolExecutor | None = None
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, job: ActionJob) -> bool:
+        """Start `job` now, queue it, or drop it (False) per `policy`."""
+
+        if self.running < self.workers and self._running.get(job.rule_id, 0) < self.per_rule:
+            self._start(job)
+            return True
+        if self.policy == "queue" and self._queued < self.queue_size:
+            self._pending.setdefault(job.rule_id, deque()).append(job)
+            self._queued += 1
+            return True
+        self._stat(job).dropped += 1
+        if self.on_done is not None:
+            self.on_done("dropped", None)
+        return False
+
+    def _start(self, job: ActionJob) -> None:
+        self._running[job.rule_id] = self._running.get(job.rule_id, 0) + 1
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._finished(t, job))
+
+    def _finished(self, task: asyncio.Task[None], job: ActionJob) -> None:
+        self._tasks.discard(task)
+        n = self._running.get(job.rule_id, 1) - 1
+        if n:
+            self._running[job.rule_id] = n
+        else:
+            self._running.pop(job.rule_id, None)
+        # Oldest-waiting rule first among those below their limit.
+        for rule_id in list(self._pending):
+            if self.running >= self.workers:
+                return
+            if self._running.get(rule_id, 0) >= self.per_rule:
+                continue
+            queue = self._pending[rule_id]
+            nxt = queue.popleft()
+            self._queued -= 1
+            if not queue:
+                del self._pending[rule_id]
+            else:
+                # Round-robin: a rule with a backlog goes behind the others.
+                self._pending[rule_id] = self._pending.pop(rule_id)
+            self._start(nxt)
+
+    async def _run(self, job: ActionJob) -> None:
+        stat = self._stat(job)
+        timeout = job.action.timeout_s if job.action.timeout_s is not None else self.timeout_s
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(self._execute(job, timeout), timeout=timeout)
+        except asyncio.TimeoutError:
+            stat.timeouts += 1
+            stat.last_error = f"timed out after {timeout:g}s"
+            result = "timeout"
+        except Exception as e:
+            stat.failed += 1
+            stat.last_error = str(e) or type(e).__name__
+            result = "failed"
+            print(f"amux: {job.action.kind} action for watch {job.rule_id} failed: {stat.last_error}", flush=True)
+        else:
+            stat.ok += 1
+            result = "ok"
+        elapsed = time.monotonic() - t0
+        stat.total_s += elapsed
+        stat.max_s = max(stat.max_s, elapsed)
+        if self.on_done is not None:
+            self.on_done(result, elapsed)
+
+    async def _execute(self, job: ActionJob, timeout: float) -> None:
+        action = job.action
+        if action.kind == "send-keys":
+            await self.send_keys(job.pane_id, action.keys)
+        elif action.kind == "shell":
+            await _run_shell(action.command, _hook_env(job))
+        else:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="amux-action")
+            body = json.dumps({"rule_id": job.rule_id, "pane_id": job.pane_id, "line": job.line}).encode()
+            loop = asyncio.get_running_loop()
+            # urllib's own timeout ends the thread too, not just our wait for it.
+            await loop.run_in_executor(self._threads, _post, action.url, body, timeout)
+
+    def _stat(self, job: ActionJob) -> ActionStats:
+        key = (job.rule_id, job.action.kind)
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = ActionStats()
+        return stat
+
+    async def stop(self, *, drain_s: float = 1.0) -> None:
+        """Drop what is queued, give running actions `drain_s`, then cancel them."""
+
+        self._pending.clear()
+        self._queued = 0
+        if self._tasks:
+            _done, pending = await asyncio.wait(set(self._tasks), timeout=drain_s)
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+
+    def report(self) -> dict[str, Any]:
+        by_rule: dict[str, dict[str, Any]] = {}
+        for (rule_id, kind), stat in sorted(self.stats.items()):
+            by_rule.setdefault(rule_id, {})[kind] = stat.to_dict()
+        return {"running": self.running, "queued": self._queued, "rules": by_rule}
+
+    def write_stats(self, path: Path) -> None:
+        atomic_write_text(path, json.dumps(self.report(), indent=2, sort_keys=True) + "\n")
+
+
+def send_keys_command(pane_id: str, keys: tuple[str, ...]) -> str:
+    return f"send-keys -t '{pane_id}' " + " ".join(shlex.quote(k) for k in keys)
+
+
+def _hook_env(job: ActionJob) -> dict[str, str]:
+    return {**os.environ, "AMUX_RULE_ID": job.rule_id, "AMUX_PANE_ID": job.pane_id, "AMUX_LINE": job.line}
+
+
+async def _run_shell(command: str, env: dict[str, str]) -> None:
+    proc = await asyncio.create_subprocess_shell(
+        command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+        start_new_session=True,
+    )
+    try:
+        _out, err = await proc.communicate()
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            # The whole process group: `sh -c` may have children of its own.
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+        raise
+    if proc.returncode:
+        raise RuntimeError(f"exit {proc.returncode}: {err.decode(errors='replace').strip()[-200:]}")
+
+
+def _post(url: str, body: bytes, timeout: float) -> None:
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Callable, Mapping
+
+from .procscan import ProcStat
+
+BUSY = "busy"
+WAITING = "waiting"  # an agent that went quiet: usually its turn is over
+IDLE = "idle"  # a quiet pane with no agent in it
+
+
+def _clock_ticks() -> int:
+    try:
+        return os.sysconf("SC_CLK_TCK")
+    except (AttributeError, ValueError, OSError):
+        return 100
+
+
+class ActivityTracker:
+    """busy / waiting / idle per pane, from cheap signals only.
+
+    A pane is active in a sample if it printed `%output` or its process tree
+    used more than `busy_cpu` of one core since the previous sample; it is
+    busy until it has been inactive for `quiet_s`. CPU comes from the same
+    `/proc` pass as agent detection: ticks are remembered per (pid,
+    starttime), so each sample costs one subtraction per process in a pane.
+    `sample()` returns only the panes whose status flipped.
+    """
+
+    def __init__(
+        self,
+        *,
+        busy_cpu: float = 0.05,
+        quiet_s: float = 5.0,
+        clock_ticks: int | None = None,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.busy_cpu = busy_cpu
+        self.quiet_s = quiet_s
+        self.clock_ticks = clock_ticks or _clock_ticks()
+        self.monotonic = monotonic
+        self.output_at: dict[str, float] = {}
+        self.status: dict[str, str] = {}
+        self._active_at: dict[str, float] = {}
+        self._ticks: dict[tuple[int, int], int] = {}
+        self._sampled_at: float | None = None
+
+    def note_output(self, pane_id: str) -> None:
+        self.output_at[pane_id] = self.monotonic()
+
+    def sample(
+        self,
+        procs: Mapping[int, ProcStat],
+        trees: Mapping[str, list[int]],
+        agents: Mapping[str, str | None],
+    ) -> dict[str, str]:
+        """Status for panes whose status changed since the last sample."""
+
+        now = self.monotonic()
+        elapsed = now - self._sampled_at if self._sampled_at is not None else 0.0
+        budget = self.busy_cpu * self.clock_ticks * elapsed
+        prev_ticks = self._ticks
+        ticks: dict[tuple[int, int], int] = {}
+        changed: dict[str, str] = {}
+        for pane_id, tree in trees.items():
+            known = pane_id in self.status
+            used = 0
+            for pid in tree:
+                st = procs[pid]
+                key = (pid, st.starttime)
+                ticks[key] = st.cpu_ticks
+                before = prev_ticks.get(key)
+                if before is not None:
+                    used += st.cpu_ticks - before
+                elif known:
+                    used += st.cpu_ticks  # started since the last sample
+            active_at = self._active_at.get(pane_id)
+            out_at = self.output_at.get(pane_id)
+            if out_at is not None and (active_at is None or out_at > active_at):
+                active_at = out_at
+            # A pane seen for the first time has no CPU baseline yet.
+            if known and elapsed > 0 and used > budget:
+                active_at = now
+            if active_at is not None:
+                self._active_at[pane_id] = active_at
+
+            if active_at is not None and now - active_at < self.quiet_s:
+                status = BUSY
+            else:
+                status = WAITING if agents.get(pane_id) else IDLE
+            if self.status.get(pane_id) != status:
+                self.status[pane_id] = status
+                changed[pane_id] = status
+
+        self._ticks = ticks
+        self._sampled_at = now
+        for gone in [p for p in self.status if p not in trees]:
+            self.discard(gone)
+        return changed
+
+    def discard(self, pane_id: str) -> None:
+        self.status.pop(pane_id, None)
+        self.output_at.pop(pane_id, None)
+        self._active_at.pop(pane_id, None)
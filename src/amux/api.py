@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from .snapshot import snapshot_reply
+from .state import pane_json
+from .statusline import ALL
+from .tmux import TmuxTimeoutError
+
+if TYPE_CHECKING:
+    from .runtime import DaemonRuntime
+
+# Newline-delimited JSON over a Unix socket in the per-server state dir.
+#
+#   request:  {"id": 7, "ops": [{"op": "status"}, {"op": "pane", "pane_id": "%1"}]}
+#   response: {"id": 7, "results": [{"ok": true, "result": {...}}, {"ok": false, "error": "..."}]}
+#
+# A connection may send any number of requests; each gets one response line,
+# in order. Ops are answered from the daemon's memory and never wait on tmux,
+# except `snapshot`, which runs one `capture-pane` when the pane has changed.
+MAX_REQUEST_BYTES = 1024 * 1024
+# With `output.subscribe = "auto"`, tmux only sends output for panes someone
+# wants; a client tailing other panes subscribes and renews before this runs out.
+DEFAULT_SUBSCRIBE_TTL_S = 300.0
+
+Handler = Callable[[dict[str, Any]], Any]
+
+
+class ApiError(Exception):
+    """An op failed; the message is sent back to the client."""
+
+
+class JsonLineServer:
+    """Newline-delimited JSON batches over a Unix socket, dispatched to `handlers`."""
+
+    def __init__(self, path: Path, handlers: dict[str, Handler]) -> None:
+        self.path = path
+        self.handlers = handlers
+        self.requests = 0
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A previous daemon that died without cleaning up leaves its socket behind.
+        self.path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._serve, path=str(self.path), limit=MAX_REQUEST_BYTES)
+        os.chmod(self.path, 0o600)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.path.unlink(missing_ok=True)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError:
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(b'{"error":"request too large"}\n')
+                    return
+                resp = self.handle_line(line)
+                writer.write(resp if isinstance(resp, bytes) else await resp)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def handle_line(self, line: bytes) -> bytes | Awaitable[bytes]:
+        """Answer one request line; always returns one response line.
+
+        Returns an awaitable instead when an op has an `async` handler, so
+        requests made only of in-memory ops never touch the event loop.
+        """
+
+        self.requests += 1
+        try:
+            req = json.loads(line)
+            ops = req["ops"]
+            if not isinstance(ops, list):
+                raise TypeError("ops must be a list")
+        except (ValueError, KeyError, TypeError) as e:
+            return _dump({"error": f"bad request: {e}"})
+        results = [self.call(op) for op in ops]
+        if any(inspect.isawaitable(r) for r in results):
+            return self._gather(req.get("id"), results)
+        return _dump({"id": req.get("id"), "results": results})
+
+    async def _gather(self, req_id: Any, results: list[Any]) -> bytes:
+        return _dump({"id": req_id, "results": [await r if inspect.isawaitable(r) else r for r in results]})
+
+    async def _call_async(self, name: str, result: Awaitable[Any]) -> dict[str, Any]:
+        try:
+            return {"ok": True, "result": await result}
+        except ApiError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            return _internal_error(name, e)
+
+    def call(self, op: Any) -> dict[str, Any] | Awaitable[dict[str, Any]]:
+        if not isinstance(op, dict):
+            return {"ok": False, "error": "op must be an object"}
+        name = op.get("op")
+        if not isinstance(name, str):
+            return {"ok": False, "error": "op must be a string"}
+        handler = self.handlers.get(name)
+        if handler is None:
+            return {"ok": False, "error": f"unknown op: {name!r}"}
+        try:
+            result = handler(op)
+        except ApiError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            return _internal_error(name, e)
+        if inspect.isawaitable(result):
+            return self._call_async(name, result)
+        return {"ok": True, "result": result}
+
+
+class ApiServer(JsonLineServer):
+    """Serves the M5 JSON API for one `DaemonRuntime`."""
+
+    def __init__(self, runtime: "DaemonRuntime", path: Path) -> None:
+        self.runtime = runtime
+        super().__init__(path, {
+            "ping": lambda _args: "pong",
+            "status": self._status,
+            "panes": self._panes,
+            "pane": self._pane,
+            "tail": self._tail,
+            "snapshot": self._snapshot,
+            "watches": lambda _args: runtime.store.state.watches,
+            "groups": lambda _args: runtime.store.state.groups,
+            "status_line": self._status_line,
+            "throttled": lambda _args: runtime.flow.throttled(),
+            "actions": lambda _args: runtime.actions.report(),
+            "notifications": lambda _args: runtime.notifier.report() if runtime.notifier else {"backend": None},
+            "subscribe": self._subscribe,
+            "unsubscribe": self._unsubscribe,
+            "subscriptions": lambda _args: runtime.subs.report(),
+            "stats": self._stats,
+            "profile": self._profile,
+            "stop": self._stop,
+        })
+
+    def _stop(self, _args: dict[str, Any]) -> dict[str, Any]:
+        # Stops this server's daemon only; under a supervisor the others keep running.
+        self.runtime.request_stop()
+        return {"stopping": True}
+
+    def _status(self, _args: dict[str, Any]) -> dict[str, Any]:
+        rt = self.runtime
+        st = rt.store.state
+        return {
+            "running": True,
+            "pid": st.daemon.pid if st.daemon else os.getpid(),
+            "tmux_socket": str(rt.target.socket_path),
+            "server_id": rt.target.server_id,
+            "tmux_state": st.daemon.tmux_state if st.daemon else "unknown",
+            "last_resync_at": st.daemon.last_resync_at if st.daemon else None,
+            "state_path": str(rt.state_path),
+            "panes": len(st.panes),
+            "throttled": len(rt.flow.paused),
+        }
+
+    def _stats(self, _args: dict[str, Any]) -> dict[str, Any]:
+        rt = self.runtime
+        st = rt.store.state
+        uptime = time.time() - st.daemon.started_at if st.daemon else None
+        stats = rt.metrics.snapshot()
+        lines = stats["control_lines_total"]
+        return {
+            "uptime_s": round(uptime, 3) if uptime is not None else None,
+            # Averages since start; Prometheus' rate() over amux.prom gives recent ones.
+            "control_lines_per_s": {
+                kind: round(n / uptime, 3) for kind, n in lines.items()
+            } if uptime else {},
+            "state_writes": rt.store.writes,
+            "state_compactions": rt.store.compactions,
+            "api_requests": self.requests,
+            **stats,
+        }
+
+    def _profile(self, args: dict[str, Any]) -> dict[str, Any]:
+        enable = args.get("enable")
+        if enable is not None:
+            if not isinstance(enable, bool):
+                raise ApiError("enable must be true or false")
+            self.runtime.set_profiling(enable)
+        return self.runtime.profiler.status()
+
+    def _status_line(self, args: dict[str, Any]) -> str:
+        window = args.get("window") or ALL
+        if not isinstance(window, str):
+            raise ApiError("window must be a window id")
+        cache = self.runtime.status_line
+        if cache is None:
+            return ""
+        return cache.segments.get(window, "")
+
+    def _panes(self, _args: dict[str, Any]) -> dict[str, Any]:
+        return {pid: pane_json(p) for pid, p in self.runtime.store.state.panes.items()}
+
+    def _pane_id(self, args: dict[str, Any]) -> str:
+        pane_id = args.get("pane_id")
+        if not isinstance(pane_id, str) or pane_id not in self.runtime.store.state.panes:
+            raise ApiError(f"no such pane: {pane_id!r}")
+        return pane_id
+
+    def _pane(self, args: dict[str, Any]) -> dict[str, Any]:
+        return pane_json(self.runtime.store.state.panes[self._pane_id(args)])
+
+    def _tail(self, args: dict[str, Any]) -> str:
+        pane_id = self._pane_id(args)
+        n = args.get("bytes")
+        return self.runtime.pane_tail(pane_id, n if isinstance(n, int) else None).decode("utf-8", errors="replace")
+
+    async def _snapshot(self, args: dict[str, Any]) -> dict[str, Any]:
+        pane_id = self._pane_id(args)
+        since = args.get("since")
+        if since is not None and (not isinstance(since, int) or isinstance(since, bool)):
+            raise ApiError("since must be a version number")
+        try:
+            snap = await self.runtime.pane_snapshot(pane_id)
+        except (RuntimeError, TmuxTimeoutError) as e:
+            raise ApiError(str(e)) from None
+        return snapshot_reply(snap, since)
+
+    def _subscribe(self, args: dict[str, Any]) -> dict[str, Any]:
+        panes = self._pane_list(args)
+        ttl_s = args.get("ttl_s", DEFAULT_SUBSCRIBE_TTL_S)
+        if not isinstance(ttl_s, (int, float)) or isinstance(ttl_s, bool) or ttl_s <= 0:
+            raise ApiError("ttl_s must be a positive number")
+        self.runtime.subscribe_output(panes, float(ttl_s))
+        return {"panes": panes, "ttl_s": ttl_s}
+
+    def _unsubscribe(self, args: dict[str, Any]) -> dict[str, Any]:
+        panes = self._pane_list(args)
+        self.runtime.unsubscribe_output(panes)
+        return {"panes": panes}
+
+    def _pane_list(self, args: dict[str, Any]) -> list[str]:
+        panes = args.get("panes")
+        if not isinstance(panes, list) or not all(isinstance(p, str) for p in panes):
+            raise ApiError("panes must be a list of pane ids")
+        known = self.runtime.store.state.panes
+        missing = [p for p in panes if p not in known]
+        if missing:
+            raise ApiError(f"no such pane: {missing[0]!r}")
+        return panes
+
+
+def _internal_error(name: str, e: Exception) -> dict[str, Any]:
+    # A bug in one op fails that op, not the whole request or the connection.
+    print(f"amux: api op {name!r} failed: {type(e).__name__}: {e}", flush=True)
+    return {"ok": False, "error": f"internal error in {name}: {type(e).__name__}"}
+
+
+def _dump(obj: Any) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
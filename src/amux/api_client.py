@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+import socket
+from pathlib import Path
+from typing import Any
+
+# Kept free of asyncio/typer/rich imports: this runs in short-lived CLI calls.
+
+
+class ApiCallError(RuntimeError):
+    """The daemon answered, but the op failed."""
+
+
+def api_request(path: Path, ops: list[dict[str, Any]], *, timeout_s: float = 1.0) -> list[dict[str, Any]]:
+    """Send one batch of ops; returns the per-op `{"ok", "result"|"error"}` dicts.
+
+    Raises OSError when no daemon is listening on `path`.
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout_s)
+        s.connect(str(path))
+        s.sendall(json.dumps({"id": 1, "ops": ops}, separators=(",", ":")).encode("utf-8") + b"\n")
+        buf = bytearray()
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    resp = json.loads(buf)
+    if "results" not in resp:
+        raise ApiCallError(resp.get("error", "bad response"))
+    return resp["results"]
+
+
+def api_call(path: Path, op: str, *, timeout_s: float = 1.0, **args: Any) -> Any:
+    """Run a single op and return its result."""
+
+    (res,) = api_request(path, [{"op": op, **args}], timeout_s=timeout_s)
+    if not res.get("ok"):
+        raise ApiCallError(res.get("error", "unknown error"))
+    return res["result"]
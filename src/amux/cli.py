@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from pathlib import Path
+
 import typer
 from rich import print
 
@@ -16,5 +18,52 @@ def version() -> None:
     print(__version__)
 
 
+@app.command("status-line")
+def status_line(
+    window: str | None = typer.Option(None, "--window", help="Window id (e.g. @3); default: whole server"),
+    tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
+) -> None:
+    """Print the cached agent status segment, for tmux `status-right`."""
+
+    from .fastcli import status_line as render
+    from .tmux_target import TmuxTarget, default_tmux_socket
+
+    target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
+    typer.echo(render(target, window))
+
+
+@app.command("logs")
+def logs(
+    pane_id: str = typer.Argument(..., help="Pane id, e.g. %5"),
+    since: str | None = typer.Option(None, "--since", help="Only output from the last 30s / 10m / 2h / 1d"),
+    tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
+) -> None:
+    """Print what a pane printed, from the daemon's pane logs (logs.enabled in config.toml)."""
+
+    import sys
+    import time
+
+    from .fastcli import state_paths
+    from .panelog import log_dir, pane_dir, parse_duration, read_since
+    from .tmux_target import TmuxTarget, default_tmux_socket
+
+    target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
+    root = log_dir(state_paths(target)[0])
+    if not pane_dir(root, pane_id).is_dir():
+        print(f"no logs for {pane_id} in {root}")
+        raise typer.Exit(1)
+    try:
+        start = time.time() - parse_duration(since) if since is not None else None
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--since") from None
+    out = sys.stdout.buffer
+    try:
+        for chunk in read_since(root, pane_id, start):
+            out.write(chunk)
+        out.flush()
+    except BrokenPipeError:
+        pass  # `amux logs %5 | head`
+
+
 def main() -> None:
     app()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import tomllib
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any
+
+from .paths import amux_config_path
+
+
+class ConfigError(ValueError):
+    """Raised for unknown keys or wrongly-typed values in config.toml."""
+
+
+@dataclass
+class OutputConfig:
+    # Per-pane `%output` ring buffer, and the cap across all panes.
+    buffer_bytes: int = 64 * 1024
+    total_bytes: int = 32 * 1024 * 1024
+    # auto: tmux 3.2+ only sends output for panes a watch rule or an API
+    # subscriber wants (`refresh-client -A`); all: every pane, as before.
+    subscribe: str = "auto"  # auto|all
+
+
+@dataclass
+class ResyncConfig:
+    # Full `list-panes -a` while connected, as a safety net for changes tmux
+    # does not report to us. 0 disables it (resync on reconnect only).
+    reconcile_interval_s: float = 60.0
+
+
+@dataclass
+class FlowConfig:
+    # tmux 3.2+: pause a pane's output once it is this many seconds behind. 0 = off.
+    pause_after_s: int = 2
+    # A paused pane waits at least this long, doubling while it keeps flooding.
+    min_hold_s: float = 0.5
+    max_hold_s: float = 30.0
+    resumes_per_s: float = 10.0
+
+
+@dataclass
+class StateConfig:
+    # Coalesce state changes into at most one state.json write per window.
+    write_debounce_ms: int = 200
+    fsync: str = "interval"  # always|interval|never
+    fsync_interval_s: float = 5.0
+    # Append changes to state.journal and fold them into state.json every N records.
+    journal: bool = True
+    compact_every: int = 1000
+    history_generations: int = 1  # old journals kept as state.journal.1, .2, ...
+
+
+@dataclass
+class StatusLineConfig:
+    # Keep a rendered per-status pane count ("3 busy / 2 waiting") for status-right.
+    enabled: bool = True
+    separator: str = " / "
+    # Also set @amux_status (global) and @amux_window_status (per window) in tmux.
+    tmux_option: bool = False
+
+
+@dataclass
+class MetricsConfig:
+    # Rewrite amux.prom (Prometheus text format) in the state dir this often. 0 = never.
+    textfile_interval_s: float = 15.0
+    # Event-loop lag probe: how late a timer of this period fires.
+    loop_lag_interval_s: float = 1.0
+
+
+@dataclass
+class ProfileConfig:
+    # `amux daemon run --profile`, SIGUSR2 or the `profile` API op turn it on.
+    interval_ms: float = 10.0  # one stack sample per this much daemon CPU time
+    window_s: float = 60.0  # one dump per window in <state dir>/profiles/
+    keep: int = 20
+    tracemalloc_frames: int = 1  # 0 = no allocation tracking
+
+
+@dataclass
+class AgentsConfig:
+    # Find agents by scanning each pane's process tree in /proc (Linux).
+    enabled: bool = True
+    scan_interval_s: float = 2.0
+    # Set each pane's status (busy|waiting|idle) from its %output and the CPU
+    # its process tree uses; busy until quiet for quiet_s.
+    status: bool = True
+    busy_cpu_percent: float = 5.0
+    quiet_s: float = 5.0
+    # name = regex over the space-joined argv; merged over the built-in
+    # signatures, "" switches one off.
+    signatures: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class NotifyConfig:
+    # auto: terminal-notifier, notify-send or osascript, whichever is installed;
+    # file: JSON lines to `file` (stdout if empty); none: off.
+    backend: str = "auto"
+    file: str = ""
+    watch_matches: bool = True
+    agent_finished: bool = True  # an agent pane went from busy to waiting
+    # Same rule or group within coalesce_s: one summary notification.
+    coalesce_s: float = 3.0
+    workers: int = 2
+    queue_size: int = 64
+    timeout_s: float = 5.0
+
+
+@dataclass
+class ActionsConfig:
+    # Watch rule actions (send-keys, shell hooks, local webhooks).
+    workers: int = 4  # actions running at once
+    per_rule: int = 1  # ... of which for any one rule
+    policy: str = "queue"  # queue|drop when either limit is reached
+    queue_size: int = 64
+    timeout_s: float = 10.0  # default; an action may set its own timeout_s
+
+
+@dataclass
+class LogsConfig:
+    # Keep what panes print under <state dir>/logs/ for `amux logs`. Needs every
+    # pane's output, so it implies output.subscribe = "all".
+    enabled: bool = False
+    segment_bytes: int = 1024 * 1024  # roll a pane's segment at this size ...
+    segment_s: float = 3600.0  # ... or age
+    index_bytes: int = 64 * 1024  # one time index point per this much output ...
+    index_interval_s: float = 10.0  # ... or this often
+    compression: str = "gzip"  # gzip|lzma, applied on roll
+    total_bytes: int = 512 * 1024 * 1024  # across all panes; oldest segments go first
+    max_age_s: float = 7 * 86400.0
+
+
+@dataclass
+class SupervisorConfig:
+    # `amux daemon supervise --discover`: rescan /tmp/tmux-<uid>/ this often.
+    discover_interval_s: float = 30.0
+
+
+@dataclass
+class AmuxConfig:
+    output: OutputConfig = field(default_factory=OutputConfig)
+    resync: ResyncConfig = field(default_factory=ResyncConfig)
+    flow: FlowConfig = field(default_factory=FlowConfig)
+    state: StateConfig = field(default_factory=StateConfig)
+    status_line: StatusLineConfig = field(default_factory=StatusLineConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    profile: ProfileConfig = field(default_factory=ProfileConfig)
+    supervisor: SupervisorConfig = field(default_factory=SupervisorConfig)
+    agents: AgentsConfig = field(default_factory=AgentsConfig)
+    notify: NotifyConfig = field(default_factory=NotifyConfig)
+    actions: ActionsConfig = field(default_factory=ActionsConfig)
+    logs: LogsConfig = field(default_factory=LogsConfig)
+
+
+# Keys that are divided by, slept on or sized from, where 0 or less cannot work.
+_POSITIVE = {
+    "output.buffer_bytes",
+    "output.total_bytes",
+    "flow.min_hold_s",
+    "flow.max_hold_s",
+    "flow.resumes_per_s",
+    "state.compact_every",
+    "profile.interval_ms",
+    "agents.scan_interval_s",
+    "logs.segment_bytes",
+    "logs.index_bytes",
+}
+
+
+def _apply(section: object, table: dict[str, Any], where: str) -> None:
+    known = {f.name: f for f in fields(section)}  # type: ignore[arg-type]
+    for key, value in table.items():
+        if key not in known:
+            raise ConfigError(f"unknown config key: {where}.{key}")
+        current = getattr(section, key)
+        if isinstance(current, float) and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if isinstance(current, bool) != isinstance(value, bool) or not isinstance(value, type(current)):
+            raise ConfigError(f"{where}.{key}: expected {type(current).__name__}, got {type(value).__name__}")
+        if f"{where}.{key}" in _POSITIVE and value <= 0:
+            raise ConfigError(f"{where}.{key}: must be positive, got {value}")
+        setattr(section, key, value)
+
+
+def load_config(path: Path | None = None) -> AmuxConfig:
+    """Load `config.toml` (defaults when the file does not exist)."""
+
+    path = path or amux_config_path()
+    cfg = AmuxConfig()
+    if not path.exists():
+        return cfg
+
+    data = tomllib.loads(path.read_text(encoding="utf-8"))
+    sections = {f.name for f in fields(cfg)}
+    for name, table in data.items():
+        if name not in sections or not isinstance(table, dict):
+            raise ConfigError(f"unknown config section: {name}")
+        _apply(getattr(cfg, name), table, name)
+    return cfg
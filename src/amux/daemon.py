@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import os
 import signal
-import subprocess
 import sys
 import time
 from pathlib import Path
@@ -10,35 +9,25 @@ from pathlib import Path
 import typer
 from rich import print
 
-from .paths import amux_state_root
-from .state import AmuxState, DaemonStatus, load_state, save_state
+from .fastcli import api_path as _api_path
+from .fastcli import is_pid_alive as _is_pid_alive
+from .fastcli import state_paths as _state_paths
+from .fastcli import supervisor_paths as _supervisor_paths
+from .fastcli import stats_info, status_info, where_info
 from .tmux_target import TmuxTarget, default_tmux_socket
-from .tmux import TmuxControlClient, TmuxTimeoutError, is_output_line
-from .resync import LIST_PANES_FORMAT, parse_list_panes_payload
 
+# The daemon loop (asyncio, tmux client, runtime) is imported inside `run` so
+# the other commands stay cheap to start.
 
-daemon_app = typer.Typer(no_args_is_help=True, help="Manage the amux sidecar daemon")
-
-
-def _state_paths(target: TmuxTarget) -> tuple[Path, Path]:
-    root = amux_state_root() / target.server_id
-    return root / "state.json", root / "daemon.pid"
 
-
-def _is_pid_alive(pid: int) -> bool:
-    try:
-        os.kill(pid, 0)
-        return True
-    except ProcessLookupError:
-        return False
-    except PermissionError:
-        return True
+daemon_app = typer.Typer(no_args_is_help=True, help="Manage the amux sidecar daemon")
 
 
 @daemon_app.command("start")
 def start(
     tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
     foreground: bool = typer.Option(False, "--foreground", help="Run in foreground (for debugging)"),
+    profile: bool = typer.Option(False, "--profile", help="Start with the sampling profiler on"),
 ) -> None:
     target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
     state_path, pid_path = _state_paths(target)
@@ -51,12 +40,22 @@ def start(
             return
         pid_path.unlink(missing_ok=True)
 
+    # A running supervisor takes the server on instead of a new process.
+    added = _supervisor_call("add", tmux_socket=str(target.socket_path))
+    if added is not None:
+        print(f"amux daemon started under supervisor (pid={_supervisor_pid()}, server_id={target.server_id})")
+        return
+
     if foreground:
-        run(tmux_socket=target.socket_path)
+        run(tmux_socket=target.socket_path, profile=profile)
         return
 
+    import subprocess
+
     # Spawn a detached daemon runner process.
     cmd = [sys.executable, "-m", "amux", "daemon", "run", "--tmux-socket", str(target.socket_path)]
+    if profile:
+        cmd.append("--profile")
     log_path = pid_path.parent / "daemon.log"
     log_path.parent.mkdir(parents=True, exist_ok=True)
     log_f = open(log_path, "ab", buffering=0)
@@ -91,6 +90,22 @@ def stop(
         print("amux daemon not running")
         return
 
+    if pid == _supervisor_pid():
+        # Only this server's runtime stops; the supervisor process keeps the others.
+        from .api_client import ApiCallError, api_call
+
+        try:
+            api_call(_api_path(target), "stop")
+        except (OSError, ValueError, ApiCallError) as e:
+            print(f"amux daemon for {target.server_id} runs under supervisor pid={pid} and is not answering: {e}")
+            raise typer.Exit(1)
+        for _ in range(30):
+            if not pid_path.exists():
+                break
+            time.sleep(0.1)
+        print(f"amux daemon stopped (server_id={target.server_id}, supervisor pid={pid})")
+        return
+
     os.kill(pid, signal.SIGTERM)
     # Best-effort wait a bit.
     for _ in range(30):
@@ -100,6 +115,8 @@ def stop(
 
     pid_path.unlink(missing_ok=True)
 
+    from .state import load_state, save_state
+
     st = load_state(state_path)
     st.daemon = None
     save_state(state_path, st)
@@ -112,33 +129,23 @@ def status(
     tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
 ) -> None:
     target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
-    state_path, pid_path = _state_paths(target)
+    print(status_info(target))
 
-    pid: int | None = None
-    if pid_path.exists():
-        try:
-            pid = int(pid_path.read_text(encoding="utf-8").strip())
-        except ValueError:
-            pid = None
 
-    st = load_state(state_path)
-
-    alive = pid is not None and _is_pid_alive(pid)
-    tmux_state = st.daemon.tmux_state if st.daemon else "unknown"
+@daemon_app.command("stats")
+def stats(
+    tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
+) -> None:
+    """Counters and latency histograms from the running daemon."""
 
-    print({
-        "running": bool(alive),
-        "pid": pid,
-        "tmux_socket": str(target.socket_path),
-        "server_id": target.server_id,
-        "tmux_state": tmux_state,
-        "state_path": str(state_path),
-    })
+    target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
+    print(stats_info(target))
 
 
 @daemon_app.command("run", hidden=True)
 def run(
     tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
+    profile: bool = typer.Option(False, "--profile", help="Sample stacks and allocations into <state dir>/profiles"),
 ) -> None:
     """Run the daemon loop in the foreground.
 
@@ -148,86 +155,134 @@ def run(
     target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
     state_path, _pid_path = _state_paths(target)
 
-    st: AmuxState = load_state(state_path)
-    st.daemon = DaemonStatus(pid=os.getpid(), started_at=time.time(), tmux_state="disconnected")
-    save_state(state_path, st)
+    import asyncio
+
+    from .config import load_config
+    from .runtime import DaemonRuntime
+
+    config = load_config()
 
-    def _handle_term(_signum: int, _frame: object) -> None:
-        nonlocal client
-        if client is not None:
-            try:
-                client.close()
-            except Exception:
-                pass
-            client = None
+    async def _main() -> None:
+        runtime = DaemonRuntime(target, state_path, config=config, api_path=_api_path(target), profile=profile)
+        runtime.install_signal_handlers()
+        await runtime.run()
 
-        st2 = load_state(state_path)
-        st2.daemon = None
-        save_state(state_path, st2)
-        raise SystemExit(0)
+    asyncio.run(_main())
 
-    signal.signal(signal.SIGTERM, _handle_term)
-    signal.signal(signal.SIGINT, _handle_term)
 
-    client: TmuxControlClient | None = None
+@daemon_app.command("profile")
+def profile(
+    top: int = typer.Option(15, "--top", help="Rows per section of the summary"),
+    on: bool = typer.Option(False, "--on", help="Turn profiling on in the running daemon"),
+    off: bool = typer.Option(False, "--off", help="Turn profiling off (writes the last window)"),
+    tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
+) -> None:
+    """Summarise the daemon's profile dumps: CPU by category, hot functions, allocations.
+
+    The running daemon also toggles profiling on SIGUSR2.
+    """
+
+    from .profiling import format_summary, list_dumps, profile_dir, summarize
+
+    target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
+    if on or off:
+        from .api_client import ApiCallError, api_call
 
-    backoff = 1.0
-    while True:
         try:
-            if client is None:
-                client = TmuxControlClient(socket_path=target.socket_path, response_timeout_s=5.0)
-                client.start()
-
-            # Resync panes on connect (best-effort).
-            resp = client.command(f"list-panes -a -F '{LIST_PANES_FORMAT}'")
-            panes = parse_list_panes_payload(resp.payload)
-
-            st = load_state(state_path)
-            if st.daemon:
-                st.daemon.tmux_state = "connected"
-                st.daemon.last_resync_at = time.time()
-            st.panes = panes
-            save_state(state_path, st)
-
-            # Drain events while connected. In M1 we discard `%output` to avoid flooding.
-            backoff = 1.0
-            while True:
-                line = client.poll_line() if client else None
-                if line is None:
-                    time.sleep(0.05)
-                    continue
-                if is_output_line(line):
-                    continue
-                # TODO(M1): handle lifecycle events.
-
-        except (FileNotFoundError, RuntimeError):
-            # tmux not installed or control-mode process exited.
-            if client is not None:
-                try:
-                    client.close()
-                except Exception:
-                    pass
-            client = None
-            st = load_state(state_path)
-            if st.daemon:
-                st.daemon.tmux_state = "disconnected"
-            save_state(state_path, st)
-            time.sleep(min(5.0, backoff))
-            backoff = min(60.0, backoff * 1.2)
-        except TmuxTimeoutError:
-            # Command timed out; treat as reconnect-worthy.
-            if client is not None:
-                try:
-                    client.close()
-                except Exception:
-                    pass
-            client = None
-            st = load_state(state_path)
-            if st.daemon:
-                st.daemon.tmux_state = "reconnecting"
-            save_state(state_path, st)
-            time.sleep(min(5.0, backoff))
-            backoff = min(60.0, backoff * 1.2)
+            print(api_call(_api_path(target), "profile", enable=on))
+        except (OSError, ValueError, ApiCallError) as e:
+            print(f"amux daemon not reachable: {e}")
+            raise typer.Exit(1)
+        return
+
+    state_path, _pid_path = _state_paths(target)
+    dumps = list_dumps(profile_dir(state_path))
+    if not dumps:
+        print(f"no profile dumps in {profile_dir(state_path)}; run `amux daemon profile --on` first")
+        return
+    typer.echo(format_summary(summarize(dumps, top=top)))
+
+
+@daemon_app.command("supervise")
+def supervise(
+    tmux_socket: list[Path] = typer.Option([], "--tmux-socket", help="tmux server socket to manage (repeatable)"),
+    discover: bool = typer.Option(False, "--discover", help="Also manage every socket in /tmp/tmux-<uid>/"),
+    foreground: bool = typer.Option(False, "--foreground", help="Run in foreground (for debugging)"),
+) -> None:
+    """Run one process that manages many tmux servers.
+
+    Servers started later with `amux daemon start` join it; `stop` and `status`
+    still work per server.
+    """
+
+    _api_sock, pid_path = _supervisor_paths()
+    pid = _supervisor_pid()
+    if pid is not None:
+        for sock in tmux_socket:
+            _supervisor_call("add", tmux_socket=str(sock))
+        print(f"amux supervisor already running (pid={pid})")
+        return
+
+    if not foreground:
+        import subprocess
+
+        cmd = [sys.executable, "-m", "amux", "daemon", "supervise", "--foreground"]
+        cmd += [a for sock in tmux_socket for a in ("--tmux-socket", str(sock))]
+        if discover:
+            cmd.append("--discover")
+        log_path = pid_path.parent / "daemon.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        log_f = open(log_path, "ab", buffering=0)
+        p = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log_f, stderr=log_f, start_new_session=True)
+        print(f"amux supervisor started (pid={p.pid})")
+        return
+
+    import asyncio
+
+    from .config import load_config
+    from .supervisor import Supervisor
+
+    config = load_config()
+
+    async def _main() -> None:
+        sup = Supervisor(config=config, discover=discover)
+        sup.install_signal_handlers()
+        await sup.run([TmuxTarget(socket_path=sock) for sock in tmux_socket])
+
+    asyncio.run(_main())
+
+
+@daemon_app.command("servers")
+def servers() -> None:
+    """tmux servers the supervisor manages."""
+
+    result = _supervisor_call("servers")
+    if result is None:
+        print("amux supervisor not running")
+        return
+    print(result)
+
+
+def _supervisor_pid() -> int | None:
+    _api_sock, pid_path = _supervisor_paths()
+    try:
+        pid = int(pid_path.read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        return None
+    return pid if _is_pid_alive(pid) else None
+
+
+def _supervisor_call(op: str, **args: object) -> object | None:
+    """Result of `op` on the supervisor's API, or None when no supervisor answers."""
+
+    if _supervisor_pid() is None:
+        return None
+    from .api_client import ApiCallError, api_call
+
+    try:
+        return api_call(_supervisor_paths()[0], op, **args)
+    except (OSError, ValueError, ApiCallError):
+        return None
 
 
 @daemon_app.command("where")
@@ -235,5 +290,4 @@ def where(
     tmux_socket: Path | None = typer.Option(None, "--tmux-socket", help="Path to tmux server socket"),
 ) -> None:
     target = TmuxTarget(socket_path=tmux_socket or default_tmux_socket())
-    state_path, pid_path = _state_paths(target)
-    print({"state_path": str(state_path), "pid_path": str(pid_path), "server_id": target.server_id})
+    print(where_info(target))
@@ -0,0 +1,467 @@
+"""A stand-in for `tmux -C`, for load tests without a real tmux server.
+
+Point a client at it through `tmux_command=[...]` or `$AMUX_TMUX_COMMAND`;
+it accepts (and ignores) the `-C -S <socket>` the clients append.
+
+    python -m amux.faketmux synthetic --panes 5000 --output-rate 20000
+    python -m amux.faketmux replay --trace session.trace --speed 4
+    python -m amux.faketmux record --out session.trace [--tmux tmux]
+
+`synthetic` models a server with N panes and generates bursty `%output` and
+window open/close events. `replay` plays back the async events of a trace at
+the recorded pace and answers commands with the recorded responses (falling
+back to the model). `record` runs real tmux and tees both directions of the
+control stream into a trace file.
+
+Trace format, one line per control-stream line:
+
+    <seconds since start>\\t<'>' to tmux | '<' from tmux>\\t<line>
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import BinaryIO, Iterator, Sequence
+
+from .linereader import LineSplitter
+
+_FORMAT_VAR = re.compile(r"#\{(\w+)\}")
+
+
+class FakeServer:
+    """The panes a fake tmux server reports, and how it answers commands."""
+
+    def __init__(self, panes: int = 0, *, panes_per_window: int = 4) -> None:
+        # pane_id -> format variables
+        self.panes: dict[str, dict[str, str]] = {}
+        # command text -> recorded (error, payload) answers, see `load_trace()`
+        self.recorded: dict[str, deque[tuple[bool, list[bytes]]]] = {}
+        # Flow control: `refresh-client -f pause-after=N` turns it on; a pane is
+        # paused once it has sent `pause_bytes` since it last continued.
+        self.pause_after = 0
+        self.pause_bytes = 0
+        self.paused: set[str] = set()
+        self.off: set[str] = set()  # `refresh-client -A '%N:off'`
+        self.sent: dict[str, int] = {}
+        self.notifications: list[bytes] = []  # written inside the next response block
+        self._next_pane = 0
+        self._next_window = 0
+        while len(self.panes) < panes:
+            self.add_window(min(panes_per_window, panes - len(self.panes)))
+
+    def add_window(self, n_panes: int = 1) -> str:
+        window = f"@{self._next_window}"
+        self._next_window += 1
+        for _ in range(n_panes):
+            pane = f"%{self._next_pane}"
+            self._next_pane += 1
+            self.panes[pane] = {
+                "pane_id": pane,
+                "pane_pid": str(10_000 + self._next_pane),
+                "pane_current_command": ("zsh", "node", "claude", "python3")[self._next_pane % 4],
+                "pane_current_path": f"/home/dev/src/project-{self._next_pane % 40}",
+                "window_id": window,
+                "session_id": "$0",
+            }
+        return window
+
+    def close_window(self, window: str) -> None:
+        for pane in [p for p, v in self.panes.items() if v["window_id"] == window]:
+            del self.panes[pane]
+            self.off.discard(pane)
+
+    def answer(self, cmd: str) -> tuple[bool, list[bytes]]:
+        """(error, payload lines) for one command line."""
+
+        queued = self.recorded.get(cmd)
+        if queued:
+            return queued.popleft() if len(queued) > 1 else queued[0]
+
+        try:
+            argv = shlex.split(cmd)
+        except ValueError as e:
+            return True, [f"parse error: {e}".encode()]
+        if not argv:
+            return False, []
+        name, args = argv[0], argv[1:]
+        if name == "list-panes":
+            return self._list_panes(args)
+        if name == "display-message":
+            return self._display(args)
+        if name == "refresh-client":
+            return self._refresh_client(args)
+        if name in ("set-option", "set", "show-options", "capture-pane", "pipe-pane"):
+            return False, []
+        return True, [f"unknown command: {name}".encode()]
+
+    def _refresh_client(self, args: list[str]) -> tuple[bool, list[bytes]]:
+        it = iter(args)
+        for a in it:
+            if a == "-f":
+                for flag in next(it, "").split(","):
+                    if flag.startswith("pause-after="):
+                        self.pause_after = int(flag.split("=", 1)[1] or 0)
+            elif a == "-A":
+                pane, _, action = next(it, "").partition(":")
+                if action == "off":
+                    self.off.add(pane)
+                elif action == "on":
+                    self.off.discard(pane)
+                elif action == "continue" and pane in self.paused:
+                    self.paused.discard(pane)
+                    self.sent[pane] = 0
+                    self.notifications.append(f"%continue {pane}".encode())
+        return False, []
+
+    def output(self, pane: str, data: str, count: int) -> list[bytes]:
+        """Lines for `count` copies of `data` from `pane`, honouring pauses and `off`."""
+
+        if pane in self.off:
+            return []
+        if not self.pause_after:
+            return [f"%output {pane} {data}".encode()] * count
+        if pane in self.paused:
+            return []
+        lines = [f"%extended-output {pane} 0 : {data}".encode()] * count
+        sent = self.sent.get(pane, 0) + len(data) * count
+        self.sent[pane] = sent
+        if self.pause_bytes and sent >= self.pause_bytes:
+            self.paused.add(pane)
+            lines.append(f"%pause {pane}".encode())
+        return lines
+
+    def _list_panes(self, args: list[str]) -> tuple[bool, list[bytes]]:
+        fmt, target, panes = "#{pane_id}", None, list(self.panes.values())
+        it = iter(args)
+        for a in it:
+            if a == "-F":
+                fmt = next(it, fmt)
+            elif a == "-t":
+                target = next(it, None)
+        if target is not None and "-a" not in args:
+            if target.startswith("@"):
+                panes = [p for p in panes if p["window_id"] == target]
+            elif target.startswith("%"):
+                window = self.panes.get(target, {}).get("window_id")
+                panes = [p for p in panes if p["window_id"] == window]
+            if not panes and not target.startswith("$"):
+                return True, [f"can't find window: {target}".encode()]
+        return False, [_expand(fmt, p) for p in panes]
+
+    def _display(self, args: list[str]) -> tuple[bool, list[bytes]]:
+        target, fmt = None, ""
+        it = iter(args)
+        for a in it:
+            if a == "-t":
+                target = next(it, None)
+            elif not a.startswith("-"):
+                fmt = a
+        pane = self.panes.get(target or "")
+        if pane is None:
+            return True, [f"can't find pane: {target}".encode()]
+        return False, [_expand(fmt, pane)]
+
+
+def _expand(fmt: str, values: dict[str, str]) -> bytes:
+    return _FORMAT_VAR.sub(lambda m: values.get(m.group(1), ""), fmt).encode("utf-8")
+
+
+class ControlStream:
+    """Writes control-mode lines to stdout; whole blocks are written atomically."""
+
+    def __init__(self, out: BinaryIO, emit_log: BinaryIO | None = None) -> None:
+        self.out = out
+        self.emit_log = emit_log
+        self.lock = threading.Lock()
+        self._cmd_num = 0
+        self.closed = False
+
+    def block(self, error: bool, payload: list[bytes], flags: int = 1, notifications: Sequence[bytes] = ()) -> None:
+        with self.lock:
+            now = int(time.time())
+            self._cmd_num += 1
+            end = b"%error" if error else b"%end"
+            guard = f" {now} {self._cmd_num} {flags}\n".encode()
+            # Like tmux, notifications a command causes land inside its block.
+            body = b"".join(p + b"\n" for p in [*notifications, *payload])
+            self._write(b"%begin" + guard + body + end + guard)
+
+    def events(self, lines: list[bytes]) -> None:
+        if not lines:
+            return
+        with self.lock:
+            if self.emit_log is not None:
+                stamp = f"{time.monotonic():.6f}\t".encode()
+                self.emit_log.write(b"".join(stamp + line + b"\n" for line in lines))
+                self.emit_log.flush()
+            self._write(b"".join(line + b"\n" for line in lines))
+
+    def _write(self, data: bytes) -> None:
+        if self.closed:
+            return
+        try:
+            self.out.write(data)
+            self.out.flush()
+        except (BrokenPipeError, ValueError):
+            self.closed = True
+
+
+def _fd_lines(fd: int) -> Iterator[bytes]:
+    # os.read rather than sys.stdin: a daemon thread blocked in a buffered
+    # read aborts interpreter shutdown.
+    splitter = LineSplitter()
+    while chunk := os.read(fd, 65536):
+        yield from splitter.feed(chunk)
+
+
+def serve_commands(server: FakeServer, stream: ControlStream, fd: int, *, delay_s: float = 0.0) -> None:
+    """Answer command lines read from `fd` until it closes or `kill-server`."""
+
+    for raw in _fd_lines(fd):
+        cmd = raw.decode("utf-8", errors="replace")
+        if cmd == "kill-server":
+            break
+        if delay_s:
+            time.sleep(delay_s)
+        error, payload = server.answer(cmd)
+        notes, server.notifications = server.notifications, []
+        stream.block(error, payload, notifications=notes)
+
+
+def _octal_escape(text: str) -> str:
+    return "".join(c if " " <= c <= "~" and c != "\\" else f"\\{ord(c):03o}" for c in text)
+
+
+def synthetic_events(
+    server: FakeServer,
+    *,
+    output_rate: float,
+    burst: int,
+    lifecycle_rate: float,
+    rng: random.Random,
+) -> Iterator[tuple[float, list[bytes]]]:
+    """(delay before, lines): `%output` bursts and window open/close, until both rates are 0."""
+
+    line = _octal_escape("\x1b[32mRunning tests... 42/300 passed\x1b[0m\r\n")
+    out_every = burst / output_rate if output_rate > 0 else float("inf")
+    life_every = 1 / lifecycle_rate if lifecycle_rate > 0 else float("inf")
+    next_out, next_life, now = (0.0 if output_rate > 0 else float("inf")), life_every, 0.0
+    opened: list[str] = []
+    while min(next_out, next_life) != float("inf"):
+        if next_out <= next_life:
+            delay, now = next_out - now, next_out
+            next_out += out_every
+            panes = list(server.panes)
+            if not panes:
+                continue
+            # Empty while the chosen pane is paused; still yielded to keep the pace.
+            yield delay, server.output(panes[rng.randrange(len(panes))], line, burst)
+        else:
+            delay, now = next_life - now, next_life
+            next_life += life_every
+            if opened and (len(opened) > 8 or rng.random() < 0.5):
+                window = opened.pop(0)
+                server.close_window(window)
+                yield delay, [f"%window-close {window}".encode()]
+            else:
+                window = server.add_window(1)
+                opened.append(window)
+                yield delay, [f"%window-add {window}".encode(), f"%layout-change {window} b25d,80x24,0,0,1 b25d,80x24,0,0,1 *".encode()]
+
+
+def read_trace(path: Path) -> Iterator[tuple[float, str, bytes]]:
+    with open(path, "rb") as f:
+        for raw in f:
+            parts = raw.rstrip(b"\n").split(b"\t", 2)
+            if len(parts) == 3:
+                yield float(parts[0]), parts[1].decode(), parts[2]
+
+
+def load_trace(path: Path, server: FakeServer) -> list[tuple[float, bytes]]:
+    """Split a trace into async events (returned) and recorded responses.
+
+    Responses are matched to commands in order, as `CommandPipeline` does,
+    and stored on `server.recorded` by command text.
+    """
+
+    events: list[tuple[float, bytes]] = []
+    commands: deque[str] = deque()
+    block: list[bytes] | None = None
+    for t, direction, line in read_trace(path):
+        if direction == ">":
+            commands.append(line.decode("utf-8", errors="replace"))
+            continue
+        if block is None:
+            if line.startswith(b"%begin "):
+                block = []
+            elif line != b"%exit":
+                events.append((t, line))
+            continue
+        if line.startswith((b"%end ", b"%error ")):
+            foreign = line.rsplit(b" ", 1)[-1] == b"0"
+            if not foreign and commands:
+                cmd = commands.popleft()
+                server.recorded.setdefault(cmd, deque()).append((line.startswith(b"%error"), block))
+            block = None
+        else:
+            block.append(line)
+    return events
+
+
+def _start_command_thread(server: FakeServer, stream: ControlStream, delay_s: float) -> threading.Thread:
+    t = threading.Thread(target=serve_commands, args=(server, stream, sys.stdin.fileno()), kwargs={"delay_s": delay_s}, daemon=True)
+    t.start()
+    return t
+
+
+def _run_events(
+    stream: ControlStream,
+    events: Iterator[tuple[float, list[bytes]]],
+    commands: threading.Thread,
+    *,
+    exit_after: float | None,
+    hold_open: bool,
+) -> None:
+    deadline = time.monotonic() + exit_after if exit_after else float("inf")
+    due = time.monotonic()
+    for delay, lines in events:
+        due += delay
+        wait = due - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, max(0.0, deadline - time.monotonic())))
+        if not commands.is_alive() or stream.closed or time.monotonic() >= deadline:
+            break
+        stream.events(lines)
+    else:
+        # Out of events. A replayed session ends here; a synthetic server
+        # with nothing to generate keeps answering until the client leaves.
+        while hold_open and commands.is_alive() and time.monotonic() < deadline:
+            commands.join(timeout=min(0.1, max(0.0, deadline - time.monotonic())))
+    stream.events([b"%exit"])
+
+
+def record(argv: list[str], out: Path, tmux: list[str]) -> int:
+    """Run real tmux with `argv`, teeing both directions into `out`."""
+
+    proc = subprocess.Popen([*tmux, *argv], stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+    assert proc.stdin is not None and proc.stdout is not None
+    start = time.monotonic()
+    lock = threading.Lock()
+    # Unbuffered: the client usually stops us with SIGTERM.
+    trace = open(out, "ab", buffering=0)
+
+    def log(direction: bytes, line: bytes) -> None:
+        with lock:
+            trace.write(f"{time.monotonic() - start:.6f}\t".encode() + direction + b"\t" + line.rstrip(b"\n") + b"\n")
+
+    def pump_stdin() -> None:
+        for line in _fd_lines(sys.stdin.fileno()):
+            log(b">", line)
+            try:
+                proc.stdin.write(line + b"\n")  # type: ignore[union-attr]
+            except BrokenPipeError:
+                break
+        try:
+            proc.stdin.close()  # type: ignore[union-attr]
+        except BrokenPipeError:
+            pass
+
+    threading.Thread(target=pump_stdin, daemon=True).start()
+    stdout = sys.stdout.buffer
+    try:
+        for line in proc.stdout:
+            log(b"<", line)
+            stdout.write(line)
+            stdout.flush()
+    except BrokenPipeError:
+        pass
+    finally:
+        with lock:
+            trace.close()
+    return proc.wait()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m amux.faketmux", description="fake `tmux -C` for load tests")
+    sub = ap.add_subparsers(dest="mode", required=True)
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("-C", action="count", default=0, help=argparse.SUPPRESS)
+        p.add_argument("-S", dest="socket", help=argparse.SUPPRESS)
+        p.add_argument("--response-delay-ms", type=float, default=0.0, help="delay before each response")
+        p.add_argument("--exit-after", type=float, help="disconnect (print %%exit) after this many seconds")
+        p.add_argument("--emit-log", type=Path, help="log '<monotonic>\\t<line>' for every event written")
+
+    syn = sub.add_parser("synthetic", help="generate events for a modelled server")
+    common(syn)
+    syn.add_argument("--panes", type=int, default=1000)
+    syn.add_argument("--panes-per-window", type=int, default=4)
+    syn.add_argument("--output-rate", type=float, default=1000.0, help="%%output lines per second")
+    syn.add_argument("--burst", type=int, default=50, help="%%output lines written back to back")
+    syn.add_argument("--lifecycle-rate", type=float, default=2.0, help="window open/close events per second")
+    syn.add_argument("--seed", type=int, default=0)
+    syn.add_argument(
+        "--pause-bytes", type=int, default=0,
+        help="with pause-after on, %%pause a pane after it sent this much since it last continued",
+    )
+
+    rep = sub.add_parser("replay", help="play back a recorded trace")
+    common(rep)
+    rep.add_argument("--trace", type=Path, required=True)
+    rep.add_argument("--speed", type=float, default=1.0, help="playback speed factor")
+    rep.add_argument("--panes", type=int, default=0, help="model panes for commands the trace never answered")
+
+    rec = sub.add_parser("record", help="run real tmux and tee its control stream")
+    rec.add_argument("--out", type=Path, required=True)
+    rec.add_argument("--tmux", default="tmux", help="tmux command to run")
+
+    # `record` passes everything it does not know (`-C -S <socket>`) on to tmux.
+    args, extra = ap.parse_known_args(argv)
+    if args.mode == "record":
+        return record(extra, args.out, shlex.split(args.tmux))
+    if extra:
+        ap.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    emit_log = open(args.emit_log, "ab") if args.emit_log else None
+    stream = ControlStream(sys.stdout.buffer, emit_log)
+    if args.mode == "synthetic":
+        server = FakeServer(args.panes, panes_per_window=args.panes_per_window)
+        server.pause_bytes = args.pause_bytes
+        events: Iterator[tuple[float, list[bytes]]] = synthetic_events(
+            server,
+            output_rate=args.output_rate,
+            burst=args.burst,
+            lifecycle_rate=args.lifecycle_rate,
+            rng=random.Random(args.seed),
+        )
+    else:
+        server = FakeServer(args.panes)
+        recorded = load_trace(args.trace, server)
+        events = _replay_schedule(recorded, args.speed)
+
+    # Like tmux: the attach itself produces an unsolicited block.
+    stream.block(False, [], flags=0)
+    commands = _start_command_thread(server, stream, args.response_delay_ms / 1000)
+    _run_events(stream, events, commands, exit_after=args.exit_after, hold_open=args.mode == "synthetic")
+    return 0
+
+
+def _replay_schedule(events: list[tuple[float, bytes]], speed: float) -> Iterator[tuple[float, list[bytes]]]:
+    prev = events[0][0] if events else 0.0
+    for t, line in events:
+        yield max(0.0, t - prev) / speed, [line]
+        prev = t
+
+
+if __name__ == "__main__":
+    sys.exit(main())
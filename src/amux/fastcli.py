@@ -0,0 +1,177 @@
+"""`amux` entry point.
+
+Read-only commands that run from status bars and prompt hooks (`daemon
+status`, `daemon where`, `daemon stats`, `status-line`, `version`) are answered here with
+stdlib imports only. Everything else, and anything with flags we do not
+recognise, goes to the typer app in `amux.cli`, which pulls in typer and rich.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+from .paths import amux_state_root
+from .tmux_target import TmuxTarget, default_tmux_socket
+
+
+def state_paths(target: TmuxTarget) -> tuple[Path, Path]:
+    root = amux_state_root() / target.server_id
+    return root / "state.json", root / "daemon.pid"
+
+
+def api_path(target: TmuxTarget) -> Path:
+    return amux_state_root() / target.server_id / "api.sock"
+
+
+def supervisor_paths() -> tuple[Path, Path]:
+    """(api socket, pid file) of the multi-server supervisor, if one runs."""
+
+    root = amux_state_root() / "supervisor"
+    return root / "api.sock", root / "supervisor.pid"
+
+
+def is_pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def status_info(target: TmuxTarget) -> dict[str, Any]:
+    from .api_client import ApiCallError, api_call
+
+    # A running daemon answers from memory; state.json may be a debounce behind.
+    try:
+        return api_call(api_path(target), "status")
+    except (OSError, ValueError, ApiCallError):
+        pass
+
+    from .state import load_state
+
+    state_path, pid_path = state_paths(target)
+    pid: int | None = None
+    if pid_path.exists():
+        try:
+            pid = int(pid_path.read_text(encoding="utf-8").strip())
+        except ValueError:
+            pid = None
+
+    st = load_state(state_path)
+
+    alive = pid is not None and is_pid_alive(pid)
+    tmux_state = st.daemon.tmux_state if st.daemon else "unknown"
+
+    return {
+        "running": bool(alive),
+        "pid": pid,
+        "tmux_socket": str(target.socket_path),
+        "server_id": target.server_id,
+        "tmux_state": tmux_state,
+        "state_path": str(state_path),
+    }
+
+
+def stats_info(target: TmuxTarget) -> dict[str, Any]:
+    from .api_client import ApiCallError, api_call
+
+    try:
+        return api_call(api_path(target), "stats")
+    except (OSError, ValueError, ApiCallError) as e:
+        # Counters only live in the daemon; amux.prom keeps the last values it wrote.
+        return {"running": False, "error": str(e), "server_id": target.server_id}
+
+
+def where_info(target: TmuxTarget) -> dict[str, Any]:
+    state_path, pid_path = state_paths(target)
+    return {
+        "state_path": str(state_path),
+        "pid_path": str(pid_path),
+        "api_path": str(api_path(target)),
+        "server_id": target.server_id,
+    }
+
+
+def _version() -> str:
+    from . import __version__
+
+    return __version__
+
+
+_DAEMON_READS: dict[str, Callable[[TmuxTarget], dict[str, Any]]] = {
+    "status": status_info,
+    "where": where_info,
+    "stats": stats_info,
+}
+
+
+def _parse_opts(args: list[str], allowed: tuple[str, ...]) -> dict[str, str] | None:
+    """`--name VALUE` / `--name=VALUE` pairs; None for anything else (incl. --help)."""
+
+    opts: dict[str, str] = {}
+    i = 0
+    while i < len(args):
+        name, eq, value = args[i].partition("=")
+        if name not in allowed:
+            return None
+        if not eq:
+            if i + 1 >= len(args):
+                return None
+            i += 1
+            value = args[i]
+        opts[name] = value
+        i += 1
+    return opts
+
+
+def _target(opts: dict[str, str]) -> TmuxTarget:
+    sock = opts.get("--tmux-socket")
+    return TmuxTarget(socket_path=Path(sock) if sock else default_tmux_socket())
+
+
+def status_line(target: TmuxTarget, window: str | None = None) -> str:
+    from .statusline import read_status_line, status_line_path
+
+    return read_status_line(status_line_path(state_paths(target)[0]), window)
+
+
+def run_fast(argv: list[str]) -> bool:
+    """Handle `argv` without typer if it is a hot read-only command."""
+
+    if argv == ["version"]:
+        print(_version())
+        return True
+    if len(argv) >= 2 and argv[0] == "daemon" and argv[1] in _DAEMON_READS:
+        opts = _parse_opts(argv[2:], ("--tmux-socket",))
+        if opts is None:
+            return False
+        _print(_DAEMON_READS[argv[1]](_target(opts)))
+        return True
+    if argv[:1] == ["status-line"]:
+        opts = _parse_opts(argv[1:], ("--tmux-socket", "--window"))
+        if opts is None:
+            return False
+        sys.stdout.write(status_line(_target(opts), opts.get("--window")) + "\n")
+        return True
+    return False
+
+
+def _print(obj: Any) -> None:
+    # Same Python-literal form the rich-based commands print, without rich.
+    from pprint import pformat
+
+    sys.stdout.write(pformat(obj, sort_dicts=False) + "\n")
+
+
+def main() -> None:
+    if run_fast(sys.argv[1:]):
+        return
+
+    from .cli import main as typer_main
+
+    typer_main()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass(slots=True)
+class PaneFlow:
+    paused_at: float | None = None
+    resume_at: float = float("inf")  # inf: not scheduled (running, or continue sent)
+    hold_s: float = 0.0
+    pauses: int = 0
+    last_continue: float = float("-inf")
+    age_ms: int = 0  # how far behind tmux said the last output was
+    max_age_ms: int = 0
+
+
+class FlowControl:
+    """Which panes tmux has paused (`%pause`) and when to let them continue.
+
+    With `refresh-client -f pause-after=N` tmux stops sending a pane's output
+    once it is N seconds behind, so one runaway pane cannot delay everything
+    else on the control stream. Each pause is held for `hold_s`, doubled when
+    the pane is paused again soon after it continued (up to `max_hold_s`), and
+    resumes are rate-limited to `resumes_per_s` so a crowd of noisy panes is
+    let back in gradually.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_hold_s: float = 0.5,
+        max_hold_s: float = 30.0,
+        resumes_per_s: float = 10.0,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_hold_s = min_hold_s
+        self.max_hold_s = max_hold_s
+        self.resumes_per_s = resumes_per_s
+        self.monotonic = monotonic
+        self.panes: dict[str, PaneFlow] = {}
+        self.total_pauses = 0
+        self._tokens = max(1.0, resumes_per_s)
+        self._refilled = monotonic()
+
+    @property
+    def paused(self) -> list[str]:
+        return [pid for pid, f in self.panes.items() if f.paused_at is not None]
+
+    def note_age(self, pane_id: str, age_ms: int) -> None:
+        f = self.panes.get(pane_id)
+        if f is None:
+            if not age_ms:
+                return  # only track panes that ever fell behind
+            f = self.panes[pane_id] = PaneFlow()
+        f.age_ms = age_ms
+        if age_ms > f.max_age_ms:
+            f.max_age_ms = age_ms
+
+    def on_pause(self, pane_id: str) -> None:
+        now = self.monotonic()
+        f = self.panes.setdefault(pane_id, PaneFlow())
+        # Paused again shortly after continuing: it is still flooding, back off.
+        if now - f.last_continue < 4 * max(f.hold_s, self.min_hold_s):
+            f.hold_s = min(self.max_hold_s, max(self.min_hold_s, f.hold_s * 2))
+        else:
+            f.hold_s = self.min_hold_s
+        f.paused_at = now
+        f.resume_at = now + f.hold_s
+        f.pauses += 1
+        self.total_pauses += 1
+
+    def on_continue(self, pane_id: str) -> None:
+        f = self.panes.get(pane_id)
+        if f is not None:
+            f.paused_at = None
+            f.resume_at = float("inf")
+            f.last_continue = self.monotonic()
+            f.age_ms = 0
+
+    def next_due(self) -> float | None:
+        """Monotonic time the next paused pane may continue, if any is waiting."""
+
+        due = min((f.resume_at for f in self.panes.values()), default=float("inf"))
+        if due == float("inf"):
+            return None
+        if self._tokens < 1:
+            due = max(due, self._refilled + (1 - self._tokens) / self.resumes_per_s)
+        return due
+
+    def take_due(self) -> list[str]:
+        """Paused panes to continue now, oldest first, within the resume budget.
+
+        They are marked as in progress until tmux confirms with `%continue`.
+        """
+
+        now = self.monotonic()
+        self._tokens = min(max(1.0, self.resumes_per_s), self._tokens + (now - self._refilled) * self.resumes_per_s)
+        self._refilled = now
+        ready = sorted((f.resume_at, pid) for pid, f in self.panes.items() if f.resume_at <= now)
+        out = [pid for _t, pid in ready[: int(self._tokens)]]
+        self._tokens -= len(out)
+        for pid in out:
+            self.panes[pid].resume_at = float("inf")
+        return out
+
+    def discard(self, pane_id: str) -> None:
+        self.panes.pop(pane_id, None)
+
+    def throttled(self) -> dict[str, dict[str, Any]]:
+        """Report for panes that are paused or have been, keyed by pane id."""
+
+        now = self.monotonic()
+        return {
+            pid: {
+                "paused": f.paused_at is not None,
+                "paused_for_s": round(now - f.paused_at, 3) if f.paused_at is not None else None,
+                "pauses": f.pauses,
+                "hold_s": f.hold_s,
+                "age_ms": f.age_ms,
+                "max_age_ms": f.max_age_ms,
+            }
+            for pid, f in self.panes.items()
+        }
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .state import AmuxState, DaemonStatus, PaneState, pane_json
+
+# One record per line: {"s": seq, "t": unix time, "op": ..., "k": key, "v": value}
+#   pane.set / pane.del    k = pane id
+#   group.set / group.del  k = group name
+#   watches.set            v = the whole list (it is small and edited rarely)
+#   daemon.set             v = DaemonStatus as a dict, or null
+Record = tuple[str, str | None, Any]
+
+
+def journal_path(state_path: Path) -> Path:
+    return state_path.with_suffix(".journal")
+
+
+def read_journal(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield records in order, stopping at a torn or corrupt record."""
+
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return  # torn final write
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                return
+            if not isinstance(rec, dict) or "op" not in rec:
+                return
+            yield rec
+
+
+def apply_record(st: AmuxState, rec: dict[str, Any]) -> None:
+    op, key, value = rec["op"], rec.get("k"), rec.get("v")
+    if op == "pane.set":
+        st.panes[key] = PaneState.from_dict(key, value)
+    elif op == "pane.del":
+        st.panes.pop(key, None)
+    elif op == "group.set":
+        st.groups[key] = value
+    elif op == "group.del":
+        st.groups.pop(key, None)
+    elif op == "watches.set":
+        st.watches = list(value)
+    elif op == "daemon.set":
+        st.daemon = None if value is None else DaemonStatus(**value)
+    st.journal_seq = int(rec.get("s", st.journal_seq))
+
+
+def replay_journal(st: AmuxState, path: Path) -> None:
+    """Apply journal records newer than the snapshot `st` was loaded from."""
+
+    for rec in read_journal(path):
+        if int(rec.get("s", 0)) > st.journal_seq:
+            apply_record(st, rec)
+
+
+class JournalView:
+    """The state as snapshot+journal currently record it.
+
+    `diff()` compares the live state against it and returns only the
+    records needed to catch the journal up. Only the panes named as changed
+    are compared, so a flush costs O(changed panes), not O(all panes).
+    """
+
+    def __init__(self, st: AmuxState) -> None:
+        self.panes: dict[str, dict[str, Any]] = {k: pane_json(v) for k, v in st.panes.items()}
+        self.groups: dict[str, Any] = {k: _copy(v) for k, v in st.groups.items()}
+        self.watches: list[Any] = [_copy(w) for w in st.watches]
+        self.daemon: dict[str, Any] | None = asdict(st.daemon) if st.daemon else None
+
+    def diff(self, st: AmuxState, pane_ids: Iterable[str]) -> list[Record]:
+        """Records for what changed; `pane_ids` are the panes added, updated or removed."""
+
+        out: list[Record] = []
+
+        panes = self.panes
+        for pid in sorted(pane_ids):
+            pane = st.panes.get(pid)
+            if pane is None:
+                if panes.pop(pid, None) is not None:
+                    out.append(("pane.del", pid, None))
+                continue
+            d = pane_json(pane)
+            if panes.get(pid) != d:
+                panes[pid] = d
+                out.append(("pane.set", pid, panes[pid]))
+
+        for name, group in st.groups.items():
+            if self.groups.get(name) != group:
+                self.groups[name] = _copy(group)
+                out.append(("group.set", name, self.groups[name]))
+        for name in [g for g in self.groups if g not in st.groups]:
+            del self.groups[name]
+            out.append(("group.del", name, None))
+
+        if self.watches != st.watches:
+            self.watches = [_copy(w) for w in st.watches]
+            out.append(("watches.set", None, self.watches))
+
+        daemon = asdict(st.daemon) if st.daemon else None
+        if daemon != self.daemon:
+            self.daemon = daemon
+            out.append(("daemon.set", None, daemon))
+
+        return out
+
+
+def _copy(v: Any) -> Any:
+    return dict(v) if isinstance(v, dict) else v
+
+
+class StateJournal:
+    """Append-only journal file next to `state.json`."""
+
+    def __init__(self, path: Path, *, seq: int = 0) -> None:
+        self.path = path
+        self.seq = seq
+        self.records = 0  # since the last compaction
+        self.bytes = 0
+
+    def append(self, records: list[Record], *, fsync: bool = False) -> int:
+        """Append `records` in one write; returns the bytes written."""
+
+        now = round(time.time(), 3)
+        lines = []
+        for op, key, value in records:
+            self.seq += 1
+            rec: dict[str, Any] = {"s": self.seq, "t": now, "op": op}
+            if key is not None:
+                rec["k"] = key
+            if value is not None or op == "daemon.set":
+                rec["v"] = value
+            lines.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.records += len(records)
+        self.bytes += len(data)
+        return len(data)
+
+    def rotate(self, generations: int) -> None:
+        """Start an empty journal, keeping `generations` old ones as history."""
+
+        if generations <= 0:
+            self.path.unlink(missing_ok=True)
+        elif self.path.exists():
+            for i in range(generations - 1, 0, -1):
+                older = self.path.with_name(f"{self.path.name}.{i}")
+                if older.exists():
+                    older.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        self.records = 0
+        self.bytes = 0
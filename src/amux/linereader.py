@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import io
+
+
+class LineSplitter:
+    """Split a byte stream into `\\n`-terminated lines, one chunk at a time.
+
+    Each chunk is split with a single `bytes.split` (one C-level scan) and
+    only the trailing partial line is carried over to the next chunk.
+    Lines are returned as undecoded `bytes` without the newline.
+    """
+
+    def __init__(self) -> None:
+        self._partial = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """Bytes buffered for an incomplete line."""
+
+        return len(self._partial)
+
+    def feed(self, chunk: bytes | bytearray) -> list[bytes]:
+        last = chunk.rfind(b"\n")
+        if last < 0:
+            self._partial += chunk
+            return []
+
+        if self._partial:
+            self._partial += chunk[:last]
+            block = bytes(self._partial)
+            self._partial.clear()
+        else:
+            block = bytes(chunk[:last])
+        self._partial += chunk[last + 1 :]
+        return block.split(b"\n")
+
+
+class ChunkedLineReader:
+    """Read lines from a file descriptor in large chunks.
+
+    One `readinto()` into a reusable buffer replaces a select+readline pair per
+    line; on a non-blocking fd it returns `[]` when nothing is available and
+    `None` at EOF.
+    """
+
+    def __init__(self, fd: int, *, chunk_size: int = 64 * 1024) -> None:
+        self._raw = io.FileIO(fd, "rb", closefd=False)
+        self._chunk = bytearray(chunk_size)
+        self._splitter = LineSplitter()
+
+    def read_lines(self) -> list[bytes] | None:
+        n = self._raw.readinto(self._chunk)
+        if n is None:
+            return []
+        if n == 0:
+            return None
+        return self._splitter.feed(self._chunk if n == len(self._chunk) else self._chunk[:n])
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any
+
+from .state import atomic_write_text
+
+# Fixed histogram buckets (upper bounds); +Inf is implied.
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def metrics_textfile_path(state_path: Path) -> Path:
+    # node_exporter's textfile collector only reads `*.prom`.
+    return state_path.with_name("amux.prom")
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by one label."""
+
+    __slots__ = ("name", "help", "label", "values")
+
+    def __init__(self, name: str, help: str, label: str | None = None) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: dict[str, float] = {}
+
+    def inc(self, amount: float = 1.0, key: str = "") -> None:
+        values = self.values
+        values[key] = values.get(key, 0.0) + amount
+
+    def discard(self, key: str) -> None:
+        self.values.pop(key, None)
+
+    @property
+    def total(self) -> float:
+        return sum(self.values.values())
+
+
+class Gauge:
+    __slots__ = ("name", "help", "value")
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Histogram:
+    """Counts per fixed bucket plus sum/count; `observe()` is one bisect."""
+
+    __slots__ = ("name", "help", "buckets", "counts", "sum", "count")
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = SECONDS_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+
+        if not self.count:
+            return None
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for bound, n in zip((*self.buckets, math.inf), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50_le": _finite(self.quantile(0.5)),
+            "p99_le": _finite(self.quantile(0.99)),
+        }
+
+
+class DaemonMetrics:
+    """Everything the daemon counts about itself."""
+
+    def __init__(self) -> None:
+        self.control_lines = Counter("amux_control_lines_total", "Control-mode notification lines by type.", "type")
+        self.output_bytes = Counter("amux_output_bytes_total", "Unescaped %output bytes by pane.", "pane")
+        self.command_seconds = Histogram("amux_command_seconds", "tmux command round-trip time.")
+        self.resync_seconds = Histogram("amux_resync_seconds", "Full list-panes resync duration.")
+        self.state_write_seconds = Histogram("amux_state_write_seconds", "State journal append or snapshot write time.")
+        self.state_write_bytes = Histogram("amux_state_write_bytes", "Bytes per state write.", BYTES_BUCKETS)
+        self.reconnects = Counter("amux_reconnects_total", "Control-mode connections lost or failed to start.")
+        self.reconnect_backoff = Gauge("amux_reconnect_backoff_seconds", "Delay before the next reconnect attempt.")
+        self.snapshots = Counter("amux_snapshots_total", "Pane snapshot requests by how they were served.", "result")
+        self.notifications = Counter("amux_notifications_total", "Notifications by outcome.", "result")
+        self.actions = Counter("amux_watch_actions_total", "Watch actions by outcome.", "result")
+        self.action_seconds = Histogram("amux_watch_action_seconds", "Watch action run time.")
+        self.loop_lag_seconds = Histogram("amux_event_loop_lag_seconds", "How late a periodic event-loop timer fired.")
+
+    @property
+    def all(self) -> list[Counter | Gauge | Histogram]:
+        return [m for m in vars(self).values() if isinstance(m, (Counter, Gauge, Histogram))]
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-friendly view for `amux daemon stats`."""
+
+        out: dict[str, Any] = {}
+        for m in self.all:
+            key = m.name.removeprefix("amux_")
+            if isinstance(m, Histogram):
+                out[key] = m.summary()
+            elif isinstance(m, Gauge):
+                out[key] = m.value
+            elif m.label is None:
+                out[key] = m.values.get("", 0.0)
+            else:
+                out[key] = dict(sorted(m.values.items()))
+        return out
+
+    def render_prometheus(self, labels: dict[str, str] | None = None) -> str:
+        """Prometheus text exposition format, with `labels` on every sample."""
+
+        base = ",".join(f'{k}="{_escape(v)}"' for k, v in (labels or {}).items())
+
+        def sample(name: str, value: float, extra: str = "") -> str:
+            lbl = ",".join(x for x in (base, extra) if x)
+            return f"{name}{{{lbl}}} {_num(value)}" if lbl else f"{name} {_num(value)}"
+
+        lines: list[str] = []
+        for m in self.all:
+            kind = "histogram" if isinstance(m, Histogram) else "gauge" if isinstance(m, Gauge) else "counter"
+            lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {kind}"]
+            if isinstance(m, Histogram):
+                cumulative = 0
+                for bound, n in zip((*m.buckets, math.inf), m.counts):
+                    cumulative += n
+                    lines.append(sample(f"{m.name}_bucket", cumulative, f'le="{_num(bound)}"'))
+                lines.append(sample(f"{m.name}_sum", m.sum))
+                lines.append(sample(f"{m.name}_count", m.count))
+            elif isinstance(m, Gauge):
+                lines.append(sample(m.name, m.value))
+            elif m.label is None:
+                lines.append(sample(m.name, m.values.get("", 0.0)))
+            else:
+                for key, value in sorted(m.values.items()):
+                    lines.append(sample(m.name, value, f'{m.label}="{_escape(key)}"'))
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path, labels: dict[str, str] | None = None) -> None:
+        # Atomic rename: the collector must never read a half-written file.
+        atomic_write_text(path, self.render_prometheus(labels))
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _finite(value: float | None) -> float | None:
+    # JSON has no infinity; "above the last bucket" reads as unknown.
+    return None if value == math.inf else value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,250 @@
+"""Desktop notifications (M3), off the event loop.
+
+`Notifier.notify()` only appends to a per-key window and returns. When a
+window closes, everything collected in it becomes one notification (a summary
+if there were several) on a bounded queue, and a few worker tasks hand them to
+the backend, each send under a timeout. A burst of 30 agents finishing in one
+group is one popup and one process spawn, and a hung `notify-send` costs a
+worker slot for `timeout_s`, never the control stream.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Protocol, TextIO
+
+# Bodies listed in a summary before "... and N more".
+SUMMARY_BODIES = 5
+
+_PLACEHOLDER = re.compile(r"\{(title|body)\}")
+
+
+@dataclass(frozen=True, slots=True)
+class Notification:
+    title: str
+    body: str
+    # Notifications with the same key inside one window are coalesced,
+    # e.g. "rule:<id>" or "group:<name>".
+    key: str
+    # Title when several were coalesced; `{n}` is replaced by how many.
+    summary: str = "{n} notifications"
+
+
+class Backend(Protocol):
+    name: str
+
+    async def send(self, title: str, body: str) -> None: ...
+
+
+class CommandBackend:
+    """Runs a notifier program; `{title}` / `{body}` in `argv` are filled in (no shell)."""
+
+    def __init__(self, name: str, argv: list[str]) -> None:
+        self.name = name
+        self.argv = argv
+
+    def command(self, title: str, body: str) -> list[str]:
+        # One pass per argument: a title containing "{body}" stays as it is.
+        values = {"title": title, "body": body}
+        return [_PLACEHOLDER.sub(lambda m: values[m.group(1)], a) for a in self.argv]
+
+    async def send(self, title: str, body: str) -> None:
+        argv = self.command(title, body)
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _out, err = await proc.communicate()
+        except asyncio.CancelledError:
+            # Timed out: do not leave the notifier process behind.
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+        if proc.returncode:
+            raise RuntimeError(f"{argv[0]} exited {proc.returncode}: {err.decode(errors='replace').strip()}")
+
+
+class OsascriptBackend(CommandBackend):
+    def __init__(self) -> None:
+        super().__init__("osascript", ["osascript", "-e"])
+
+    def command(self, title: str, body: str) -> list[str]:
+        # Placeholders would need AppleScript quoting; build the script instead.
+        return [*self.argv, f"display notification {_applescript_str(body)} with title {_applescript_str(title)}"]
+
+
+class FileBackend:
+    """One JSON line per notification, to a file or stdout (tests, headless hosts)."""
+
+    name = "file"
+
+    def __init__(self, path: Path | None = None, *, stream: TextIO | None = None) -> None:
+        self.path = path
+        self.stream = stream
+
+    async def send(self, title: str, body: str) -> None:
+        line = json.dumps({"at": round(time.time(), 3), "title": title, "body": body}) + "\n"
+        if self.path is None:
+            out = self.stream or sys.stdout
+            out.write(line)
+            out.flush()
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _applescript_str(s: str) -> str:
+    return '"' + s.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def make_backend(name: str, *, path: str = "", which: Callable[[str], str | None] = shutil.which) -> Backend | None:
+    """Backend by config name; "auto" picks the first notifier installed (None if there is none)."""
+
+    commands: dict[str, Callable[[], Backend]] = {
+        "terminal-notifier": lambda: CommandBackend(
+            "terminal-notifier", ["terminal-notifier", "-title", "{title}", "-message", "{body}", "-group", "amux"]
+        ),
+        "notify-send": lambda: CommandBackend("notify-send", ["notify-send", "--app-name=amux", "--", "{title}", "{body}"]),
+        "osascript": OsascriptBackend,
+    }
+    if name == "none":
+        return None
+    if name == "file":
+        return FileBackend(Path(path).expanduser() if path else None)
+    if name == "auto":
+        # terminal-notifier first on macOS, as the design doc prefers.
+        for candidate in commands:
+            if which(candidate):
+                return commands[candidate]()
+        return None
+    if name in commands:
+        return commands[name]()
+    raise ValueError(f"unknown notification backend: {name!r}")
+
+
+class Notifier:
+    """Coalescing windows in front of a bounded queue and a small worker pool."""
+
+    def __init__(
+        self,
+        backend: Backend,
+        *,
+        workers: int = 2,
+        queue_size: int = 64,
+        coalesce_s: float = 3.0,
+        timeout_s: float = 5.0,
+        on_result: Callable[[str], None] | None = None,
+    ) -> None:
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.coalesce_s = coalesce_s
+        self.timeout_s = timeout_s
+        self.on_result = on_result
+        self.stats = {"received": 0, "coalesced": 0, "sent": 0, "failed": 0, "timeouts": 0, "dropped": 0}
+        # key -> the first SUMMARY_BODIES notifications of its open window, and how many arrived
+        self._windows: dict[str, list[Notification]] = {}
+        self._counts: dict[str, int] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._queue: asyncio.Queue[tuple[str, str]] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, *, drain_s: float = 1.0) -> None:
+        """Flush open windows, give queued sends up to `drain_s`, then cancel the workers."""
+
+        for key in list(self._windows):
+            self._flush(key)
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_s)
+            except asyncio.TimeoutError:
+                pass
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self, n: Notification) -> None:
+        """Never blocks; the first notification for a key opens its window."""
+
+        self.stats["received"] += 1
+        window = self._windows.get(n.key)
+        if window is not None:
+            if len(window) < SUMMARY_BODIES:
+                window.append(n)
+            self._counts[n.key] += 1
+            return
+        if len(self._windows) >= self.queue_size:
+            self._count("dropped")
+            return
+        self._windows[n.key] = [n]
+        self._counts[n.key] = 1
+        loop = asyncio.get_running_loop()
+        self._timers[n.key] = loop.call_later(self.coalesce_s, self._flush, n.key)
+
+    def _flush(self, key: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        window = self._windows.pop(key, None)
+        count = self._counts.pop(key, 0)
+        if not window or self._queue is None:
+            return
+        title, body = coalesce(window, count)
+        self.stats["coalesced"] += count - 1
+        try:
+            self._queue.put_nowait((title, body))
+        except asyncio.QueueFull:
+            self._count("dropped")
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            title, body = await self._queue.get()
+            try:
+                await asyncio.wait_for(self.backend.send(title, body), timeout=self.timeout_s)
+                self._count("sent")
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+            except Exception as e:
+                self._count("failed")
+                print(f"amux: notification via {self.backend.name} failed: {e}", flush=True)
+            finally:
+                self._queue.task_done()
+
+    def _count(self, result: str) -> None:
+        self.stats[result] += 1
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "open_windows": len(self._windows),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self.stats,
+        }
+
+
+def coalesce(window: list[Notification], count: int) -> tuple[str, str]:
+    """(title, body) for the `count` notifications of one window (`window` holds the first few)."""
+
+    if count <= 1:
+        return window[0].title, window[0].body
+    bodies = [n.body for n in window[:SUMMARY_BODIES]]
+    if count > len(bodies):
+        bodies.append(f"... and {count - len(bodies)} more")
+    return window[0].summary.replace("{n}", str(count)), "\n".join(bodies)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from .tmux import EXTENDED_OUTPUT_PREFIX, OUTPUT_PREFIX
+
+# tmux control mode escapes bytes < 0x20 and `\` as `\ooo` (three octal digits).
+_OCTAL: dict[bytes, bytes] = {f"{i:03o}".encode(): bytes([i]) for i in range(256)}
+
+
+def unescape_output(data: bytes) -> bytes:
+    """Undo tmux's octal escaping of `%output` data.
+
+    Lines without a backslash are returned as-is; otherwise the work is one
+    `split` plus one dict lookup per escape, never a per-character loop.
+    """
+
+    if b"\\" not in data:
+        return data
+
+    parts = data.split(b"\\")
+    out = [parts[0]]
+    for part in parts[1:]:
+        ch = _OCTAL.get(part[:3])
+        if ch is None:
+            # Not an escape tmux would produce; keep it verbatim.
+            out.append(b"\\")
+            out.append(part)
+        else:
+            out.append(ch)
+            out.append(part[3:])
+    return b"".join(out)
+
+
+def parse_output_line(raw: bytes) -> tuple[str, bytes] | None:
+    """Parse `%output %<pane> <data>` into `(pane_id, unescaped bytes)`."""
+
+    if not raw.startswith(OUTPUT_PREFIX):
+        return None
+    sep = raw.find(b" ", len(OUTPUT_PREFIX))
+    if sep < 0:
+        return None
+    pane_id = raw[len(OUTPUT_PREFIX) : sep].decode("ascii", errors="replace")
+    return pane_id, unescape_output(raw[sep + 1 :])
+
+
+def parse_extended_output(raw: bytes) -> tuple[str, int, bytes] | None:
+    """Parse `%extended-output %<pane> <age ms> ... : <data>` into `(pane_id, age_ms, bytes)`."""
+
+    if not raw.startswith(EXTENDED_OUTPUT_PREFIX):
+        return None
+    sep = raw.find(b" : ", len(EXTENDED_OUTPUT_PREFIX))
+    if sep < 0:
+        return None
+    fields = raw[len(EXTENDED_OUTPUT_PREFIX) : sep].split(b" ")
+    try:
+        age_ms = int(fields[1])
+    except (IndexError, ValueError):
+        age_ms = 0
+    return fields[0].decode("ascii", errors="replace"), age_ms, unescape_output(raw[sep + 3 :])
+
+
+class RingBuffer:
+    """Fixed-capacity byte ring: keeps the most recent `capacity` bytes."""
+
+    __slots__ = ("capacity", "total", "_buf", "_end", "_size")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.total = 0  # bytes ever written
+        self._buf = bytearray(capacity)
+        self._end = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: bytes) -> None:
+        n = len(data)
+        if not n:
+            return
+        self.total += n
+        cap = self.capacity
+
+        if n >= cap:
+            self._buf[:] = data[n - cap :]
+            self._end = 0
+            self._size = cap
+            return
+
+        end = self._end
+        first = min(n, cap - end)
+        self._buf[end : end + first] = data[:first]
+        if first < n:
+            self._buf[: n - first] = data[first:]
+        self._end = (end + n) % cap
+        self._size = min(cap, self._size + n)
+
+    def tail(self, n: int | None = None) -> bytes:
+        """Return the last `n` bytes (everything buffered if `n` is None)."""
+
+        size = self._size if n is None else max(0, min(n, self._size))
+        if not size:
+            return b""
+        start = (self._end - size) % self.capacity
+        if start + size <= self.capacity:
+            return bytes(self._buf[start : start + size])
+        return bytes(self._buf[start:]) + bytes(self._buf[: self._end])
+
+
+class OutputBuffers:
+    """Per-pane `RingBuffer`s with a cap on total memory.
+
+    Every pane gets `per_pane_bytes`; when adding a pane would exceed
+    `total_bytes`, the pane that has been quiet the longest loses its buffer.
+    """
+
+    def __init__(self, *, per_pane_bytes: int, total_bytes: int) -> None:
+        self.per_pane_bytes = per_pane_bytes
+        self.max_panes = max(1, total_bytes // per_pane_bytes)
+        self._bufs: OrderedDict[str, RingBuffer] = OrderedDict()
+
+    def __contains__(self, pane_id: str) -> bool:
+        return pane_id in self._bufs
+
+    @property
+    def used_bytes(self) -> int:
+        return len(self._bufs) * self.per_pane_bytes
+
+    def append(self, pane_id: str, data: bytes) -> None:
+        buf = self._bufs.get(pane_id)
+        if buf is None:
+            while len(self._bufs) >= self.max_panes:
+                self._bufs.popitem(last=False)
+            buf = self._bufs[pane_id] = RingBuffer(self.per_pane_bytes)
+        else:
+            self._bufs.move_to_end(pane_id)
+        buf.write(data)
+
+    def tail(self, pane_id: str, n: int | None = None) -> bytes:
+        buf = self._bufs.get(pane_id)
+        return buf.tail(n) if buf is not None else b""
+
+    def discard(self, pane_id: str) -> None:
+        self._bufs.pop(pane_id, None)
@@ -0,0 +1,323 @@
+"""Per-pane output logs: segment files with a time index, compressed on roll.
+
+Layout under `<state dir>/logs/pane-<N>/`, one segment per `<start ms>`:
+
+    1760000000000.log   active segment, raw `%output` bytes, appended to
+    1760000000000.idx   "<unix ms> <raw offset>[ <compressed offset>]" per index point
+    1759990000000.log.gz  rolled segment
+
+An index point is added every `index_bytes` of output or `index_interval_s`,
+whichever comes first. On roll every index interval is compressed as its own
+gzip member (or xz stream), so the result is still a plain `.gz`/`.xz` file
+and a reader can seek to the compressed offset of any index point and
+decompress from there instead of from the start of the segment.
+"""
+
+from __future__ import annotations
+
+import gzip
+import lzma
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+COMPRESSORS: dict[str, tuple[str, Callable[[bytes], bytes]]] = {
+    "gzip": (".gz", lambda b: gzip.compress(b, mtime=0)),
+    "lzma": (".xz", lambda b: lzma.compress(b)),
+}
+READ_CHUNK = 64 * 1024
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def log_dir(state_path: Path) -> Path:
+    return state_path.with_name("logs")
+
+
+def pane_dir(root: Path, pane_id: str) -> Path:
+    return root / f"pane-{pane_id.lstrip('%')}"
+
+
+def parse_duration(text: str) -> float:
+    """`90`, `30s`, `10m`, `2h`, `1d` -> seconds."""
+
+    m = _DURATION.match(text)
+    if m is None:
+        raise ValueError(f"bad duration: {text!r} (use e.g. 30s, 10m, 2h, 1d)")
+    return float(m.group(1)) * _UNITS[m.group(2)]
+
+
+@dataclass
+class _Active:
+    path: Path
+    started: float
+    size: int = 0
+    indexed_size: int = -1
+    indexed_at: float = float("-inf")
+    unflushed_index: list[str] = field(default_factory=list)
+    file: BinaryIO | None = None
+
+
+class PaneLogs:
+    """Appends pane output to per-pane segments; rolling and retention are driven by the caller.
+
+    `write()` is on the `%output` path and only appends to a buffered file;
+    `flush()` pushes buffers and new index points to disk. Segments that
+    filled up (`segment_bytes`), got old (`segment_s`) or belong to a closed
+    pane come out of `take_rolled()`, for `compress_segment()` to run off the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        segment_bytes: int = 1024 * 1024,
+        segment_s: float = 3600.0,
+        index_bytes: int = 64 * 1024,
+        index_interval_s: float = 10.0,
+        max_open: int = 128,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.segment_s = segment_s
+        self.index_bytes = index_bytes
+        self.index_interval_s = index_interval_s
+        self.max_open = max(1, max_open)
+        self.clock = clock
+        self.bytes_written = 0
+        self._active: dict[str, _Active] = {}
+        self._open: dict[str, _Active] = {}  # panes with an open file, least recently written first
+        self._rolled: list[Path] = []
+
+    def write(self, pane_id: str, data: bytes) -> None:
+        seg = self._active.get(pane_id)
+        now = self.clock()
+        if seg is None:
+            seg = self._start(pane_id, now)
+        if seg.size - seg.indexed_size >= self.index_bytes or now - seg.indexed_at >= self.index_interval_s:
+            seg.unflushed_index.append(f"{int(now * 1000)} {seg.size}\n")
+            seg.indexed_size = seg.size
+            seg.indexed_at = now
+        f = seg.file
+        if f is None:
+            f = self._reopen(pane_id, seg)
+        else:
+            self._open[pane_id] = self._open.pop(pane_id)
+        f.write(data)
+        seg.size += len(data)
+        self.bytes_written += len(data)
+        if seg.size >= self.segment_bytes:
+            self.roll(pane_id)
+
+    def _start(self, pane_id: str, now: float) -> _Active:
+        d = pane_dir(self.root, pane_id)
+        d.mkdir(parents=True, exist_ok=True)
+        ms = int(now * 1000)
+        while (d / f"{ms}.log").exists() or (d / f"{ms}.idx").exists():
+            ms += 1  # two segments in one millisecond
+        seg = self._active[pane_id] = _Active(d / f"{ms}.log", now)
+        return seg
+
+    def _reopen(self, pane_id: str, seg: _Active) -> BinaryIO:
+        while len(self._open) >= self.max_open:
+            lru = next(iter(self._open))
+            self._close_file(lru, self._open[lru])
+        seg.file = open(seg.path, "ab")
+        self._open[pane_id] = seg
+        return seg.file
+
+    def _close_file(self, pane_id: str, seg: _Active) -> None:
+        self._flush_segment(seg)
+        if seg.file is not None:
+            seg.file.close()
+            seg.file = None
+        self._open.pop(pane_id, None)
+
+    def _flush_segment(self, seg: _Active) -> None:
+        if seg.file is not None:
+            seg.file.flush()
+        if seg.unflushed_index:
+            with open(seg.path.with_suffix(".idx"), "a", encoding="ascii") as f:
+                f.writelines(seg.unflushed_index)
+            seg.unflushed_index.clear()
+
+    def flush(self) -> None:
+        """Write buffered output and index points; roll segments older than `segment_s`."""
+
+        now = self.clock()
+        for pane_id, seg in list(self._active.items()):
+            if now - seg.started >= self.segment_s:
+                self.roll(pane_id)
+            else:
+                self._flush_segment(seg)
+
+    def roll(self, pane_id: str) -> None:
+        """End the pane's active segment; the next write starts a new one."""
+
+        seg = self._active.pop(pane_id, None)
+        if seg is None:
+            return
+        self._close_file(pane_id, seg)
+        self._rolled.append(seg.path)
+
+    def take_rolled(self) -> list[Path]:
+        rolled, self._rolled = self._rolled, []
+        return rolled
+
+    def close(self) -> None:
+        """Flush and close everything; active segments stay raw until `pending_raw()` picks them up."""
+
+        for pane_id, seg in list(self._active.items()):
+            self._close_file(pane_id, seg)
+        self._active.clear()
+
+    def pending_raw(self) -> list[Path]:
+        """Raw segments no one is writing to (left by a previous daemon), to compress."""
+
+        active = {seg.path for seg in self._active.values()}
+        return sorted(p for p in self.root.glob("pane-*/*.log") if p not in active)
+
+    def active_bytes(self) -> int:
+        return sum(seg.size for seg in self._active.values())
+
+
+def _read_index(path: Path) -> list[tuple[int, ...]]:
+    try:
+        text = path.read_text(encoding="ascii")
+    except OSError:
+        return []
+    out = []
+    for line in text.splitlines():
+        try:
+            out.append(tuple(int(x) for x in line.split()))
+        except ValueError:
+            continue  # torn last line after a crash
+    return out
+
+
+def compress_segment(raw: Path, method: str = "gzip") -> Path:
+    """Compress a rolled segment one index interval at a time and rewrite its index.
+
+    The raw file is removed last, so a segment that still has its `.log` after
+    a crash is simply compressed again.
+    """
+
+    ext, compress = COMPRESSORS[method]
+    idx = raw.with_suffix(".idx")
+    size = raw.stat().st_size
+    mtime = raw.stat().st_mtime
+    points = [(e[0], e[1]) for e in _read_index(idx) if len(e) >= 2 and e[1] < size]
+    if not points or points[0][1] != 0:
+        points.insert(0, (int(raw.stem), 0))
+    out = raw.with_name(raw.name + ext)
+    tmp_out = out.with_name(out.name + ".tmp")
+    tmp_idx = idx.with_name(idx.name + ".tmp")
+    lines = []
+    with open(raw, "rb") as src, open(tmp_out, "wb") as dst:
+        for i, (ts, off) in enumerate(points):
+            end = points[i + 1][1] if i + 1 < len(points) else size
+            if end <= off:
+                continue
+            src.seek(off)
+            lines.append(f"{ts} {off} {dst.tell()}\n")
+            dst.write(compress(src.read(end - off)))
+    tmp_idx.write_text("".join(lines), encoding="ascii")
+    os.replace(tmp_out, out)
+    os.replace(tmp_idx, idx)
+    os.utime(out, (mtime, mtime))
+    raw.unlink()
+    return out
+
+
+@dataclass(frozen=True, slots=True)
+class Segment:
+    data: Path
+    index: Path
+    started: float
+    ended: float  # last write (file mtime)
+    bytes: int  # on disk
+    compressed: bool
+
+
+def list_segments(pane_root: Path) -> list[Segment]:
+    """A pane's segments, oldest first."""
+
+    by_stem: dict[str, Segment] = {}
+    for data in pane_root.iterdir() if pane_root.is_dir() else ():
+        name = data.name
+        stem, _, ext = name.partition(".")
+        if not stem.isdigit() or ext not in ("log", "log.gz", "log.xz"):
+            continue
+        try:
+            st = data.stat()
+        except OSError:
+            continue
+        seg = Segment(data, data.with_name(f"{stem}.idx"), int(stem) / 1000, st.st_mtime, st.st_size, ext != "log")
+        # Raw and compressed side by side: compression did not finish, the raw one is complete.
+        if stem not in by_stem or not seg.compressed:
+            by_stem[stem] = seg
+    return sorted(by_stem.values(), key=lambda s: s.started)
+
+
+def enforce_retention(root: Path, *, total_bytes: int, max_age_s: float) -> list[Path]:
+    """Delete rolled segments older than `max_age_s`, then the oldest until under `total_bytes`.
+
+    Raw segments (being written, or waiting to be compressed) count towards
+    the total but are never deleted here.
+    """
+
+    segments = sorted((s for d in root.glob("pane-*") for s in list_segments(d)), key=lambda s: s.ended)
+    total = sum(s.bytes for s in segments)
+    cutoff = time.time() - max_age_s if max_age_s > 0 else float("-inf")
+    removed = []
+    for s in segments:
+        if not s.compressed:
+            continue
+        if s.ended >= cutoff and (total_bytes <= 0 or total <= total_bytes):
+            continue
+        for p in (s.data, s.index):
+            p.unlink(missing_ok=True)
+        total -= s.bytes
+        removed.append(s.data)
+    return removed
+
+
+def _decompressor(seg: Segment, f: BinaryIO) -> BinaryIO:
+    if seg.data.name.endswith(".gz"):
+        return gzip.GzipFile(fileobj=f)  # type: ignore[return-value]
+    return lzma.LZMAFile(f)  # type: ignore[return-value]
+
+
+def read_since(root: Path, pane_id: str, since: float | None = None) -> Iterator[bytes]:
+    """What `pane_id` printed since `since` (unix time; None = everything kept).
+
+    Starts at the last index point at or before `since`, so up to one index
+    interval of older output may come first.
+    """
+
+    segments = list_segments(pane_dir(root, pane_id))
+    for i, seg in enumerate(segments):
+        # A segment ends where the next one starts, whatever its mtime says.
+        if since is not None and (seg.ended < since or (i + 1 < len(segments) and segments[i + 1].started <= since)):
+            continue  # all of it is older
+        raw_off = comp_off = 0
+        if since is not None and seg.started < since:
+            since_ms = since * 1000
+            for p in _read_index(seg.index):
+                if p[0] > since_ms:
+                    break
+                raw_off, comp_off = p[1], (p[2] if len(p) > 2 else 0)
+        with open(seg.data, "rb") as f:
+            if not seg.compressed:
+                f.seek(raw_off)
+                yield from iter(lambda: f.read(READ_CHUNK), b"")
+                continue
+            f.seek(comp_off)
+            with _decompressor(seg, f) as z:
+                yield from iter(lambda: z.read(READ_CHUNK), b"")
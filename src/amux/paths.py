@@ -11,3 +11,11 @@ def xdg_state_home() -> Path:
 
 def amux_state_root() -> Path:
     return xdg_state_home() / "amux"
+
+
+def xdg_config_home() -> Path:
+    return Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config")).expanduser()
+
+
+def amux_config_path() -> Path:
+    return xdg_config_home() / "amux" / "config.toml"
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping
+
+# Matched against the space-joined argv of every process in a pane's tree.
+DEFAULT_AGENT_SIGNATURES: dict[str, str] = {
+    "claude": r"(^|[\s/])claude(\s|$)|@anthropic-ai/claude-code",
+    "codex": r"(^|[\s/])codex(\s|$)|@openai/codex",
+    "gemini": r"(^|[\s/])gemini(\s|$)|@google/gemini-cli",
+    "aider": r"(^|[\s/])aider(\s|$)",
+    "opencode": r"(^|[\s/])opencode(\s|$)",
+}
+
+MAX_TREE = 256  # processes looked at per pane
+
+
+@dataclass(slots=True)
+class ProcStat:
+    ppid: int
+    starttime: int  # clock ticks after boot; (pid, starttime) names one process
+    # utime + stime + cutime + cstime: CPU of the process and its reaped children.
+    cpu_ticks: int = 0
+
+
+def parse_stat(text: str) -> ProcStat | None:
+    """ppid, starttime and CPU ticks from `/proc/<pid>/stat` (comm may contain spaces and parens)."""
+
+    _head, sep, rest = text.rpartition(")")
+    if not sep:
+        return None
+    fields = rest.split()
+    try:
+        # `rest` starts at field 3: field 4 is ppid, 14-17 the CPU times, 22 starttime.
+        return ProcStat(
+            ppid=int(fields[1]),
+            starttime=int(fields[19]),
+            cpu_ticks=int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14]),
+        )
+    except (IndexError, ValueError):
+        return None
+
+
+def read_procs(proc_root: Path = Path("/proc")) -> dict[int, ProcStat]:
+    """Every process's `stat`, in one pass over `/proc`."""
+
+    procs: dict[int, ProcStat] = {}
+    try:
+        entries = os.scandir(proc_root)
+    except OSError:
+        return procs
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if not name.isdigit():
+                continue
+            try:
+                with open(f"{entry.path}/stat", encoding="utf-8", errors="replace") as f:
+                    st = parse_stat(f.read())
+            except OSError:
+                continue  # exited meanwhile
+            if st is not None:
+                procs[int(name)] = st
+    return procs
+
+
+def pane_trees(procs: Mapping[int, ProcStat], pane_pids: Mapping[str, int | None]) -> dict[str, list[int]]:
+    """Pids under each pane's `pane_pid`, breadth-first (empty if the pane has no live pid)."""
+
+    children: dict[int, list[int]] = {}
+    for pid, st in procs.items():
+        children.setdefault(st.ppid, []).append(pid)
+    trees: dict[str, list[int]] = {}
+    for pane_id, root in pane_pids.items():
+        if root is None or root not in procs:
+            trees[pane_id] = []
+            continue
+        tree, i = [root], 0
+        while i < len(tree) and len(tree) < MAX_TREE:
+            tree.extend(children.get(tree[i], ()))
+            i += 1
+        trees[pane_id] = tree
+    return trees
+
+
+class AgentScanner:
+    """Which agent runs in each pane, from one `/proc` pass for all panes.
+
+    Each tick reads `/proc/<pid>/stat` once per process to build the process
+    tree, then walks the tree under every pane's `pane_pid`. Command lines are
+    read and matched once per (pid, starttime) and cached, so a tree made of
+    the same processes as last tick costs no further reads, and a pane whose
+    tree is unchanged is skipped outright.
+    """
+
+    def __init__(
+        self,
+        signatures: Mapping[str, str] | None = None,
+        *,
+        proc_root: Path = Path("/proc"),
+    ) -> None:
+        sigs = DEFAULT_AGENT_SIGNATURES if signatures is None else signatures
+        self.signatures: list[tuple[str, re.Pattern[str]]] = []
+        for name, pattern in sigs.items():
+            if not pattern:
+                continue  # "" switches a default signature off
+            try:
+                self.signatures.append((name, re.compile(pattern)))
+            except (re.error, TypeError) as e:
+                print(f"amux: skipping invalid agent signature {name!r}: {e}", flush=True)
+        self.proc_root = proc_root
+        self.scans = 0
+        self.cmdline_reads = 0
+        # (pid, starttime) -> matched agent (None: no signature matched)
+        self._matches: dict[tuple[int, int], str | None] = {}
+        # pane_id -> (pane pid, frozenset of (pid, starttime) in its tree), agent
+        self._trees: dict[str, tuple[tuple[int, frozenset[tuple[int, int]]], str | None]] = {}
+
+    @staticmethod
+    def available(proc_root: Path = Path("/proc")) -> bool:
+        return (proc_root / "self" / "stat").exists()
+
+    def _cmdline(self, pid: int) -> str:
+        self.cmdline_reads += 1
+        try:
+            with open(self.proc_root / str(pid) / "cmdline", "rb") as f:
+                raw = f.read()
+        except OSError:
+            return ""
+        return raw.rstrip(b"\0").replace(b"\0", b" ").decode("utf-8", errors="replace")
+
+    def _match(self, pid: int, starttime: int) -> str | None:
+        key = (pid, starttime)
+        if key in self._matches:
+            return self._matches[key]
+        cmdline = self._cmdline(pid)
+        agent = next((name for name, rx in self.signatures if rx.search(cmdline)), None)
+        self._matches[key] = agent
+        return agent
+
+    def scan(self, pane_pids: Mapping[str, int | None]) -> dict[str, str | None]:
+        """Agent per pane (None if none matched) for panes whose process tree changed."""
+
+        procs = read_procs(self.proc_root)
+        return self.scan_trees(procs, pane_trees(procs, pane_pids))
+
+    def scan_trees(self, procs: Mapping[int, ProcStat], trees: Mapping[str, list[int]]) -> dict[str, str | None]:
+        """`scan()` over a `/proc` pass and pane trees the caller already has."""
+
+        self.scans += 1
+        changed: dict[str, str | None] = {}
+        for pane_id, tree in trees.items():
+            key = (tree[0] if tree else 0, frozenset((pid, procs[pid].starttime) for pid in tree))
+            cached = self._trees.get(pane_id)
+            if cached is not None and cached[0] == key:
+                continue
+            agent = None
+            # Breadth-first order: the process closest to the pane's shell wins.
+            for pid in tree:
+                agent = self._match(pid, procs[pid].starttime)
+                if agent is not None:
+                    break
+            self._trees[pane_id] = (key, agent)
+            if cached is None or cached[1] != agent:
+                changed[pane_id] = agent
+
+        # Forget processes and panes that are gone.
+        self._matches = {k: v for k, v in self._matches.items() if k[0] in procs and procs[k[0]].starttime == k[1]}
+        for pane_id in [p for p in self._trees if p not in trees]:
+            del self._trees[pane_id]
+        return changed
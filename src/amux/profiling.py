@@ -0,0 +1,266 @@
+"""Sampling profiler for a running daemon.
+
+While enabled, a CPU-time timer (`ITIMER_PROF`) interrupts the daemon every
+`interval_s` of CPU it burns and the signal handler counts the current Python
+stack; an idle daemon takes no samples and pays nothing. `tracemalloc` can run
+alongside for the top allocation sites. Every window is written as one JSON
+dump under `<state dir>/profiles/`, the newest `keep` are kept, and
+`summarize()` folds them into the report `amux daemon profile --top` prints.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import signal
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Iterable
+
+from .state import atomic_write_text
+
+# Where CPU goes, by the innermost frame of a sample that is ours (or the
+# subprocess machinery); entries are modules or `module:function`. Frames in
+# SHARED modules (the pane model, counters) are used by everyone and skipped.
+# Anything else in amux is "other"; samples with no amux frame at all are the
+# event loop itself.
+CATEGORIES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("subprocess", ("subprocess", "asyncio.subprocess", "asyncio.base_subprocess", "asyncio.unix_events")),
+    ("parsing", ("amux.tmux", "amux.tmux_async", "amux.output", "amux.resync", "amux.linereader")),
+    ("matching", ("amux.watch",)),
+    ("state writes", (
+        "amux.store", "amux.journal", "amux.statusline",
+        "amux.state:atomic_write_text", "amux.state:save_state", "amux.state:state_payload", "amux.state:pane_json",
+    )),
+    ("api", ("amux.api",)),
+)
+SHARED = ("amux.state", "amux.metrics")
+EVENT_LOOP = "event loop"
+OTHER = "other amux"
+
+MAX_DEPTH = 64
+
+
+def profile_dir(state_path: Path) -> Path:
+    return state_path.with_name("profiles")
+
+
+class Profiler:
+    """Stack sampler plus optional tracemalloc, dumped in rotating windows."""
+
+    def __init__(
+        self,
+        out_dir: Path,
+        *,
+        interval_s: float = 0.01,
+        window_s: float = 60.0,
+        keep: int = 20,
+        tracemalloc_frames: int = 1,
+        top_allocations: int = 25,
+    ) -> None:
+        self.out_dir = out_dir
+        self.interval_s = interval_s
+        self.window_s = window_s
+        self.keep = keep
+        self.tracemalloc_frames = tracemalloc_frames
+        self.top_allocations = top_allocations
+        self.enabled = False
+        self.dumps = 0
+        self._stacks: Counter[tuple[CodeType, ...]] = Counter()
+        self._modules: dict[CodeType, str] = {}
+        self._window_start = 0.0
+        self._window_wall = 0.0
+        self._cpu_start = 0.0
+        self._own_tracemalloc = False
+        self._prev_handler: Any = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    def start(self) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self._reset_window()
+        if self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self._own_tracemalloc = True
+        self._prev_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval_s, self.interval_s)
+        self._arm()
+
+    def _arm(self) -> None:
+        # Inside the daemon's loop, windows roll on their own; otherwise call rotate().
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self.window_s > 0:
+            self._timer = loop.call_later(self.window_s, self._roll)
+
+    def _roll(self) -> None:
+        try:
+            self.rotate()
+        except OSError as e:
+            print(f"amux: cannot write profile: {e}", flush=True)
+        self._arm()
+
+    def stop(self) -> Path | None:
+        """Stop sampling; returns the dump of the last (partial) window."""
+
+        if not self.enabled:
+            return None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._prev_handler or signal.SIG_DFL)
+        path = self.rotate()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+        self.enabled = False
+        return path
+
+    def _sample(self, _signum: int, frame: FrameType | None) -> None:
+        stack = []
+        modules = self._modules
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            if code not in modules:
+                modules[code] = frame.f_globals.get("__name__", "?")
+            stack.append(code)
+            frame = frame.f_back
+        self._stacks[tuple(stack)] += 1
+
+    def _reset_window(self) -> None:
+        self._stacks = Counter()
+        self._window_start = time.monotonic()
+        self._window_wall = time.time()
+        self._cpu_start = time.process_time()
+
+    def rotate(self) -> Path | None:
+        """Write the current window out and start a new one."""
+
+        if not self.enabled:
+            return None
+        stacks, modules = self._stacks, self._modules
+        dump = {
+            "started_at": round(self._window_wall, 3),
+            "duration_s": round(time.monotonic() - self._window_start, 3),
+            "cpu_s": round(time.process_time() - self._cpu_start, 3),
+            "interval_s": self.interval_s,
+            "samples": sum(stacks.values()),
+            # Collapsed stacks, root first (flamegraph.pl input format).
+            "stacks": {
+                ";".join(f"{modules.get(c, '?')}:{c.co_qualname}" for c in reversed(stack)): n
+                for stack, n in stacks.most_common()
+            },
+            "allocations": self._top_allocations(),
+        }
+        self._reset_window()
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(dump["started_at"]))
+        path = self.out_dir / f"profile-{stamp}-{self.dumps:04d}.json"
+        atomic_write_text(path, json.dumps(dump, separators=(",", ":")) + "\n")
+        self.dumps += 1
+        for old in list_dumps(self.out_dir)[: -max(1, self.keep)]:
+            old.unlink(missing_ok=True)
+        return path
+
+    def _top_allocations(self) -> list[dict[str, Any]]:
+        if not tracemalloc.is_tracing():
+            return []
+        snap = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        return [
+            {"where": f"{st.traceback[0].filename}:{st.traceback[0].lineno}", "bytes": st.size, "count": st.count}
+            for st in snap.statistics("lineno")[: self.top_allocations]
+        ]
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "interval_s": self.interval_s,
+            "tracemalloc": tracemalloc.is_tracing(),
+            "window_samples": sum(self._stacks.values()) if self.enabled else 0,
+            "dumps_written": self.dumps,
+            "dir": str(self.out_dir),
+        }
+
+
+def list_dumps(out_dir: Path) -> list[Path]:
+    """Profile dumps, oldest first."""
+
+    return sorted(out_dir.glob("profile-*.json"))
+
+
+def categorize(stack: list[str]) -> str:
+    """Category for one collapsed stack (frames `module:function`, root first)."""
+
+    for frame in reversed(stack):
+        module = frame.partition(":")[0]
+        for name, where in CATEGORIES:
+            if module in where or frame in where:
+                return name
+        if module.startswith("amux.") and module not in SHARED:
+            return OTHER
+    return EVENT_LOOP
+
+
+def summarize(paths: Iterable[Path], top: int = 15) -> dict[str, Any]:
+    """Fold dumps into totals: CPU by category, hottest functions, allocations."""
+
+    samples = 0
+    cpu_s = 0.0
+    categories: Counter[str] = Counter()
+    self_counts: Counter[str] = Counter()
+    total_counts: Counter[str] = Counter()
+    allocations: list[dict[str, Any]] = []
+    dumps = 0
+    for path in paths:
+        try:
+            dump = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        dumps += 1
+        cpu_s += dump.get("cpu_s", 0.0)
+        for collapsed, n in dump.get("stacks", {}).items():
+            stack = collapsed.split(";")
+            samples += n
+            categories[categorize(stack)] += n
+            self_counts[stack[-1]] += n
+            for frame in set(stack):
+                total_counts[frame] += n
+        # Allocations are live memory at the end of a window; the newest wins.
+        allocations = dump.get("allocations") or allocations
+
+    def pct(n: int) -> float:
+        return round(100 * n / samples, 1) if samples else 0.0
+
+    return {
+        "dumps": dumps,
+        "samples": samples,
+        "cpu_s": round(cpu_s, 3),
+        "categories": {name: pct(n) for name, n in categories.most_common()},
+        "self": [(frame, pct(n)) for frame, n in self_counts.most_common(top)],
+        "inclusive": [(frame, pct(n)) for frame, n in total_counts.most_common(top)],
+        "allocations": allocations[:top],
+    }
+
+
+def format_summary(summary: dict[str, Any]) -> str:
+    lines = [f"{summary['dumps']} dumps, {summary['samples']} samples, {summary['cpu_s']} s CPU", "", "by category:"]
+    lines += [f"  {p:5.1f}%  {name}" for name, p in summary["categories"].items()]
+    lines += ["", "self (leaf frame):"]
+    lines += [f"  {p:5.1f}%  {frame}" for frame, p in summary["self"]]
+    lines += ["", "inclusive:"]
+    lines += [f"  {p:5.1f}%  {frame}" for frame, p in summary["inclusive"]]
+    if summary["allocations"]:
+        lines += ["", "top allocations (newest dump):"]
+        lines += [f"  {a['bytes']:>12,d} B {a['count']:>8,d}x  {a['where']}" for a in summary["allocations"]]
+    return "\n".join(lines)
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Iterable, Iterator
+
+from .state import PaneState
 
 # tmux 3.6a fields.
 # We use tab as a delimiter to avoid ambiguity in paths/commands.
-LIST_PANES_FORMAT = "#{pane_id}\t#{pane_pid}\t#{pane_current_command}\t#{pane_current_path}"
+LIST_PANES_FORMAT = "#{pane_id}\t#{pane_pid}\t#{pane_current_command}\t#{pane_current_path}\t#{window_id}"
 
 
-def parse_list_panes_payload(payload: str) -> dict[str, dict[str, Any]]:
-    """Parse `list-panes -a -F <format>` payload into a dict keyed by pane_id."""
+PaneRow = tuple[str, int, str, str, str | None]  # pane_id, pid, command, cwd, window
 
-    panes: dict[str, dict[str, Any]] = {}
+
+def iter_list_panes_rows(payload: str) -> Iterator[PaneRow]:
+    """Yield `(pane_id, pid, command, cwd, window)` per well-formed line."""
 
     for raw_line in payload.splitlines():
         line = raw_line.strip("\n")
@@ -20,11 +23,137 @@ def parse_list_panes_payload(payload: str) -> dict[str, dict[str, Any]]:
         if len(parts) < 4:
             # Best-effort: ignore malformed lines.
             continue
-        pane_id, pid_s, cmd, cwd = parts[0], parts[1], parts[2], parts[3]
         try:
-            pid = int(pid_s)
+            pid = int(parts[1])
         except ValueError:
             pid = 0
-        panes[pane_id] = {"pid": pid, "command": cmd, "cwd": cwd}
+        window = parts[4] if len(parts) > 4 and parts[4].startswith("@") else None
+        yield parts[0], pid, parts[2], parts[3], window
+
+
+def parse_list_panes_payload(payload: str) -> dict[str, PaneState]:
+    """Parse `list-panes -a -F <format>` payload into a dict keyed by pane_id."""
+
+    return {row[0]: PaneState(*row) for row in iter_list_panes_rows(payload)}
+
+
+# Events that change which panes exist (or their fields) and what to refresh.
+_WINDOW_REFRESH_EVENTS = ("%window-add", "%unlinked-window-add", "%layout-change", "%window-renamed")
+_WINDOW_CLOSE_EVENTS = ("%window-close", "%unlinked-window-close")
+
+
+class PaneTracker:
+    """Keep a pane map current from control-mode lifecycle events.
+
+    Events only mark windows/panes/sessions dirty (or drop closed windows);
+    `refresh_commands()` turns the dirty set into targeted `list-panes -t` /
+    `display-message` queries whose responses go back through `apply()`.
+    A full `list-panes -a` is only needed on (re)connect.
+
+    Existing `PaneState` records are updated in place, so amux's own fields
+    (agent, task, ...) survive a refresh and a resync allocates only for new
+    panes. Ids of panes added, changed or removed go into `changed` (the
+    state store's `changed_panes`, so the journal diffs only those).
+    """
+
+    def __init__(self, panes: dict[str, PaneState] | None = None, *, changed: set[str] | None = None) -> None:
+        self.panes: dict[str, PaneState] = panes if panes is not None else {}
+        self.changed: set[str] = changed if changed is not None else set()
+        self.dirty_windows: set[str] = set()
+        self.dirty_panes: set[str] = set()
+        self.dirty_sessions: set[str] = set()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.dirty_windows or self.dirty_panes or self.dirty_sessions)
+
+    def apply_full(self, payload: str) -> list[str]:
+        """Adopt a full `list-panes -a` result; returns pane ids that vanished."""
+
+        seen = self._upsert(iter_list_panes_rows(payload))
+        gone = [pid for pid in self.panes if pid not in seen]
+        for pid in gone:
+            del self.panes[pid]
+        self.changed.update(gone)
+        self.dirty_windows.clear()
+        self.dirty_panes.clear()
+        self.dirty_sessions.clear()
+        return gone
+
+    def _upsert(self, rows: Iterable[PaneRow]) -> set[str]:
+        panes = self.panes
+        seen: set[str] = set()
+        for row in rows:
+            pane = panes.get(row[0])
+            if pane is None:
+                panes[row[0]] = PaneState(*row)
+                self.changed.add(row[0])
+            elif pane.update(*row[1:]):
+                self.changed.add(row[0])
+            seen.add(row[0])
+        return seen
+
+    def handle_event(self, line: str) -> list[str]:
+        """Apply one event line; returns pane ids removed by it (if any)."""
+
+        parts = line.split(" ", 2)
+        name = parts[0]
+        arg = parts[1] if len(parts) > 1 else ""
+
+        if name in _WINDOW_CLOSE_EVENTS:
+            self.dirty_windows.discard(arg)
+            return self.remove_window(arg)
+        if name in _WINDOW_REFRESH_EVENTS and arg.startswith("@"):
+            self.dirty_windows.add(arg)
+        elif name == "%pane-mode-changed" and arg.startswith("%"):
+            self.dirty_panes.add(arg)
+        elif name == "%session-changed" and arg.startswith("$"):
+            self.dirty_sessions.add(arg)
+        return []
+
+    def remove_window(self, window_id: str) -> list[str]:
+        gone = [pid for pid, p in self.panes.items() if p.window == window_id]
+        for pid in gone:
+            del self.panes[pid]
+            self.dirty_panes.discard(pid)
+        self.changed.update(gone)
+        return gone
+
+    def refresh_commands(self) -> list[tuple[str, str, str]]:
+        """Drain the dirty set into `(kind, id, command)` refresh queries."""
+
+        cmds: list[tuple[str, str, str]] = []
+        for sid in sorted(self.dirty_sessions):
+            cmds.append(("session", sid, f"list-panes -s -t '{sid}' -F '{LIST_PANES_FORMAT}'"))
+        for wid in sorted(self.dirty_windows):
+            cmds.append(("window", wid, f"list-panes -t '{wid}' -F '{LIST_PANES_FORMAT}'"))
+        for pid in sorted(self.dirty_panes):
+            pane = self.panes.get(pid)
+            if pane is not None and pane.window in self.dirty_windows:
+                continue  # covered by its window's refresh
+            cmds.append(("pane", pid, f"display-message -p -t '{pid}' '{LIST_PANES_FORMAT}'"))
+        self.dirty_sessions.clear()
+        self.dirty_windows.clear()
+        self.dirty_panes.clear()
+        return cmds
+
+    def apply(self, kind: str, target: str, payload: str, *, error: bool = False) -> list[str]:
+        """Merge a refresh response; returns pane ids that disappeared."""
+
+        if error:
+            # The target is gone (e.g. window closed before we asked).
+            if kind == "window":
+                return self.remove_window(target)
+            if kind == "pane" and self.panes.pop(target, None) is not None:
+                self.changed.add(target)
+                return [target]
+            return []
 
-    return panes
+        seen = self._upsert(iter_list_panes_rows(payload))
+        gone: list[str] = []
+        if kind == "window":
+            gone = [pid for pid, p in self.panes.items() if p.window == target and pid not in seen]
+            for pid in gone:
+                del self.panes[pid]
+            self.changed.update(gone)
+        return gone
@@ -0,0 +1,782 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import re
+import signal
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from .actions import Action, ActionExecutor, ActionJob, actions_stats_path, send_keys_command
+from .activity import BUSY, WAITING, ActivityTracker
+from .api import ApiServer
+from .config import AmuxConfig
+from .flow import FlowControl
+from .metrics import DaemonMetrics, metrics_textfile_path
+from .notify import Notification, Notifier, make_backend
+from .output import OutputBuffers, parse_extended_output, parse_output_line
+from .panelog import COMPRESSORS, PaneLogs, compress_segment, enforce_retention, log_dir
+from .procscan import DEFAULT_AGENT_SIGNATURES, AgentScanner, ProcStat, pane_trees, read_procs
+from .profiling import Profiler, profile_dir
+from .resync import LIST_PANES_FORMAT, PaneTracker
+from .snapshot import SUBSCRIBE_TTL_S, PaneSnapshot, SnapshotCache
+from .state import AmuxState, DaemonStatus, PaneState, load_state
+from .statusline import ALL, StatusLineCache, status_line_path
+from .store import StateStore
+from .subscribe import OutputSubscriptions, subscription_commands
+from .tmux import EXTENDED_OUTPUT_PREFIX, OUTPUT_PREFIX, TmuxTimeoutError, continue_commands
+from .tmux_async import AsyncTmuxControlClient
+from .tmux_target import TmuxTarget
+from .watch import WatchEngine, WatchMatch, WatchRule
+
+
+class DaemonRuntime:
+    """The daemon's event loop for one tmux server.
+
+    Everything runs on a single asyncio loop: the control-mode reader wakes it
+    for tmux output, timers (backoff) and stop requests wake it otherwise.
+    """
+
+    def __init__(
+        self,
+        target: TmuxTarget,
+        state_path: Path,
+        *,
+        config: AmuxConfig | None = None,
+        client_factory: Callable[..., AsyncTmuxControlClient] = AsyncTmuxControlClient,
+        api_path: Path | None = None,
+        profile: bool = False,
+        profiler: Profiler | None = None,
+    ) -> None:
+        self.target = target
+        self.state_path = state_path
+        self.api_path = api_path
+        self.api: ApiServer | None = None
+        self.config = config or AmuxConfig()
+        self.client_factory = client_factory
+        self.output = OutputBuffers(
+            per_pane_bytes=self.config.output.buffer_bytes,
+            total_bytes=self.config.output.total_bytes,
+        )
+        self.client: AsyncTmuxControlClient | None = None
+        self.metrics = DaemonMetrics()
+        # Sampling is process-wide: a supervisor shares one profiler between its runtimes.
+        self._owns_profiler = profiler is None
+        self.profiler = profiler or make_profiler(self.config, profile_dir(state_path))
+        self._profile_at_start = profile
+        agents = self.config.agents
+        self._procfs = AgentScanner.available()
+        self.agents: AgentScanner | None = None
+        if agents.enabled and self._procfs:
+            self.agents = AgentScanner({**DEFAULT_AGENT_SIGNATURES, **agents.signatures})
+        self.activity: ActivityTracker | None = None
+        if agents.status:
+            self.activity = ActivityTracker(busy_cpu=agents.busy_cpu_percent / 100, quiet_s=agents.quiet_s)
+        self.notifier: Notifier | None = None
+        notify = self.config.notify
+        try:
+            backend = make_backend(notify.backend, path=notify.file)
+        except ValueError as e:
+            print(f"amux: notifications off: {e}", flush=True)
+            backend = None
+        if backend is not None:
+            self.notifier = Notifier(
+                backend,
+                workers=notify.workers,
+                queue_size=notify.queue_size,
+                coalesce_s=notify.coalesce_s,
+                timeout_s=notify.timeout_s,
+                on_result=lambda result: self.metrics.notifications.inc(1, result),
+            )
+        actions = self.config.actions
+        self.actions = ActionExecutor(
+            send_keys=self._send_keys,
+            workers=actions.workers,
+            per_rule=actions.per_rule,
+            queue_size=actions.queue_size,
+            policy=actions.policy,
+            timeout_s=actions.timeout_s,
+            on_done=self._note_action,
+        )
+        self.watches = WatchEngine([])
+        self._rule_actions: dict[str, tuple[Action, ...]] = {}
+        flow = self.config.flow
+        self.flow = FlowControl(
+            min_hold_s=flow.min_hold_s, max_hold_s=flow.max_hold_s, resumes_per_s=flow.resumes_per_s
+        )
+        self._flow_task: asyncio.Task[None] | None = None
+        logs = self.config.logs
+        self.logs: PaneLogs | None = None
+        if logs.enabled and logs.compression not in COMPRESSORS:
+            print(f"amux: pane logs off: unknown compression {logs.compression!r}", flush=True)
+        elif logs.enabled:
+            self.logs = PaneLogs(
+                log_dir(state_path),
+                segment_bytes=logs.segment_bytes,
+                segment_s=logs.segment_s,
+                index_bytes=logs.index_bytes,
+                index_interval_s=logs.index_interval_s,
+            )
+        self.subs = OutputSubscriptions(capture_all=self.config.output.subscribe == "all" or self.logs is not None)
+        self.snapshots = SnapshotCache()
+        self._snap_client: AsyncTmuxControlClient | None = None
+        self._captures: dict[str, asyncio.Task[PaneSnapshot]] = {}
+        self._subs_task: asyncio.Task[None] | None = None
+        self._subs_client: AsyncTmuxControlClient | None = None
+        self._subs_supported = True
+        self._subs_expiry: asyncio.TimerHandle | None = None
+        self.store = StateStore(state_path)
+        self.tracker = PaneTracker(self.store.state.panes, changed=self.store.changed_panes)
+        self.status_line: StatusLineCache | None = None
+        self._status_client: AsyncTmuxControlClient | None = None
+        self._stop: asyncio.Event | None = None
+        self._stop_requested = False  # before run() started (e.g. a supervisor removing us right away)
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    def request_stop(self) -> None:
+        self._stop_requested = True
+        if self._stop is not None:
+            self._stop.set()
+
+    def install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+        loop.add_signal_handler(signal.SIGUSR2, self.toggle_profiling)
+
+    async def run(self) -> None:
+        self._stop = asyncio.Event()
+        if self._stop_requested:
+            self._stop.set()  # starts and shuts down cleanly, without connecting
+
+        cfg = self.config.state
+        self.store = StateStore(
+            self.state_path,
+            load_state(self.state_path),
+            debounce_s=cfg.write_debounce_ms / 1000,
+            fsync=cfg.fsync,
+            fsync_interval_s=cfg.fsync_interval_s,
+            journal=cfg.journal,
+            compact_every=cfg.compact_every,
+            history_generations=cfg.history_generations,
+        )
+        if self.config.status_line.enabled:
+            self.status_line = StatusLineCache(
+                status_line_path(self.state_path), separator=self.config.status_line.separator
+            )
+        self.store.on_write.append(self._note_state_write)
+        self.store.on_flush.append(self._update_status_line)
+        st = self.store.state
+        st.daemon = DaemonStatus(pid=os.getpid(), started_at=time.time(), tmux_state="disconnected")
+        self.tracker = PaneTracker(st.panes, changed=self.store.changed_panes)
+        self.load_watches(st.watches)
+        self.store.mark_dirty()
+        self.store.flush()
+        loop = asyncio.get_running_loop()
+        writer = loop.create_task(self.store.run())
+        probes = [loop.create_task(self._probe_loop_lag())]
+        if self.agents is not None or self.activity is not None:
+            probes.append(loop.create_task(self._scan_panes()))
+        if self.config.metrics.textfile_interval_s > 0:
+            probes.append(loop.create_task(self._write_metrics_periodically()))
+        if self.logs is not None:
+            probes.append(loop.create_task(self._maintain_logs()))
+        await self._start_api()
+        if self.notifier is not None:
+            self.notifier.start()
+        if self._profile_at_start:
+            self.set_profiling(True)
+
+        try:
+            await self._connect_loop()
+        finally:
+            if self._owns_profiler:
+                self.set_profiling(False)
+            for t in probes:
+                t.cancel()
+            await self._clear_status_line()
+            await self._drop_client()
+            if self.api is not None:
+                await self.api.close()
+                self.api = None
+            if self.notifier is not None:
+                await self.notifier.stop()
+            await self.actions.stop()
+            self.write_action_stats()
+            if self.logs is not None:
+                # Active segments are compressed by the next daemon (`pending_raw()`).
+                self.logs.close()
+            writer.cancel()
+            if self.config.metrics.textfile_interval_s > 0:
+                self.write_metrics()
+            st.daemon = None
+            self.store.mark_dirty()
+            self.store.flush()
+
+    async def _start_api(self) -> None:
+        if self.api_path is None:
+            return
+        api = ApiServer(self, self.api_path)
+        try:
+            await api.start()
+        except OSError as e:
+            # The daemon is still useful without its API; CLI reads fall back to state.json.
+            print(f"amux: API socket unavailable at {self.api_path}: {e}", flush=True)
+            return
+        self.api = api
+
+    async def _connect_loop(self) -> None:
+        assert self._stop is not None
+
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                if self.client is None:
+                    self.client = self.client_factory(
+                        socket_path=self.target.socket_path,
+                        response_timeout_s=5.0,
+                        on_event=self.handle_event,
+                        pause_after_s=self.config.flow.pause_after_s,
+                        on_command_time=self.metrics.command_seconds.observe,
+                    )
+                    await self.client.start()
+
+                await self.resync()
+                backoff = 1.0
+                self.metrics.reconnect_backoff.set(0.0)
+
+                # Connected: sleep until tmux goes away or we are asked to stop.
+                # Events keep the pane map current; tmux only reports layout
+                # changes for windows in our own session, so a slow reconcile
+                # catches what happens elsewhere.
+                interval = self.config.resync.reconcile_interval_s
+                while True:
+                    await self._wait_first(
+                        self.client.wait_closed(), self._stop.wait(), timeout=interval or None
+                    )
+                    if self._stop.is_set():
+                        return
+                    if not self.client.connected:
+                        raise RuntimeError("tmux control-mode process exited")
+                    await self.resync()
+
+            except (FileNotFoundError, RuntimeError):
+                # tmux not installed or control-mode process exited.
+                await self._drop_client()
+                self._set_tmux_state("disconnected")
+            except TmuxTimeoutError:
+                # Command timed out; treat as reconnect-worthy.
+                await self._drop_client()
+                self._set_tmux_state("reconnecting")
+
+            self.metrics.reconnects.inc()
+            self.metrics.reconnect_backoff.set(min(5.0, backoff))
+            await self._sleep(min(5.0, backoff))
+            backoff = min(60.0, backoff * 1.2)
+
+    async def resync(self) -> None:
+        """Full pane resync; runs on every (re)connect."""
+
+        assert self.client is not None
+        t0 = time.perf_counter()
+        resp = await self.client.command(f"list-panes -a -F '{LIST_PANES_FORMAT}'")
+        for pane_id in self.tracker.apply_full(resp.payload):
+            self._forget_pane(pane_id)
+        self.metrics.resync_seconds.observe(time.perf_counter() - t0)
+
+        st = self.store.state
+        if st.daemon:
+            st.daemon.tmux_state = "connected"
+            st.daemon.last_resync_at = time.time()
+        self.store.mark_dirty()
+        self._schedule_subscriptions()
+
+    def handle_event(self, raw: bytes) -> None:
+        if raw.startswith(OUTPUT_PREFIX):
+            self.metrics.control_lines.inc(1, "%output")
+            parsed = parse_output_line(raw)
+            if parsed is not None:
+                self.handle_output(*parsed)
+            return
+        self.metrics.control_lines.inc(1, raw.split(b" ", 1)[0].decode("ascii", errors="replace"))
+        if raw.startswith(EXTENDED_OUTPUT_PREFIX):
+            ext = parse_extended_output(raw)
+            if ext is not None:
+                pane_id, age_ms, data = ext
+                self.flow.note_age(pane_id, age_ms)
+                self.handle_output(pane_id, data)
+            return
+        if raw.startswith(b"%pause "):
+            pane_id = raw[7:].decode("ascii", errors="replace").strip()
+            self.flow.on_pause(pane_id)
+            # Output is dropped while paused; do not join lines across the gap.
+            self.watches.discard(pane_id)
+            self.snapshots.touch(pane_id)
+            self._schedule_resume()
+            return
+        if raw.startswith(b"%continue "):
+            pane_id = raw[10:].decode("ascii", errors="replace").strip()
+            self.flow.on_continue(pane_id)
+            self.snapshots.touch(pane_id)
+            return
+
+        removed = self.tracker.handle_event(raw.decode("utf-8", errors="replace"))
+        for pane_id in removed:
+            self._forget_pane(pane_id)
+        if self.tracker.dirty:
+            self._schedule_refresh()
+        elif removed:
+            self.store.mark_dirty()
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_dirty())
+
+    async def _refresh_dirty(self) -> None:
+        """Run targeted refreshes for everything the tracker marked dirty."""
+
+        # Let a burst of events (e.g. a layout change per split) coalesce.
+        await asyncio.sleep(0.01)
+        client = self.client
+        while client is not None and self.tracker.dirty:
+            queries = self.tracker.refresh_commands()
+            try:
+                responses = await client.command_many(cmd for _kind, _id, cmd in queries)
+            except (RuntimeError, TmuxTimeoutError):
+                # The connect loop notices the dead client and resyncs in full.
+                await client.close()
+                return
+            for (kind, target, _cmd), resp in zip(queries, responses):
+                for pane_id in self.tracker.apply(kind, target, resp.payload, error=resp.error):
+                    self._forget_pane(pane_id)
+        self.store.mark_dirty()
+        self._schedule_subscriptions()
+
+    def _schedule_resume(self) -> None:
+        if self._flow_task is None or self._flow_task.done():
+            self._flow_task = asyncio.get_running_loop().create_task(self._resume_paused())
+
+    async def _resume_paused(self) -> None:
+        """Let paused panes continue as their holds expire, within the resume budget."""
+
+        while (due := self.flow.next_due()) is not None:
+            await asyncio.sleep(max(0.0, due - self.flow.monotonic()))
+            panes = self.flow.take_due()
+            client = self.client
+            if not panes or client is None:
+                continue
+            try:
+                await client.command_many(continue_commands(panes))
+            except (RuntimeError, TmuxTimeoutError):
+                return  # the client is closed (a timeout closes it too); a fresh one starts unpaused
+
+    def subscribe_output(self, pane_ids: list[str], ttl_s: float) -> None:
+        """Keep output coming for `pane_ids` for `ttl_s` (e.g. for an API client tailing them)."""
+
+        self.subs.subscribe(pane_ids, ttl_s)
+        self._schedule_subscriptions()
+
+    def unsubscribe_output(self, pane_ids: list[str]) -> None:
+        self.subs.unsubscribe(pane_ids)
+        self._schedule_subscriptions()
+
+    def _schedule_subscriptions(self) -> None:
+        if self.client is None:
+            return
+        if self._subs_task is None or self._subs_task.done():
+            self._subs_task = asyncio.get_running_loop().create_task(self._sync_subscriptions())
+
+    async def _sync_subscriptions(self) -> None:
+        """Switch tmux's per-pane output on or off to match what is wanted now."""
+
+        client = self.client
+        if client is None:
+            return
+        if client is not self._subs_client:
+            # A new control client gets every pane's output until told otherwise.
+            self._subs_client = client
+            self._subs_supported = True
+            self.subs.reset()
+        # Loop: watches or subscriptions may change while a batch is in flight.
+        while self._subs_supported and (changes := self.subs.changes(self.tracker.panes)):
+            try:
+                responses = await client.command_many(subscription_commands(changes))
+            except (RuntimeError, TmuxTimeoutError):
+                return  # the next client starts over from `reset()`
+            if any(r.error for r in responses):
+                # tmux before 3.2 cannot switch output per pane; leave it all on.
+                self._subs_supported = False
+                self.subs.reset()
+
+        if self._subs_expiry is not None:
+            self._subs_expiry.cancel()
+            self._subs_expiry = None
+        due = self.subs.next_expiry()
+        if due is not None:
+            delay = max(0.0, due - self.subs.monotonic()) + 0.01
+            self._subs_expiry = asyncio.get_running_loop().call_later(delay, self._schedule_subscriptions)
+
+    def _read_pane_procs(
+        self, pane_pids: dict[str, int | None]
+    ) -> tuple[dict[int, ProcStat], dict[str, list[int]], dict[str, str | None]]:
+        # One /proc pass feeds both agent detection and activity.
+        procs = read_procs() if self._procfs else {}
+        trees = pane_trees(procs, pane_pids)
+        agents = self.agents.scan_trees(procs, trees) if self.agents is not None else {}
+        return procs, trees, agents
+
+    async def _scan_panes(self) -> None:
+        """Fill `PaneState.agent` and `.status` every `agents.scan_interval_s`."""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            panes = self.tracker.panes
+            if panes:
+                pane_pids = {pid: p.pid for pid, p in panes.items()}
+                # A /proc pass is file I/O; keep it off the control-stream loop.
+                procs, trees, agents = await loop.run_in_executor(None, self._read_pane_procs, pane_pids)
+                panes = self.tracker.panes
+                changed: list[str] = []
+                for pane_id, agent in agents.items():
+                    pane = panes.get(pane_id)
+                    if pane is not None and pane.agent != agent:
+                        pane.agent = agent
+                        changed.append(pane_id)
+                if self.subs.set_agents(p for p, pane in panes.items() if pane.agent):
+                    self._schedule_subscriptions()
+                if self.activity is not None:
+                    # Only panes still known after the executor round-trip.
+                    trees = {p: t for p, t in trees.items() if p in panes}
+                    agent_of = {p: panes[p].agent for p in trees}
+                    for pane_id, status in self.activity.sample(procs, trees, agent_of).items():
+                        pane = panes[pane_id]
+                        if pane.status != status:
+                            if pane.status == BUSY and status == WAITING:
+                                self.on_agent_finished(pane)
+                            pane.status = status
+                            changed.append(pane_id)
+                if changed:
+                    self.store.mark_dirty(*changed)
+            await asyncio.sleep(self.config.agents.scan_interval_s)
+
+    async def _maintain_logs(self) -> None:
+        """Flush pane logs every second; compress rolled segments and apply retention off the loop."""
+
+        assert self.logs is not None
+        cfg = self.config.logs
+        loop = asyncio.get_running_loop()
+        rolled = self.logs.pending_raw()
+        retained_at = 0.0
+        while self.logs is not None:
+            try:
+                self.logs.flush()
+            except OSError as e:
+                print(f"amux: cannot flush pane logs: {e}", flush=True)
+            rolled += self.logs.take_rolled()
+            for raw in rolled:
+                try:
+                    await loop.run_in_executor(None, compress_segment, raw, cfg.compression)
+                except (OSError, EOFError) as e:
+                    print(f"amux: cannot compress {raw}: {e}", flush=True)
+            now = time.monotonic()
+            if rolled or now - retained_at >= 60:
+                retained_at = now
+                try:
+                    await loop.run_in_executor(
+                        None,
+                        functools.partial(
+                            enforce_retention, log_dir(self.state_path), total_bytes=cfg.total_bytes, max_age_s=cfg.max_age_s
+                        ),
+                    )
+                except OSError as e:
+                    print(f"amux: cannot apply pane log retention: {e}", flush=True)
+            rolled = []
+            await asyncio.sleep(1.0)
+
+    def _forget_pane(self, pane_id: str) -> None:
+        self.output.discard(pane_id)
+        self.watches.discard(pane_id)
+        self.flow.discard(pane_id)
+        self.subs.discard(pane_id)
+        self.snapshots.discard(pane_id)
+        self.metrics.output_bytes.discard(pane_id)
+        if self.logs is not None:
+            self.logs.roll(pane_id)
+        if self.activity is not None:
+            self.activity.discard(pane_id)
+
+    def handle_output(self, pane_id: str, data: bytes) -> None:
+        self.metrics.output_bytes.inc(len(data), pane_id)
+        self.output.append(pane_id, data)
+        self.snapshots.touch(pane_id)
+        if self.logs is not None:
+            try:
+                self.logs.write(pane_id, data)
+            except OSError as e:
+                print(f"amux: pane logs off: {e}", flush=True)
+                self.logs = None
+        if self.activity is not None:
+            self.activity.note_output(pane_id)
+        for m in self.watches.feed(pane_id, data):
+            self.on_watch_match(m)
+
+    def load_watches(self, watches: list[dict[str, Any]]) -> None:
+        """(Re)build the watch engine; invalid rules are logged and skipped."""
+
+        rules: list[WatchRule] = []
+        for d in watches:
+            try:
+                rule = WatchRule.from_dict(d)
+                re.compile(rule.pattern)
+            except (KeyError, TypeError, ValueError, re.error) as e:
+                print(f"amux: skipping invalid watch {d!r}: {e}", flush=True)
+                continue
+            rules.append(rule)
+        self.watches = WatchEngine(rules)
+        self._rule_actions = {r.id: r.actions for r in rules if r.actions}
+        self.subs.set_watches(self.watches.all_panes, self.watches.scoped_panes)
+        self._schedule_subscriptions()
+
+    def on_watch_match(self, m: WatchMatch) -> None:
+        print(f"amux: watch {m.rule_id} matched in {m.pane_id}: {m.line}", flush=True)
+        for action in self._rule_actions.get(m.rule_id, ()):
+            self.actions.submit(ActionJob(m.rule_id, m.pane_id, m.line, action))
+        if self.notifier is not None and self.config.notify.watch_matches:
+            self.notifier.notify(Notification(
+                title=f"amux: {m.rule_id} in {m.pane_id}",
+                body=m.line,
+                key=f"rule:{m.rule_id}",
+                summary=f"{{n}} panes matched {m.rule_id}",
+            ))
+
+    async def _send_keys(self, pane_id: str, keys: tuple[str, ...]) -> None:
+        client = self.client
+        if client is None:
+            raise RuntimeError("not connected to tmux")
+        resp = await client.command(send_keys_command(pane_id, keys))
+        if resp.error:
+            raise RuntimeError(resp.payload.strip() or "send-keys failed")
+
+    def _note_action(self, result: str, elapsed: float | None) -> None:
+        self.metrics.actions.inc(1, result)
+        if elapsed is not None:
+            self.metrics.action_seconds.observe(elapsed)
+
+    def write_action_stats(self) -> None:
+        """Per-rule action outcomes and latency to `actions.json` next to state.json."""
+
+        if not self.actions.stats:
+            return
+        try:
+            self.actions.write_stats(actions_stats_path(self.state_path))
+        except OSError as e:
+            print(f"amux: cannot write action stats: {e}", flush=True)
+
+    def on_agent_finished(self, pane: PaneState) -> None:
+        if self.notifier is None or not self.config.notify.agent_finished:
+            return
+        where = f" in group {pane.group}" if pane.group else ""
+        self.notifier.notify(Notification(
+            title=f"{pane.agent or 'agent'} finished in {pane.pane_id}",
+            body=f"{pane.pane_id} {pane.cwd}",
+            key=f"group:{pane.group}" if pane.group else "agents",
+            summary=f"{{n}} agents finished{where}",
+        ))
+
+    def pane_tail(self, pane_id: str, n: int | None = None) -> bytes:
+        """The last `n` bytes a pane printed, straight from memory."""
+
+        # Under subscribe = "auto" the buffer only fills while output is on; keep it coming.
+        self.subscribe_output([pane_id], SUBSCRIBE_TTL_S)
+        return self.output.tail(pane_id, n)
+
+    async def pane_snapshot(self, pane_id: str) -> PaneSnapshot:
+        """The pane's screen, captured again only if it printed since the last capture."""
+
+        # We only notice a pane changing through its %output; keep it coming.
+        self.subscribe_output([pane_id], SUBSCRIBE_TTL_S)
+        if self.client is not self._snap_client:
+            self._snap_client = self.client
+            self.snapshots.invalidate()
+        snap = self.snapshots.fresh(pane_id)
+        if snap is not None:
+            self.metrics.snapshots.inc(1, "cached")
+            return snap
+        task = self._captures.get(pane_id)
+        if task is None:
+            # Concurrent requests for the same pane share one capture-pane.
+            task = self._captures[pane_id] = asyncio.get_running_loop().create_task(self._capture(pane_id))
+            task.add_done_callback(lambda _t: self._captures.pop(pane_id, None))
+        return await asyncio.shield(task)
+
+    async def _capture(self, pane_id: str) -> PaneSnapshot:
+        client = self.client
+        if client is None:
+            raise RuntimeError("not connected to tmux")
+        flow = self.flow.panes.get(pane_id)
+        trusted = self.subs.enabled.get(pane_id, True) and (flow is None or flow.paused_at is None)
+        self.snapshots.begin(pane_id)
+        resp = await client.command(f"capture-pane -p -t '{pane_id}'")
+        if resp.error:
+            raise RuntimeError(f"capture-pane failed: {resp.payload.strip()}")
+        self.metrics.snapshots.inc(1, "captured")
+        return self.snapshots.store(pane_id, resp.payload.removesuffix("\n").split("\n"), trusted=trusted)
+
+    def _update_status_line(self, st: AmuxState) -> None:
+        if self.status_line is None:
+            return
+        changed = self.status_line.update(st.panes)
+        client = self.client
+        if not self.config.status_line.tmux_option or client is None:
+            return
+        if client is not self._status_client:
+            # New connection (maybe a restarted tmux server): push everything.
+            self._status_client = client
+            changed = dict(self.status_line.segments)
+        if changed:
+            asyncio.get_running_loop().create_task(self._push_status_options(client, changed))
+
+    async def _clear_status_line(self) -> None:
+        """On the way out: a status bar must not keep showing a dead daemon's counts."""
+
+        cache = self.status_line
+        if cache is None:
+            return
+        self.status_line = None  # the final state flush must not render it again
+        windows = [k for k in cache.segments if k != ALL]
+        cache.clear()
+        client = self.client
+        if client is None or client is not self._status_client:
+            return  # nothing pushed to this tmux
+        cmds = ["set-option -gu @amux_status", *(f"set-option -wu -t '{w}' @amux_window_status" for w in windows)]
+        try:
+            await client.command_many(cmds)
+        except (RuntimeError, TmuxTimeoutError):
+            pass
+
+    async def _push_status_options(self, client: AsyncTmuxControlClient, changed: dict[str, str]) -> None:
+        """Mirror changed segments into tmux user options for `#{@amux_status}`."""
+
+        cmds = []
+        for key, text in changed.items():
+            value = _tmux_quote(text.replace("#", "##"))
+            if key == ALL:
+                cmds.append(f"set-option -g @amux_status {value}")
+            elif text:
+                cmds.append(f"set-option -w -t '{key}' @amux_window_status {value}")
+            else:
+                cmds.append(f"set-option -wu -t '{key}' @amux_window_status")
+        try:
+            # Errors (a window that closed meanwhile) come back as responses, not exceptions.
+            await client.command_many(cmds)
+        except (RuntimeError, TmuxTimeoutError):
+            pass
+
+    def _note_state_write(self, nbytes: int, seconds: float) -> None:
+        self.metrics.state_write_bytes.observe(nbytes)
+        self.metrics.state_write_seconds.observe(seconds)
+
+    def write_metrics(self) -> None:
+        """Write the Prometheus textfile (`amux.prom`) next to state.json."""
+
+        try:
+            self.metrics.write_textfile(
+                metrics_textfile_path(self.state_path), {"server_id": self.target.server_id}
+            )
+        except OSError as e:
+            print(f"amux: cannot write metrics: {e}", flush=True)
+
+    async def _write_metrics_periodically(self) -> None:
+        while True:
+            self.write_metrics()
+            self.write_action_stats()
+            await asyncio.sleep(self.config.metrics.textfile_interval_s)
+
+    async def _probe_loop_lag(self) -> None:
+        interval = self.config.metrics.loop_lag_interval_s
+        if interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.metrics.loop_lag_seconds.observe(max(0.0, loop.time() - due))
+
+    def set_profiling(self, enabled: bool) -> None:
+        """Start or stop the sampling profiler (dumps go to `<state dir>/profiles/`)."""
+
+        if enabled == self.profiler.enabled:
+            return
+        if enabled:
+            self.profiler.start()
+            print(f"amux: profiling on, dumps in {self.profiler.out_dir}", flush=True)
+        else:
+            path = self.profiler.stop()
+            print(f"amux: profiling off, last dump {path}", flush=True)
+
+    def toggle_profiling(self) -> None:
+        self.set_profiling(not self.profiler.enabled)
+
+    def _set_tmux_state(self, tmux_state: str) -> None:
+        st = self.store.state
+        if st.daemon and st.daemon.tmux_state != tmux_state:
+            st.daemon.tmux_state = tmux_state
+            self.store.mark_dirty()
+
+    async def _drop_client(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._flow_task is not None:
+            self._flow_task.cancel()
+            self._flow_task = None
+        if self._subs_task is not None:
+            self._subs_task.cancel()
+            self._subs_task = None
+        if self._subs_expiry is not None:
+            self._subs_expiry.cancel()
+            self._subs_expiry = None
+        # Pauses belong to the control client; a new one starts unpaused.
+        for pane_id in self.flow.paused:
+            self.flow.on_continue(pane_id)
+        if self.client is not None:
+            try:
+                await self.client.close()
+            except Exception:
+                pass
+            self.client = None
+
+    async def _sleep(self, delay: float) -> None:
+        """Sleep for `delay` seconds, waking early on stop."""
+
+        assert self._stop is not None
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    async def _wait_first(*aws: object, timeout: float | None = None) -> None:
+        tasks = [asyncio.ensure_future(a) for a in aws]  # type: ignore[arg-type]
+        try:
+            await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
+def make_profiler(config: AmuxConfig, out_dir: Path) -> Profiler:
+    prof = config.profile
+    return Profiler(
+        out_dir,
+        interval_s=prof.interval_ms / 1000,
+        window_s=prof.window_s,
+        keep=prof.keep,
+        tracemalloc_frames=prof.tracemalloc_frames,
+    )
+
+
+def _tmux_quote(s: str) -> str:
+    return "'" + s.replace("'", "'\\''") + "'"
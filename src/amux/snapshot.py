@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Any
+
+# Old versions kept per pane so a poller a few captures behind still gets a diff.
+DEFAULT_HISTORY = 4
+# A snapshotted pane keeps its %output on (see subscribe.py) this long after the
+# last request, so the cache learns when it goes stale.
+SUBSCRIBE_TTL_S = 60.0
+
+# [start, end, lines]: replace lines[start:end] of the client's version with `lines`.
+Change = tuple[int, int, list[str]]
+
+
+@dataclass(slots=True)
+class PaneSnapshot:
+    version: int
+    lines: list[str]
+    taken_at: float
+    # Valid until the pane prints again; False when we could not have seen that
+    # (output switched off or paused at capture time).
+    trusted: bool = True
+    older: list[tuple[int, list[str]]] = field(default_factory=list)
+
+
+def line_diff(old: list[str], new: list[str]) -> list[Change]:
+    """Changes turning `old` into `new`, positions relative to `old`."""
+
+    return [
+        (i1, i2, new[j1:j2])
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_diff(old: list[str], changes: list[Change] | list[list[Any]]) -> list[str]:
+    """Inverse of `line_diff()`, for clients keeping a copy of the screen."""
+
+    out = list(old)
+    for start, end, lines in sorted(changes, key=lambda c: c[0], reverse=True):
+        out[start:end] = lines
+    return out
+
+
+class SnapshotCache:
+    """Last `capture-pane` per pane, recaptured only once the pane printed again.
+
+    `touch()` is called for every `%output` and only marks the pane stale, so
+    the cache costs a set insert on the hot path; a capture runs when someone
+    asks for a stale pane. Versions start at the wall clock in milliseconds so
+    a client holding a version from a previous daemon gets a full screen, not
+    a wrong diff.
+    """
+
+    def __init__(self, *, history: int = DEFAULT_HISTORY) -> None:
+        self.history = history
+        self.snapshots: dict[str, PaneSnapshot] = {}
+        self.stale: set[str] = set()
+        self._next_version = int(time.time() * 1000)
+
+    def touch(self, pane_id: str) -> None:
+        self.stale.add(pane_id)
+
+    def fresh(self, pane_id: str) -> PaneSnapshot | None:
+        snap = self.snapshots.get(pane_id)
+        if snap is None or not snap.trusted or pane_id in self.stale:
+            return None
+        return snap
+
+    def begin(self, pane_id: str) -> None:
+        """Call right before sending `capture-pane`: output from now on makes the result stale."""
+
+        self.stale.discard(pane_id)
+
+    def store(self, pane_id: str, lines: list[str], *, trusted: bool) -> PaneSnapshot:
+        old = self.snapshots.get(pane_id)
+        if old is not None and old.lines == lines:
+            # Output that left the screen as it was (e.g. a redraw): same version.
+            old.trusted = trusted
+            old.taken_at = time.time()
+            return old
+        self._next_version += 1
+        older: list[tuple[int, list[str]]] = []
+        if old is not None and self.history > 0:
+            older = [*old.older, (old.version, old.lines)][-self.history :]
+        snap = PaneSnapshot(self._next_version, lines, time.time(), trusted, older)
+        self.snapshots[pane_id] = snap
+        return snap
+
+    def discard(self, pane_id: str) -> None:
+        self.snapshots.pop(pane_id, None)
+        self.stale.discard(pane_id)
+
+    def invalidate(self) -> None:
+        """Nothing cached can be trusted (e.g. a new control client)."""
+
+        self.stale.update(self.snapshots)
+
+
+def snapshot_reply(snap: PaneSnapshot, since: int | None) -> dict[str, Any]:
+    """What a client holding version `since` needs to reach `snap`."""
+
+    reply: dict[str, Any] = {"version": snap.version, "taken_at": round(snap.taken_at, 3)}
+    if since == snap.version:
+        reply["unchanged"] = True
+        return reply
+    base = next((lines for version, lines in snap.older if version == since), None)
+    if base is None:
+        reply["lines"] = snap.lines
+    else:
+        reply["since"] = since
+        reply["changes"] = line_diff(base, snap.lines)
+    return reply
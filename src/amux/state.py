@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import json
+import os
+import sys
 import time
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
@@ -15,25 +17,127 @@ class DaemonStatus:
     last_resync_at: float | None = None
 
 
+def _intern(s: str | None) -> str | None:
+    # Commands, cwds and window ids repeat across hundreds of panes.
+    return sys.intern(s) if s else s
+
+
+@dataclass(slots=True)
+class PaneState:
+    """One tmux pane plus amux's extensions (see the design doc).
+
+    Supports `pane["pid"]` / `pane.get("window")` so code written against the
+    old dict-per-pane layout keeps working.
+    """
+
+    pane_id: str
+    pid: int = 0
+    command: str = ""
+    cwd: str = ""
+    window: str | None = None
+    agent: str | None = None
+    task: str | None = None
+    status: str | None = None
+    group: str | None = None
+    tags: tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        self.pane_id = sys.intern(self.pane_id)
+        self.command = sys.intern(self.command)
+        self.cwd = sys.intern(self.cwd)
+        self.window = _intern(self.window)
+        self.agent = _intern(self.agent)
+        self.task = _intern(self.task)
+        self.status = _intern(self.status)
+        self.group = _intern(self.group)
+        self.tags = tuple(sys.intern(t) for t in self.tags)
+
+    def update(self, pid: int, command: str, cwd: str, window: str | None) -> bool:
+        """Refresh the tmux-owned fields in place; True if anything changed."""
+
+        if pid == self.pid and command == self.command and cwd == self.cwd and window == self.window:
+            return False
+        self.pid = pid
+        self.command = sys.intern(command)
+        self.cwd = sys.intern(cwd)
+        self.window = _intern(window)
+        return True
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _PANE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in _PANE_FIELDS else None
+        return default if value is None else value
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON form; same keys as the old dict layout, optional ones only when set."""
+
+        d: dict[str, Any] = {"pid": self.pid, "command": self.command, "cwd": self.cwd}
+        for key in ("window", "agent", "task", "status", "group"):
+            value = getattr(self, key)
+            if value is not None:
+                d[key] = value
+        if self.tags:
+            d["tags"] = list(self.tags)
+        return d
+
+    @staticmethod
+    def from_dict(pane_id: str, d: dict[str, Any]) -> "PaneState":
+        return PaneState(
+            pane_id=pane_id,
+            pid=int(d.get("pid", 0)),
+            command=str(d.get("command", "")),
+            cwd=str(d.get("cwd", "")),
+            window=d.get("window"),
+            agent=d.get("agent"),
+            task=d.get("task"),
+            status=d.get("status"),
+            group=d.get("group"),
+            tags=tuple(d.get("tags", ())),
+        )
+
+
+_PANE_FIELDS = frozenset(PaneState.__slots__)  # type: ignore[attr-defined]
+
+
+def pane_json(pane: PaneState | dict[str, Any]) -> dict[str, Any]:
+    return pane if isinstance(pane, dict) else pane.to_dict()
+
+
 @dataclass
 class AmuxState:
     version: int = 1
     daemon: DaemonStatus | None = None
-    panes: dict[str, dict[str, Any]] = field(default_factory=dict)
+    panes: dict[str, PaneState] = field(default_factory=dict)
     watches: list[dict[str, Any]] = field(default_factory=list)
     groups: dict[str, dict[str, Any]] = field(default_factory=dict)
+    journal_seq: int = 0  # last journal record folded into this state
 
 
 def load_state(path: Path) -> AmuxState:
+    """Load the `state.json` snapshot plus any newer `state.journal` records."""
+
+    from .journal import journal_path, replay_journal
+
+    st = _load_snapshot(path)
+    replay_journal(st, journal_path(path))
+    return st
+
+
+def _load_snapshot(path: Path) -> AmuxState:
     if not path.exists():
         return AmuxState()
 
     data = json.loads(path.read_text(encoding="utf-8"))
     st = AmuxState(
         version=data.get("version", 1),
-        panes=data.get("panes", {}),
+        panes={pid: PaneState.from_dict(pid, p) for pid, p in data.get("panes", {}).items()},
         watches=data.get("watches", []),
         groups=data.get("groups", {}),
+        journal_seq=int(data.get("journal_seq", 0)),
     )
 
     if (d := data.get("daemon")):
@@ -47,19 +151,38 @@ def load_state(path: Path) -> AmuxState:
     return st
 
 
-def atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
+def atomic_write_text(path: Path, text: str, *, fsync: bool = False) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    tmp = path.with_suffix(path.suffix + f".tmp.{int(time.time() * 1000)}")
-    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp = path.with_suffix(path.suffix + f".tmp.{os.getpid()}.{int(time.time() * 1000)}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
     tmp.replace(path)
+    if fsync:
+        # Make the rename itself durable.
+        dfd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
 
 
-def save_state(path: Path, st: AmuxState) -> None:
-    payload: dict[str, Any] = {
+def atomic_write_json(path: Path, payload: dict[str, Any], *, fsync: bool = False) -> None:
+    atomic_write_text(path, json.dumps(payload, ensure_ascii=False, indent=2) + "\n", fsync=fsync)
+
+
+def state_payload(st: AmuxState) -> dict[str, Any]:
+    return {
         "version": st.version,
-        "panes": st.panes,
+        "panes": {pid: pane_json(p) for pid, p in st.panes.items()},
         "watches": st.watches,
         "groups": st.groups,
         "daemon": (asdict(st.daemon) if st.daemon else None),
+        "journal_seq": st.journal_seq,
     }
-    atomic_write_json(path, payload)
+
+
+def save_state(path: Path, st: AmuxState) -> None:
+    atomic_write_json(path, state_payload(st))
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from .state import PaneState, atomic_write_text
+
+# Statuses shown first, in this order; any others follow alphabetically.
+STATUS_ORDER = ("busy", "waiting", "error")
+ALL = "*"  # cache key for the server-wide segment
+
+
+def status_line_path(state_path: Path) -> Path:
+    return state_path.with_name("status-line")
+
+
+def render_counts(panes: Iterable[PaneState], *, separator: str = " / ") -> str:
+    """`3 busy / 2 waiting / 1 error` for the panes that have a status."""
+
+    counts = Counter(p.status for p in panes if p.status)
+    if not counts:
+        return ""
+    known = [s for s in STATUS_ORDER if s in counts]
+    rest = sorted(s for s in counts if s not in STATUS_ORDER)
+    return separator.join(f"{counts[s]} {s}" for s in known + rest)
+
+
+class StatusLineCache:
+    """Pre-rendered status-line segments, server-wide and per window.
+
+    `update()` re-renders from the pane map and rewrites the small
+    `status-line` cache file only when a segment changed, so
+    `amux status-line` is a file read however often tmux asks.
+    """
+
+    def __init__(self, path: Path, *, separator: str = " / ") -> None:
+        self.path = path
+        self.separator = separator
+        self.segments: dict[str, str] = {}
+        self.writes = 0
+
+    def update(self, panes: dict[str, PaneState]) -> dict[str, str]:
+        """Re-render; returns the segments that changed (`""` = now empty)."""
+
+        by_window: dict[str, list[PaneState]] = {}
+        for pane in panes.values():
+            if pane.window:
+                by_window.setdefault(pane.window, []).append(pane)
+        segments = {ALL: render_counts(panes.values(), separator=self.separator)}
+        for window, window_panes in by_window.items():
+            text = render_counts(window_panes, separator=self.separator)
+            if text:
+                segments[window] = text
+
+        old = self.segments
+        changed = {k: v for k, v in segments.items() if old.get(k) != v}
+        changed.update({k: "" for k in old if k not in segments})
+        if changed or not self.path.exists():
+            self.segments = segments
+            lines = "".join(f"{k}\t{v}\n" for k, v in segments.items())
+            atomic_write_text(self.path, lines, fsync=False)
+            self.writes += 1
+        return changed
+
+    def clear(self) -> None:
+        """Forget every segment and remove the file: `amux status-line` prints nothing."""
+
+        self.segments = {}
+        self.path.unlink(missing_ok=True)
+
+
+def read_status_line(path: Path, window: str | None = None) -> str:
+    """The cached segment for `window`, or the server-wide one when no window is given."""
+
+    try:
+        data = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
+    overall = ""
+    for line in data.splitlines():
+        key, _, text = line.partition("\t")
+        if key == window:
+            return text
+        if key == ALL:
+            overall = text
+    return "" if window else overall
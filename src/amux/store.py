@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Callable
+
+from .journal import JournalView, StateJournal, journal_path
+from .state import AmuxState, atomic_write_text, state_payload
+
+FSYNC_POLICIES = ("always", "interval", "never")
+# After a failed write (disk full, permissions), `run()` tries again this much later.
+WRITE_RETRY_S = 5.0
+
+
+class StateStore:
+    """The daemon's in-memory `AmuxState`, persisted by a coalescing writer.
+
+    The in-memory state is authoritative while the daemon runs; `state.json`
+    is a snapshot of it. Mutators call `mark_dirty()`; `run()` turns a burst of
+    those into one write after `debounce_s`, and a write whose content hashes
+    the same as the previous one is skipped.
+
+    With `journal=True` a flush appends only the changed panes/groups/watches
+    to `state.journal` (see `amux.journal`), and every `compact_every` records
+    the journal is folded into a new snapshot. Pane changes must be named:
+    `mark_dirty(pane_id, ...)`, or added to `changed_panes` (as `PaneTracker`
+    does); only those panes are diffed.
+
+    Callables in `on_flush` see the state once per flush, i.e. once per burst
+    of changes; derived views (the status line) hang off this. `on_write`
+    callables get (bytes, seconds) for every journal append or snapshot.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        state: AmuxState | None = None,
+        *,
+        debounce_s: float = 0.2,
+        fsync: str = "interval",
+        fsync_interval_s: float = 5.0,
+        journal: bool = False,
+        compact_every: int = 1000,
+        history_generations: int = 1,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.state = state if state is not None else AmuxState()
+        self.debounce_s = debounce_s
+        self.fsync = fsync
+        self.fsync_interval_s = fsync_interval_s
+        self.monotonic = monotonic
+        self.compact_every = compact_every
+        self.history_generations = history_generations
+        self.writes = 0
+        self.skipped = 0
+        self.compactions = 0
+        self.on_flush: list[Callable[[AmuxState], None]] = []
+        self.on_write: list[Callable[[int, float], None]] = []
+        self.changed_panes: set[str] = set()
+        self._journal = StateJournal(journal_path(path), seq=self.state.journal_seq) if journal else None
+        self._view = JournalView(self.state) if journal else None
+        # Start from a fresh snapshot so we never append after a torn record.
+        self._needs_compact = journal
+        self._dirty = False
+        self._last_digest: bytes | None = None
+        self._last_fsync = float("-inf")
+        self._wake: asyncio.Event | None = None
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self, *pane_ids: str) -> None:
+        self.changed_panes.update(pane_ids)
+        self._dirty = True
+        if self._wake is not None:
+            self._wake.set()
+
+    def flush(self) -> bool:
+        """Write now if anything changed. Returns True if anything was written."""
+
+        if not self._dirty:
+            return False
+        self._dirty = False
+        try:
+            return self._flush()
+        except BaseException:
+            self._dirty = True  # nothing is lost: the next flush writes it
+            raise
+
+    def _flush(self) -> bool:
+        for hook in self.on_flush:
+            hook(self.state)
+
+        if self._journal is None or self._view is None:
+            self.changed_panes.clear()  # a snapshot writes every pane anyway
+            return self._write_snapshot()
+
+        records = self._view.diff(self.state, self.changed_panes)
+        self.changed_panes.clear()
+        if self._needs_compact:
+            self.compact()
+            return True
+
+        wrote = False
+        if records:
+            t0 = time.perf_counter()
+            try:
+                nbytes = self._journal.append(records, fsync=self._fsync_due())
+            except OSError:
+                # The view already counts these records as written (and the file may
+                # end in a torn one); a fresh snapshot catches up whatever they were.
+                self._needs_compact = True
+                raise
+            self._wrote(nbytes, t0)
+            self.state.journal_seq = self._journal.seq
+            self.writes += 1
+            wrote = True
+        else:
+            self.skipped += 1
+
+        if self._journal.records >= self.compact_every:
+            self.compact()
+            wrote = True
+        return wrote
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh `state.json` and start a new journal."""
+
+        if self._journal is not None:
+            self.state.journal_seq = self._journal.seq
+        t0 = time.perf_counter()
+        data = json.dumps(state_payload(self.state), ensure_ascii=False, separators=(",", ":")) + "\n"
+        # The snapshot must be durable before the journal it replaces goes away.
+        atomic_write_text(self.path, data, fsync=self.fsync != "never")
+        self._wrote(len(data), t0)
+        if self._journal is not None:
+            self._journal.rotate(self.history_generations)
+        self._needs_compact = False
+        self.compactions += 1
+
+    def _write_snapshot(self) -> bool:
+        t0 = time.perf_counter()
+        data = json.dumps(state_payload(self.state), ensure_ascii=False, separators=(",", ":")) + "\n"
+        digest = hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+        if digest == self._last_digest:
+            self.skipped += 1
+            return False
+
+        atomic_write_text(self.path, data, fsync=self._fsync_due())
+        self._last_digest = digest
+        self.writes += 1
+        self._wrote(len(data), t0)
+        return True
+
+    def _wrote(self, nbytes: int, started: float) -> None:
+        if self.on_write:
+            elapsed = time.perf_counter() - started
+            for hook in self.on_write:
+                hook(nbytes, elapsed)
+
+    def _fsync_due(self) -> bool:
+        if self.fsync == "always":
+            return True
+        if self.fsync == "never":
+            return False
+        now = self.monotonic()
+        if now - self._last_fsync >= self.fsync_interval_s:
+            self._last_fsync = now
+            return True
+        return False
+
+    async def run(self) -> None:
+        """Background writer: at most one write per `debounce_s`."""
+
+        self._wake = asyncio.Event()
+        if self._dirty:
+            self._wake.set()
+        try:
+            while True:
+                await self._wake.wait()
+                await asyncio.sleep(self.debounce_s)
+                self._wake.clear()
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"amux: cannot write {self.path}: {e}; retrying in {WRITE_RETRY_S:g}s", flush=True)
+                    await asyncio.sleep(WRITE_RETRY_S)
+                    self._wake.set()
+        finally:
+            self._wake = None
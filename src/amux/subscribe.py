@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterable
+
+# Panes per `refresh-client` command; each pane is one `-A '%N:on|off'`.
+PANES_PER_COMMAND = 64
+
+
+class OutputSubscriptions:
+    """Which panes tmux should send `%output` for (tmux 3.2+ `refresh-client -A`).
+
+    A pane is wanted while a watch rule covers it, an agent runs in it (its
+    `%output` is what tells busy from waiting) or an API client has
+    subscribed to it; with `capture_all` every pane is. `enabled` mirrors what
+    we last told tmux (panes it has not heard about from us are on, tmux's
+    default), so `changes()` only returns panes whose state has to flip.
+    """
+
+    def __init__(
+        self,
+        *,
+        capture_all: bool = False,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capture_all = capture_all
+        self.monotonic = monotonic
+        self.watch_all = False
+        self.watch_panes: frozenset[str] = frozenset()
+        self.agent_panes: frozenset[str] = frozenset()
+        self.api: dict[str, float] = {}  # pane_id -> monotonic expiry
+        self.enabled: dict[str, bool] = {}
+
+    def set_watches(self, all_panes: bool, panes: Iterable[str]) -> None:
+        self.watch_all = all_panes
+        self.watch_panes = frozenset(panes)
+
+    def set_agents(self, panes: Iterable[str]) -> bool:
+        """Panes with an agent in them; True if that changed."""
+
+        panes = frozenset(panes)
+        if panes == self.agent_panes:
+            return False
+        self.agent_panes = panes
+        return True
+
+    def subscribe(self, pane_ids: Iterable[str], ttl_s: float) -> float:
+        """Keep output on for `pane_ids` for `ttl_s`; returns the expiry time."""
+
+        until = self.monotonic() + ttl_s
+        for pid in pane_ids:
+            if self.api.get(pid, 0.0) < until:
+                self.api[pid] = until
+        return until
+
+    def unsubscribe(self, pane_ids: Iterable[str]) -> None:
+        for pid in pane_ids:
+            self.api.pop(pid, None)
+
+    def wanted(self, pane_id: str) -> bool:
+        if self.capture_all or self.watch_all or pane_id in self.watch_panes or pane_id in self.agent_panes:
+            return True
+        until = self.api.get(pane_id)
+        return until is not None and until > self.monotonic()
+
+    def changes(self, pane_ids: Iterable[str]) -> list[tuple[str, bool]]:
+        """(pane_id, on) for panes whose output has to be switched; marks them done."""
+
+        now = self.monotonic()
+        for pid in [p for p, until in self.api.items() if until <= now]:
+            del self.api[pid]
+        out = []
+        for pid in pane_ids:
+            want = self.wanted(pid)
+            if self.enabled.get(pid, True) != want:
+                self.enabled[pid] = want
+                out.append((pid, want))
+        return out
+
+    def next_expiry(self) -> float | None:
+        return min(self.api.values(), default=None)
+
+    def discard(self, pane_id: str) -> None:
+        self.enabled.pop(pane_id, None)
+        self.api.pop(pane_id, None)
+
+    def reset(self) -> None:
+        """A new control client starts with every pane on."""
+
+        self.enabled.clear()
+
+    def report(self) -> dict[str, object]:
+        now = self.monotonic()
+        return {
+            "mode": "all" if self.capture_all else "auto",
+            "watch_all": self.watch_all,
+            "watch_panes": sorted(self.watch_panes),
+            "agent_panes": sorted(self.agent_panes),
+            "api": {pid: round(until - now, 3) for pid, until in sorted(self.api.items()) if until > now},
+            "off": sorted(pid for pid, on in self.enabled.items() if not on),
+        }
+
+
+def subscription_commands(changes: list[tuple[str, bool]]) -> list[str]:
+    """`refresh-client -A` commands that switch pane output on or off."""
+
+    return [
+        "refresh-client " + " ".join(f"-A '{pid}:{'on' if on else 'off'}'" for pid, on in changes[i : i + PANES_PER_COMMAND])
+        for i in range(0, len(changes), PANES_PER_COMMAND)
+    ]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import stat
+from pathlib import Path
+from typing import Any, Callable
+
+from .api import ApiError, JsonLineServer
+from .config import AmuxConfig
+from .fastcli import api_path, is_pid_alive, state_paths, supervisor_paths
+from .profiling import profile_dir
+from .runtime import DaemonRuntime, make_profiler
+from .tmux_target import TmuxTarget
+
+
+def discover_sockets(root: Path | None = None) -> list[Path]:
+    """tmux server sockets in tmux's socket dir (`$TMUX_TMPDIR/tmux-<uid>/`)."""
+
+    if root is None:
+        root = Path(os.environ.get("TMUX_TMPDIR") or "/tmp") / f"tmux-{os.getuid()}"
+    try:
+        entries = list(root.iterdir())
+    except OSError:
+        return []
+    out = []
+    for path in entries:
+        try:
+            if stat.S_ISSOCK(path.lstat().st_mode):
+                out.append(path)
+        except OSError:
+            continue
+    return sorted(out)
+
+
+class Supervisor:
+    """Many `DaemonRuntime`s, one per tmux server, on one event loop.
+
+    Each runtime keeps its own state dir, API socket and connect/backoff loop,
+    exactly as a standalone `amux daemon run`; the supervisor only owns the
+    process: signals, the shared profiler and its own API socket for adding and
+    removing servers. Each managed server's `daemon.pid` holds the supervisor's
+    pid, so `amux daemon status` works unchanged and `amux daemon stop` stops
+    that server through its API without touching the others.
+    """
+
+    def __init__(
+        self,
+        *,
+        config: AmuxConfig | None = None,
+        discover: bool = False,
+        runtime_factory: Callable[..., DaemonRuntime] = DaemonRuntime,
+    ) -> None:
+        self.config = config or AmuxConfig()
+        self.discover = discover
+        self.runtime_factory = runtime_factory
+        self.api_path, self.pid_path = supervisor_paths()
+        self.runtimes: dict[str, DaemonRuntime] = {}
+        self.discovered: set[str] = set()
+        self.profiler = make_profiler(self.config, profile_dir(self.pid_path))
+        self.api: JsonLineServer | None = None
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+        self._stop: asyncio.Event | None = None
+
+    def request_stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+
+    def install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+        loop.add_signal_handler(signal.SIGUSR2, self.toggle_profiling)
+
+    def toggle_profiling(self) -> None:
+        if self.profiler.enabled:
+            self.profiler.stop()
+        else:
+            self.profiler.start()
+
+    def add(self, target: TmuxTarget) -> bool:
+        """Start managing `target`; False if it is already managed (here or standalone)."""
+
+        sid = target.server_id
+        if sid in self.runtimes:
+            return False
+        state_path, pid_path = state_paths(target)
+        try:
+            pid = int(pid_path.read_text(encoding="utf-8").strip())
+        except (OSError, ValueError):
+            pid = None
+        if pid is not None and pid != os.getpid() and is_pid_alive(pid):
+            print(f"amux: {target.socket_path} already has a daemon (pid={pid}); not supervising it", flush=True)
+            return False
+        rt = self.runtime_factory(
+            target, state_path, config=self.config, api_path=api_path(target), profiler=self.profiler
+        )
+        self.runtimes[sid] = rt
+        pid_path.parent.mkdir(parents=True, exist_ok=True)
+        pid_path.write_text(f"{os.getpid()}\n", encoding="utf-8")
+        self._tasks[sid] = asyncio.get_running_loop().create_task(self._run_one(sid, rt, pid_path))
+        return True
+
+    def remove(self, server_id: str) -> bool:
+        rt = self.runtimes.get(server_id)
+        if rt is None:
+            return False
+        rt.request_stop()
+        return True
+
+    async def _run_one(self, sid: str, rt: DaemonRuntime, pid_path: Path) -> None:
+        try:
+            await rt.run()
+        except Exception as e:  # one broken server must not take the others down
+            print(f"amux: server {sid} ({rt.target.socket_path}) failed: {e!r}", flush=True)
+        finally:
+            self.runtimes.pop(sid, None)
+            self._tasks.pop(sid, None)
+            self.discovered.discard(sid)
+            try:
+                if int(pid_path.read_text(encoding="utf-8").strip()) == os.getpid():
+                    pid_path.unlink()
+            except (OSError, ValueError):
+                pass
+
+    def rediscover(self) -> None:
+        """Manage new sockets in the tmux socket dir; drop discovered ones that vanished."""
+
+        found = {TmuxTarget(socket_path=p) for p in discover_sockets()}
+        for target in found:
+            if self.add(target):
+                self.discovered.add(target.server_id)
+        live = {t.server_id for t in found}
+        for sid in list(self.discovered):
+            if sid not in live:
+                self.remove(sid)
+
+    async def run(self, targets: list[TmuxTarget]) -> None:
+        self._stop = asyncio.Event()
+        self.pid_path.parent.mkdir(parents=True, exist_ok=True)
+        self.pid_path.write_text(f"{os.getpid()}\n", encoding="utf-8")
+        api = JsonLineServer(self.api_path, {
+            "ping": lambda _args: "pong",
+            "servers": self._servers,
+            "add": self._add,
+            "remove": self._remove,
+        })
+        try:
+            await api.start()
+            self.api = api
+        except OSError as e:
+            print(f"amux: supervisor API unavailable at {self.api_path}: {e}", flush=True)
+
+        try:
+            for target in targets:
+                self.add(target)
+            interval = self.config.supervisor.discover_interval_s
+            while not self._stop.is_set():
+                if self.discover:
+                    self.rediscover()
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=interval if self.discover else None)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for rt in list(self.runtimes.values()):
+                rt.request_stop()
+            if self._tasks:
+                await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            self.profiler.stop()
+            if self.api is not None:
+                await self.api.close()
+                self.api = None
+            self.pid_path.unlink(missing_ok=True)
+
+    def _servers(self, _args: dict[str, Any]) -> list[dict[str, Any]]:
+        out = []
+        for sid, rt in sorted(self.runtimes.items()):
+            st = rt.store.state
+            out.append({
+                "server_id": sid,
+                "tmux_socket": str(rt.target.socket_path),
+                "tmux_state": st.daemon.tmux_state if st.daemon else "starting",
+                "panes": len(st.panes),
+                "discovered": sid in self.discovered,
+            })
+        return out
+
+    def _target_arg(self, args: dict[str, Any]) -> TmuxTarget:
+        sock = args.get("tmux_socket")
+        if not isinstance(sock, str) or not sock:
+            raise ApiError("tmux_socket must be a path")
+        return TmuxTarget(socket_path=Path(sock))
+
+    def _add(self, args: dict[str, Any]) -> dict[str, Any]:
+        target = self._target_arg(args)
+        return {"server_id": target.server_id, "added": self.add(target)}
+
+    def _remove(self, args: dict[str, Any]) -> dict[str, Any]:
+        sid = args.get("server_id") or self._target_arg(args).server_id
+        if not isinstance(sid, str):
+            raise ApiError("server_id must be a string")
+        if not self.remove(sid):
+            raise ApiError(f"not managed: {sid!r}")
+        return {"server_id": sid, "stopping": True}
@@ -1,27 +1,39 @@
 from __future__ import annotations
 
+import os
 import selectors
 import subprocess
 import time
+from collections import deque
+from concurrent.futures import Future
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable
+from typing import Any, Callable, Iterable
+
+from .linereader import ChunkedLineReader
+from .tmux_target import default_tmux_command
+
+OUTPUT_PREFIX = b"%output "
+# Replaces %output once flow control (`refresh-client -f pause-after=N`) is on.
+EXTENDED_OUTPUT_PREFIX = b"%extended-output "
+_OUTPUT_PREFIXES = (OUTPUT_PREFIX, EXTENDED_OUTPUT_PREFIX)
 
 
 def is_output_line(line: str) -> bool:
-    """True if this tmux control-mode line is a `%output` event.
+    """True if this tmux control-mode line is a `%output`/`%extended-output` event.
 
-    In M1 we discard these lines to avoid flooding.
+    These never belong to a command response; the daemon routes them to
+    `amux.output` instead.
     """
 
-    return line.startswith("%output ")
+    return line.startswith(("%output ", "%extended-output "))
 
 
 @dataclass(frozen=True, slots=True)
 class ControlLine:
     """A minimally-parsed tmux control-mode line."""
 
-    kind: str  # begin|end|other
+    kind: str  # begin|end|error|other
     raw: str
     command_id: int | None = None
     command: str | None = None
@@ -39,10 +51,12 @@ class ControlLine:
             cmd = parts[1] if len(parts) > 1 else ""
             return ControlLine(kind="begin", raw=line, command_id=cmd_id, command=cmd)
 
-        if line.startswith("%end "):
-            rest = line[len("%end ") :].strip()
-            cmd_id = int(rest) if rest else 0
-            return ControlLine(kind="end", raw=line, command_id=cmd_id)
+        if line.startswith("%end ") or line.startswith("%error "):
+            # %end <id> [...] / %error <id> [...]
+            kind = "end" if line.startswith("%end ") else "error"
+            rest = line.split(" ", 1)[1].split()
+            cmd_id = int(rest[0]) if rest else 0
+            return ControlLine(kind=kind, raw=line, command_id=cmd_id)
 
         return ControlLine(kind="other", raw=line)
 
@@ -52,6 +66,7 @@ class CommandResponse:
     command_id: int
     command: str
     payload: str
+    error: bool = False  # block was closed by `%error` instead of `%end`
 
 
 class TmuxTimeoutError(TimeoutError):
@@ -123,7 +138,7 @@ class ResponseCollector:
             self._buf = []
             return None
 
-        if cl.kind == "end" and self._active_id is not None:
+        if cl.kind in ("end", "error") and self._active_id is not None:
             if int(cl.command_id or 0) != self._active_id:
                 # Unexpected end; ignore.
                 return None
@@ -134,6 +149,7 @@ class ResponseCollector:
                 command_id=self._active_id,
                 command=self._active_command or "",
                 payload=payload,
+                error=cl.kind == "error",
             )
             self.reset()
             return resp
@@ -149,35 +165,153 @@ class ResponseCollector:
         return None
 
 
+class CommandPipeline:
+    """Match `%begin/%end` blocks to outstanding commands, in submission order.
+
+    tmux runs control-mode commands one after another and never interleaves
+    their output blocks, so the N-th completed block answers the N-th command
+    written. That lets callers keep many commands in flight and only pay for
+    tmux's own throughput rather than a round-trip per command.
+
+    Futures can be `concurrent.futures.Future` or `asyncio.Future`; only
+    `done()`, `set_result()` and `set_exception()` are used.
+    """
+
+    def __init__(self, collector: ResponseCollector | None = None) -> None:
+        self._collector = collector or ResponseCollector()
+        self._pending: deque[tuple[str, Any]] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def push(self, cmd: str, fut: Any) -> None:
+        """Register `fut` as the receiver of the next unanswered response."""
+
+        self._pending.append((cmd, fut))
+
+    def feed_line(self, line: str) -> bool:
+        """Feed one control-mode line.
+
+        Returns True if the line belonged to a response block, False if it is
+        an async event (or `%output`) the caller should handle itself.
+        """
+
+        if is_output_line(line):
+            return False
+
+        was_active = self._collector.active
+        resp = self._collector.feed_line(line)
+        if resp is not None:
+            if _is_foreign_block(resp):
+                return True
+            if self._pending:
+                _cmd, fut = self._pending.popleft()
+                if not fut.done():
+                    fut.set_result(resp)
+            # else: unsolicited block (e.g. the attach-time one); drop it.
+            return True
+
+        if was_active and _is_notification(line):
+            # tmux can write notifications inside a block (e.g. the %continue
+            # a `refresh-client -A` causes); they are still events.
+            return False
+        return was_active or self._collector.active
+
+    def feed_raw(self, raw: bytes) -> bool:
+        """`feed_line()` for undecoded lines; output lines are never decoded."""
+
+        if raw.startswith(_OUTPUT_PREFIXES):
+            return False
+        return self.feed_line(raw.decode("utf-8", errors="replace"))
+
+    def fail_all(self, exc: BaseException) -> None:
+        """Fail every outstanding command and forget any partial block."""
+
+        self._collector.reset()
+        while self._pending:
+            _cmd, fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_exception(exc)
+
+
+def continue_commands(pane_ids: Iterable[str]) -> list[str]:
+    """`refresh-client -A` commands that let paused panes send output again."""
+
+    return [f"refresh-client -A '{pid}:continue'" for pid in pane_ids]
+
+
+def _is_notification(line: str) -> bool:
+    # Same heuristic `ResponseCollector` uses to keep these out of payloads.
+    return (
+        len(line) > 1
+        and line[0] == "%"
+        and not line[1].isdigit()
+        and not line.startswith(("%begin ", "%end ", "%error "))
+    )
+
+
+def _is_foreign_block(resp: CommandResponse) -> bool:
+    # Real tmux guard lines are `%begin <time> <number> <flags>`; flags is 0 for
+    # commands tmux ran on its own behalf (e.g. the attach-time new-session),
+    # which must not consume a caller's slot.
+    parts = resp.command.split(" ")
+    return len(parts) == 2 and parts[0].isdigit() and parts[1] == "0"
+
+
 class TmuxControlClient:
     """A small tmux control-mode client (M1).
 
     It keeps a long-lived `tmux -C` subprocess and can run commands by waiting
-    for `%begin/%end` responses.
+    for `%begin/%end` responses. Commands can be pipelined with `submit()` /
+    `command_many()`; async events seen while waiting are buffered and
+    returned by `poll_line()` / `poll_lines()` afterwards.
+
+    stdout is read in large chunks (`ChunkedLineReader`) and event lines stay
+    undecoded bytes until someone asks for them as text.
     """
 
-    def __init__(self, *, socket_path: Path, response_timeout_s: float = 5.0) -> None:
+    def __init__(
+        self,
+        *,
+        socket_path: Path,
+        response_timeout_s: float = 5.0,
+        tmux_command: list[str] | None = None,
+        pause_after_s: int = 0,
+    ) -> None:
         self.socket_path = socket_path
         self.response_timeout_s = response_timeout_s
-        self._p: subprocess.Popen[str] | None = None
+        self.tmux_command = tmux_command or default_tmux_command()
+        # With pause-after, tmux pauses a pane's output (`%pause`) once it is
+        # that many seconds behind instead of letting it flood the stream.
+        self.pause_after_s = pause_after_s
+        self.flow_control = False  # tmux accepted pause-after (3.2+)
+        self._p: subprocess.Popen[bytes] | None = None
         self._selector: selectors.BaseSelector | None = None
-        self._collector = ResponseCollector()
+        self._reader: ChunkedLineReader | None = None
+        self._pipeline = CommandPipeline()
+        self._events: deque[bytes] = deque()
 
     def start(self) -> None:
         if self._p is not None:
             return
 
         self._p = subprocess.Popen(
-            ["tmux", "-C", "-S", str(self.socket_path)],
+            [*self.tmux_command, "-C", "-S", str(self.socket_path)],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
+            bufsize=0,
         )
         assert self._p.stdout is not None
+        fd = self._p.stdout.fileno()
+        os.set_blocking(fd, False)
+        self._reader = ChunkedLineReader(fd)
         self._selector = selectors.DefaultSelector()
-        self._selector.register(self._p.stdout, selectors.EVENT_READ)
+        self._selector.register(fd, selectors.EVENT_READ)
+        if self.pause_after_s > 0:
+            resp = self.command(f"refresh-client -f pause-after={self.pause_after_s}")
+            self.flow_control = not resp.error
 
     def close(self) -> None:
         if self._selector is not None:
@@ -194,31 +328,88 @@ class TmuxControlClient:
                 pass
             self._p = None
 
-        self._collector.reset()
+        self._reader = None
+        self._pipeline.fail_all(RuntimeError("client closed"))
+        self._events.clear()
+
+    def _fill(self, timeout: float = 0) -> bool:
+        """Read whatever tmux has written (waiting up to `timeout`).
+
+        Response lines go straight into the pipeline; event lines are queued
+        undecoded. Returns False once the control-mode stream has ended.
+        """
+
+        if self._p is None or self._selector is None or self._reader is None:
+            return False
+        if not self._selector.select(timeout=timeout):
+            return self._p.poll() is None
+
+        lines = self._reader.read_lines()
+        if lines is None:
+            return False
+        for raw in lines:
+            if not self._pipeline.feed_raw(raw):
+                self._events.append(raw)
+        return True
+
+    def poll_lines(self) -> list[bytes]:
+        """Return every buffered event line, undecoded, without blocking."""
+
+        self._fill()
+        out = list(self._events)
+        self._events.clear()
+        return out
 
     def poll_line(self) -> str | None:
-        if self._p is None or self._selector is None:
-            return None
-        if self._p.poll() is not None:
+        if not self._events:
+            self._fill()
+        if not self._events:
             return None
-        assert self._p.stdout is not None
+        return self._events.popleft().decode("utf-8", errors="replace")
 
-        events = self._selector.select(timeout=0)
-        if not events:
-            return None
-        line = self._p.stdout.readline()
-        if not line:
-            return None
-        return line.rstrip("\n")
+    def submit_many(self, cmds: Iterable[str]) -> list[Future[CommandResponse]]:
+        """Write `cmds` in one go and return a future per command."""
 
-    def command(self, cmd: str) -> CommandResponse:
         if self._p is None:
             raise RuntimeError("client not started")
         if self._p.poll() is not None:
             raise RuntimeError("tmux control-mode process exited")
         assert self._p.stdin is not None
 
-        self._p.stdin.write(cmd + "\n")
-        self._p.stdin.flush()
+        cmds = list(cmds)
+        futs: list[Future[CommandResponse]] = []
+        for cmd in cmds:
+            fut: Future[CommandResponse] = Future()
+            self._pipeline.push(cmd, fut)
+            futs.append(fut)
+
+        if cmds:
+            self._p.stdin.write("".join(c + "\n" for c in cmds).encode("utf-8"))
+            self._p.stdin.flush()
+        return futs
+
+    def submit(self, cmd: str) -> Future[CommandResponse]:
+        return self.submit_many([cmd])[0]
+
+    def wait(self, futures: Iterable[Future[CommandResponse]]) -> None:
+        """Read from tmux until all `futures` are resolved (or time out)."""
+
+        waiting = list(futures)
+        deadline = time.monotonic() + self.response_timeout_s
+        while not all(f.done() for f in waiting):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                exc = TmuxTimeoutError(f"tmux control-mode response timed out after {self.response_timeout_s}s")
+                self._pipeline.fail_all(exc)
+                raise exc
+            # Block in select() rather than spinning on sleep().
+            if not self._fill(min(0.05, remaining)):
+                raise RuntimeError("tmux control-mode process exited")
+
+    def command_many(self, cmds: Iterable[str]) -> list[CommandResponse]:
+        futs = self.submit_many(cmds)
+        self.wait(futs)
+        return [f.result() for f in futs]
 
-        return wait_for_response(self._collector, self.poll_line, timeout_s=self.response_timeout_s)
+    def command(self, cmd: str) -> CommandResponse:
+        return self.command_many([cmd])[0]
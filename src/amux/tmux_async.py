@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from .linereader import LineSplitter
+from .tmux import CommandPipeline, CommandResponse, TmuxTimeoutError
+from .tmux_target import default_tmux_command
+
+
+class AsyncTmuxControlClient:
+    """asyncio tmux control-mode client.
+
+    A reader task feeds every line from `tmux -C` into a `CommandPipeline`;
+    lines that are not command output are handed to `on_event` as undecoded
+    bytes. Nothing polls: the event loop only wakes when tmux writes something.
+    A command that times out closes the client (`wait_closed()` returns).
+    """
+
+    def __init__(
+        self,
+        *,
+        socket_path: Path,
+        response_timeout_s: float = 5.0,
+        on_event: Callable[[bytes], None] | None = None,
+        tmux_command: list[str] | None = None,
+        pause_after_s: int = 0,
+        on_command_time: Callable[[float], None] | None = None,
+    ) -> None:
+        self.socket_path = socket_path
+        self.response_timeout_s = response_timeout_s
+        self.tmux_command = tmux_command or default_tmux_command()
+        self.pause_after_s = pause_after_s
+        self.flow_control = False  # tmux accepted pause-after (3.2+)
+        self.on_event = on_event
+        self.on_command_time = on_command_time  # seconds from write to response, per command
+        self._proc: asyncio.subprocess.Process | None = None
+        self._writer: Any = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._closed: asyncio.Event | None = None
+        self._pipeline = CommandPipeline()
+
+    @property
+    def connected(self) -> bool:
+        return self._closed is not None and not self._closed.is_set()
+
+    async def start(self) -> None:
+        if self._proc is not None:
+            return
+
+        self._proc = await asyncio.create_subprocess_exec(
+            *self.tmux_command,
+            "-C",
+            "-S",
+            str(self.socket_path),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        assert self._proc.stdout is not None
+        self.attach(self._proc.stdout, self._proc.stdin)
+        if self.pause_after_s > 0:
+            resp = await self.command(f"refresh-client -f pause-after={self.pause_after_s}")
+            self.flow_control = not resp.error
+
+    def attach(self, reader: asyncio.StreamReader, writer: Any) -> None:
+        """Run the client over existing streams (used by `start()` and tests).
+
+        `writer` only needs `write(bytes)`.
+        """
+
+        self._writer = writer
+        self._closed = asyncio.Event()
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop(reader))
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        splitter = LineSplitter()
+        try:
+            while True:
+                chunk = await reader.read(64 * 1024)
+                if not chunk:
+                    break
+                for raw in splitter.feed(chunk):
+                    if not self._pipeline.feed_raw(raw) and self.on_event is not None:
+                        self.on_event(raw)
+        finally:
+            self._pipeline.fail_all(RuntimeError("tmux control-mode process exited"))
+            assert self._closed is not None
+            self._closed.set()
+
+    async def wait_closed(self) -> None:
+        """Return once the control-mode stream has ended."""
+
+        if self._closed is None:
+            return
+        await self._closed.wait()
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+
+        if self._proc is not None:
+            try:
+                self._proc.terminate()
+            except ProcessLookupError:
+                pass
+            try:
+                await asyncio.wait_for(self._proc.wait(), timeout=1.0)
+            except (asyncio.TimeoutError, Exception):
+                pass
+            self._proc = None
+
+        self._writer = None
+        self._pipeline.fail_all(RuntimeError("client closed"))
+
+    def submit_many(self, cmds: Iterable[str]) -> list[asyncio.Future[CommandResponse]]:
+        """Write `cmds` in one go and return a future per command."""
+
+        if not self.connected or self._writer is None:
+            raise RuntimeError("tmux control-mode process exited")
+
+        loop = asyncio.get_running_loop()
+        cmds = list(cmds)
+        futs: list[asyncio.Future[CommandResponse]] = []
+        for cmd in cmds:
+            fut: asyncio.Future[CommandResponse] = loop.create_future()
+            self._pipeline.push(cmd, fut)
+            futs.append(fut)
+
+        if cmds:
+            self._writer.write("".join(c + "\n" for c in cmds).encode("utf-8"))
+            if self.on_command_time is not None:
+                sent, report = loop.time(), self.on_command_time
+
+                def done(fut: asyncio.Future[CommandResponse]) -> None:
+                    if not fut.cancelled() and fut.exception() is None:
+                        report(loop.time() - sent)
+
+                for fut in futs:
+                    fut.add_done_callback(done)
+        return futs
+
+    async def command_many(self, cmds: Iterable[str]) -> list[CommandResponse]:
+        futs = self.submit_many(cmds)
+        if not futs:
+            return []
+        try:
+            return list(await asyncio.wait_for(asyncio.gather(*futs), timeout=self.response_timeout_s))
+        except asyncio.TimeoutError:
+            exc = TmuxTimeoutError(f"tmux control-mode response timed out after {self.response_timeout_s}s")
+            self._pipeline.fail_all(exc)
+            # Responses are matched by order: a late one would answer the next
+            # command. Close, so the owner reconnects instead of reusing us.
+            await self.close()
+            raise exc from None
+
+    async def command(self, cmd: str) -> CommandResponse:
+        return (await self.command_many([cmd]))[0]
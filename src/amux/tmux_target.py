@@ -26,3 +26,18 @@ def default_tmux_socket() -> Path:
 
     uid = os.getuid()
     return Path(f"/tmp/tmux-{uid}/default")
+
+
+def default_tmux_command() -> list[str]:
+    """argv prefix used to start tmux; `-C -S <socket>` is appended.
+
+    `$AMUX_TMUX_COMMAND` swaps in another program, e.g. the trace replayer
+    (`python -m amux.faketmux replay --trace t.log`) or recorder.
+    """
+
+    cmd = os.environ.get("AMUX_TMUX_COMMAND")
+    if not cmd:
+        return ["tmux"]
+    import shlex
+
+    return shlex.split(cmd)
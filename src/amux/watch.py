@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .actions import Action
+
+# CSI / OSC / two-byte escape sequences; stripped before matching.
+_ANSI_RE = re.compile(rb"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+# Hex digits after `\x`, `\u`, `\U` in a pattern.
+_HEX_ESCAPES = {"x": 2, "u": 4, "U": 8}
+
+
+@dataclass(frozen=True, slots=True)
+class WatchRule:
+    """A single-line regex watch (M2)."""
+
+    id: str
+    pattern: str
+    panes: frozenset[str] | None = None  # None = every pane
+    cooldown_s: float = 30.0
+    actions: tuple[Action, ...] = ()  # run on each match (see actions.py)
+
+    @staticmethod
+    def from_dict(d: dict[str, Any]) -> "WatchRule":
+        panes = d.get("panes")
+        return WatchRule(
+            id=str(d["id"]),
+            pattern=str(d["pattern"]),
+            panes=frozenset(panes) if panes else None,
+            cooldown_s=float(d.get("cooldown_s", 30.0)),
+            actions=tuple(Action.from_dict(a) for a in d.get("actions", ())),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class WatchMatch:
+    rule_id: str
+    pane_id: str
+    line: str
+    at: float
+
+
+def required_literal(pattern: str) -> str | None:
+    """Longest literal every match of `pattern` must contain, if easy to prove.
+
+    Conservative: anything inside groups, classes or before an optional
+    quantifier is ignored, and top-level alternation yields None.
+    """
+
+    best = ""
+    run: list[str] = []
+    depth = 0
+    i = 0
+    n = len(pattern)
+
+    def flush() -> None:
+        nonlocal best
+        if len(run) > len(best):
+            best = "".join(run)
+        run.clear()
+
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1 : i + 2]
+            i += 2
+            if nxt and not nxt.isalnum():
+                if depth == 0:
+                    run.append(nxt)
+                continue
+            # \d, \b, \x41, \u00e9, \N{...}, \1, \012: not decoded, so they end the run;
+            # skip the rest of the escape too, or its digits would look literal.
+            flush()
+            if nxt in _HEX_ESCAPES:
+                i += _HEX_ESCAPES[nxt]
+            elif nxt == "N" and pattern[i : i + 1] == "{":
+                close = pattern.find("}", i)
+                i = n if close < 0 else close + 1
+            elif nxt.isdigit():
+                while i < n and pattern[i].isdigit():
+                    i += 1
+            continue
+        if c == "[":
+            flush()
+            i += 1
+            if pattern[i : i + 1] == "^":
+                i += 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        if c in "*?{":
+            # The previous atom is optional (or repeated an unknown number of times).
+            if run:
+                run.pop()
+            flush()
+            if c == "{":
+                close = pattern.find("}", i)
+                i = n if close < 0 else close + 1
+            else:
+                i += 1
+            if pattern[i : i + 1] in ("?", "+"):
+                i += 1
+            continue
+        if c == "+":
+            flush()
+            i += 1
+            if pattern[i : i + 1] in ("?", "+"):
+                i += 1
+            continue
+        if c == "|" and depth == 0:
+            return None
+        if c in "()|.^$":
+            depth += c == "("
+            depth -= c == ")"
+            flush()
+            i += 1
+            continue
+        if depth == 0:
+            run.append(c)
+        i += 1
+
+    flush()
+    return best if len(best) >= 2 else None
+
+
+def _trie_regex(words: Iterable[bytes]) -> bytes:
+    """Regex source matching any of `words`, shaped as a trie.
+
+    A flat `a|b|c...` alternation makes `re` try every branch at every
+    position; a trie tries one byte per level. Since we only need to know
+    whether *some* word occurs, a word that is a prefix of another ends the
+    branch.
+    """
+
+    trie: dict[int, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[-1] = True
+
+    def build(node: dict[int, Any]) -> bytes:
+        if -1 in node:
+            return b""
+        alts = [re.escape(bytes([ch])) + build(child) for ch, child in sorted(node.items())]
+        if len(alts) == 1:
+            return alts[0]
+        return b"(?:" + b"|".join(alts) + b")"
+
+    return build(trie)
+
+
+class _CompiledRule:
+    __slots__ = ("rule", "regex", "literal", "ignore_case")
+
+    def __init__(self, rule: WatchRule) -> None:
+        self.rule = rule
+        # A str pattern, run on the decoded line: `\w`, `\d` and (?i) keep their
+        # Unicode meaning. Only the literal prefilter works on bytes.
+        self.regex = re.compile(rule.pattern)
+        self.ignore_case = bool(self.regex.flags & re.IGNORECASE)
+        lit = None if self.regex.flags & re.VERBOSE else required_literal(rule.pattern)
+        if lit is not None and self.ignore_case and not lit.isascii():
+            lit = None  # bytes.lower() only folds ASCII
+        self.literal: bytes | None = None
+        if lit is not None:
+            self.literal = lit.encode("utf-8").lower() if self.ignore_case else lit.encode("utf-8")
+
+
+class WatchEngine:
+    """Evaluate a whole watch rule set against pane output.
+
+    Every line first goes through one prefilter: a trie regex over the
+    literals the rules require, plus one alternation of the rules that have
+    no usable literal (usually none). Only lines that pass it run the individual rules.
+    `%output` chunks are re-assembled into lines per pane, and cooldowns are
+    a dict lookup per `(rule, pane)`.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[WatchRule],
+        *,
+        max_line_bytes: int = 4096,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_line_bytes = max_line_bytes
+        self.monotonic = monotonic
+        self._rules = [_CompiledRule(r) for r in rules]
+        self._partial: dict[str, bytes] = {}
+        self._next_allowed: dict[str, dict[str, float]] = {}  # pane_id -> rule_id -> monotonic
+
+        self._all_panes = any(r.rule.panes is None for r in self._rules)
+        self._scoped_panes: frozenset[str] = frozenset().union(
+            *(r.rule.panes for r in self._rules if r.rule.panes is not None)
+        )
+
+        # All literals go into one trie, searched against the lower-cased line:
+        # a single scan per line, and exact-case rules are re-checked below.
+        literals = [r.literal.lower() for r in self._rules if r.literal is not None]
+        self._literal_re = re.compile(_trie_regex(literals)) if literals else None
+        # Unicode case folding reaches past ASCII ("K" for KELVIN SIGN, "s" for
+        # LONG S), so a non-ASCII line skips the prefilter for (?i) literals.
+        self._icase_literals = any(r.ignore_case and r.literal is not None for r in self._rules)
+        rest = [r for r in self._rules if r.literal is None]
+        # Joining renumbers groups, which breaks backreferences: rules with
+        # groups keep their own regex.
+        plain = [r for r in rest if r.regex.groups == 0]
+        self._rest_res: list[re.Pattern[str]] = [r.regex for r in rest if r.regex.groups]
+        if len(plain) == 1:
+            self._rest_res.append(plain[0].regex)
+        elif plain:
+            try:
+                self._rest_res.append(re.compile("|".join("(?:" + r.regex.pattern + ")" for r in plain)))
+            except re.error:
+                # e.g. inline global flags; fall back to one search per rule.
+                self._rest_res += [r.regex for r in plain]
+
+    @property
+    def rules(self) -> list[WatchRule]:
+        return [r.rule for r in self._rules]
+
+    @property
+    def all_panes(self) -> bool:
+        """True if some rule applies to every pane."""
+
+        return self._all_panes
+
+    @property
+    def scoped_panes(self) -> frozenset[str]:
+        return self._scoped_panes
+
+    def watches_pane(self, pane_id: str) -> bool:
+        return self._all_panes or pane_id in self._scoped_panes
+
+    def feed(self, pane_id: str, data: bytes) -> list[WatchMatch]:
+        """Feed unescaped `%output` bytes; returns matches for completed lines."""
+
+        if not self._rules or not self.watches_pane(pane_id):
+            return []
+
+        partial = self._partial.pop(pane_id, b"")
+        if b"\n" not in data:
+            partial += data
+            if len(partial) > self.max_line_bytes:
+                # Over-long line: match what we have rather than buffer forever.
+                return self.match_line(pane_id, partial)
+            self._partial[pane_id] = partial
+            return []
+
+        lines = data.split(b"\n")
+        if partial:
+            lines[0] = partial + lines[0]
+        tail = lines.pop()
+        if tail:
+            self._partial[pane_id] = tail[-self.max_line_bytes :]
+
+        out: list[WatchMatch] = []
+        for line in lines:
+            if line:
+                out += self.match_line(pane_id, line)
+        return out
+
+    def match_line(self, pane_id: str, line: bytes) -> list[WatchMatch]:
+        if b"\x1b" in line:
+            line = _ANSI_RE.sub(b"", line)
+        if line.endswith(b"\r"):
+            line = line[:-1]
+
+        lowered = line.lower()
+        ascii_line = line.isascii()
+        text: str | None = None
+        if not (
+            (self._literal_re is not None and self._literal_re.search(lowered) is not None)
+            or (self._icase_literals and not ascii_line)
+        ):
+            if not self._rest_res:
+                return []
+            text = line.decode("utf-8", "replace")
+            if not any(rx.search(text) is not None for rx in self._rest_res):
+                return []
+
+        out: list[WatchMatch] = []
+        now: float | None = None
+        for r in self._rules:
+            rule = r.rule
+            if rule.panes is not None and pane_id not in rule.panes:
+                continue
+            if r.literal is not None:
+                if r.ignore_case:
+                    if ascii_line and r.literal not in lowered:
+                        continue
+                elif r.literal not in line:
+                    continue
+            if text is None:
+                text = line.decode("utf-8", "replace")
+            if r.regex.search(text) is None:
+                continue
+
+            if now is None:
+                now = self.monotonic()
+            cooldowns = self._next_allowed.setdefault(pane_id, {})
+            if now < cooldowns.get(rule.id, 0.0):
+                continue
+            cooldowns[rule.id] = now + rule.cooldown_s
+            out.append(WatchMatch(rule_id=rule.id, pane_id=pane_id, line=text, at=now))
+        return out
+
+    def discard(self, pane_id: str) -> None:
+        """Forget a closed pane's partial line and cooldowns."""
+
+        self._partial.pop(pane_id, None)
+        self._next_allowed.pop(pane_id, None)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+
+def test_action_validation() -> None:
+    from amux.actions import Action, send_keys_command
+    from amux.watch import WatchRule
+
+    rule = WatchRule.from_dict({
+        "id": "w",
+        "pattern": "y/n",
+        "actions": [{"type": "send-keys", "keys": ["y", "Enter"]}, {"type": "webhook", "url": "http://127.0.0.1:9/h"}],
+    })
+    assert [a.kind for a in rule.actions] == ["send-keys", "webhook"]
+    assert send_keys_command("%3", ("echo 'hi'", "Enter")) == "send-keys -t '%3' 'echo '\"'\"'hi'\"'\"'' Enter"
+    for bad in (
+        {"type": "webhook", "url": "https://example.com/hook"},
+        {"type": "shell"},
+        {"type": "send-keys", "keys": []},
+        {"type": "email"},
+    ):
+        with pytest.raises(ValueError):
+            Action.from_dict(bad)
+
+
+def _job(rule_id: str, n: int, kind: str = "send-keys", **kw):
+    from amux.actions import Action, ActionJob
+
+    return ActionJob(rule_id, f"%{n}", "line", Action(kind, keys=("x",), **kw))
+
+
+def test_per_rule_and_global_limits_queue_the_rest() -> None:
+    from amux.actions import ActionExecutor
+
+    started: list[str] = []
+
+    async def main() -> ActionExecutor:
+        gate = asyncio.Event()
+
+        async def send_keys(pane_id: str, _keys: tuple[str, ...]) -> None:
+            started.append(pane_id)
+            await gate.wait()
+
+        ex = ActionExecutor(send_keys=send_keys, workers=2, per_rule=1)
+        for n in (1, 2, 3):
+            assert ex.submit(_job("a", n))
+        assert ex.submit(_job("b", 4))
+        await asyncio.sleep(0.01)
+        # One "a" and the "b" run; the other two "a" jobs wait their turn.
+        assert started == ["%1", "%4"] and ex.report()["queued"] == 2
+        gate.set()
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if not ex.running and not ex.report()["queued"]:
+                break
+        return ex
+
+    ex = asyncio.run(main())
+    assert started == ["%1", "%4", "%2", "%3"]
+    assert ex.report()["rules"]["a"]["send-keys"]["ok"] == 3
+
+
+def test_drop_policy_and_timeouts() -> None:
+    from amux.actions import ActionExecutor
+
+    results: list[str] = []
+
+    async def hang(_pane_id: str, _keys: tuple[str, ...]) -> None:
+        await asyncio.sleep(10)
+
+    async def main() -> ActionExecutor:
+        ex = ActionExecutor(
+            send_keys=hang, workers=1, policy="drop", timeout_s=0.05, on_done=lambda r, _t: results.append(r)
+        )
+        assert ex.submit(_job("a", 1))
+        assert not ex.submit(_job("b", 2))
+        await asyncio.sleep(0.2)
+        await ex.stop()
+        return ex
+
+    ex = asyncio.run(main())
+    assert sorted(results) == ["dropped", "timeout"]
+    rules = ex.report()["rules"]
+    assert rules["a"]["send-keys"]["timeouts"] == 1 and rules["b"]["send-keys"]["dropped"] == 1
+
+
+def test_shell_hooks_get_match_env_and_are_killed_on_timeout(tmp_path: Path) -> None:
+    from amux.actions import Action, ActionExecutor, ActionJob
+
+    out = tmp_path / "hook.out"
+
+    async def no_keys(_pane_id: str, _keys: tuple[str, ...]) -> None:
+        raise AssertionError
+
+    async def main() -> ActionExecutor:
+        ex = ActionExecutor(send_keys=no_keys, workers=4, per_rule=4, timeout_s=5)
+        ex.submit(ActionJob("ok", "%7", "BUILD FAILED", Action("shell", command=f'echo "$AMUX_PANE_ID $AMUX_LINE" > {out}')))
+        ex.submit(ActionJob("bad", "%7", "x", Action("shell", command="echo nope >&2; exit 3")))
+        ex.submit(ActionJob("slow", "%7", "x", Action("shell", command="sleep 30", timeout_s=0.2)))
+        t0 = time.monotonic()
+        while ex.running and time.monotonic() - t0 < 5:
+            await asyncio.sleep(0.02)
+        return ex
+
+    ex = asyncio.run(main())
+    assert out.read_text() == "%7 BUILD FAILED\n"
+    rules = ex.report()["rules"]
+    assert rules["ok"]["shell"]["ok"] == 1
+    assert rules["bad"]["shell"]["failed"] == 1 and "exit 3: nope" in rules["bad"]["shell"]["last_error"]
+    assert rules["slow"]["shell"]["timeouts"] == 1 and rules["slow"]["shell"]["max_s"] < 2
+
+    ex.write_stats(tmp_path / "actions.json")
+    assert json.loads((tmp_path / "actions.json").read_text())["rules"]["ok"]["shell"]["ok"] == 1
+
+
+def test_webhook_posts_the_match() -> None:
+    from amux.actions import Action, ActionExecutor, ActionJob
+
+    received: list[dict] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *_args) -> None:
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def no_keys(_pane_id: str, _keys: tuple[str, ...]) -> None:
+        raise AssertionError
+
+    async def main() -> ActionExecutor:
+        ex = ActionExecutor(send_keys=no_keys)
+        url = f"http://127.0.0.1:{server.server_port}/hook"
+        ex.submit(ActionJob("w", "%2", "error: x", Action.from_dict({"type": "webhook", "url": url})))
+        while ex.running:
+            await asyncio.sleep(0.01)
+        await ex.stop()
+        return ex
+
+    try:
+        ex = asyncio.run(main())
+    finally:
+        server.shutdown()
+    assert received == [{"rule_id": "w", "pane_id": "%2", "line": "error: x"}]
+    assert ex.report()["rules"]["w"]["webhook"]["ok"] == 1
+
+
+def test_runtime_runs_rule_actions_through_the_control_client(tmp_path: Path) -> None:
+    from test_runtime import FakeClient
+
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_target import TmuxTarget
+
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json", client_factory=FakeClient)
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if "%1" in rt.tracker.panes:
+                break
+        rt.load_watches([{"id": "ask", "pattern": r"\(y/n\)", "actions": [{"type": "send-keys", "keys": ["y", "Enter"]}]}])
+        rt.handle_output("%1", b"Continue? (y/n)\r\n")
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if not rt.actions.running:
+                break
+        assert "send-keys -t '%1' y Enter" in rt.client.commands
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
+    assert rt.metrics.actions.values == {"ok": 1.0}
+    stats = json.loads((tmp_path / "actions.json").read_text())
+    assert stats["rules"]["ask"]["send-keys"]["ok"] == 1
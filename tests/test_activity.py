@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _procs(**ticks: int):
+    from amux.procscan import ProcStat
+
+    # pid 10 is %1's shell, 11 its child; pid 20 is %2's shell.
+    return {
+        10: ProcStat(ppid=1, starttime=5, cpu_ticks=ticks.get("shell", 0)),
+        11: ProcStat(ppid=10, starttime=6, cpu_ticks=ticks.get("child", 0)),
+        20: ProcStat(ppid=1, starttime=7, cpu_ticks=ticks.get("other", 0)),
+    }
+
+
+TREES = {"%1": [10, 11], "%2": [20]}
+
+
+def test_cpu_use_makes_a_pane_busy_until_quiet() -> None:
+    from amux.activity import ActivityTracker
+
+    clock = Clock()
+    t = ActivityTracker(busy_cpu=0.05, quiet_s=5.0, clock_ticks=100, monotonic=clock)
+    agents = {"%1": "claude", "%2": None}
+
+    # First sample is the baseline: lots of past CPU does not count.
+    assert t.sample(_procs(child=5000, other=9000), TREES, agents) == {"%1": "waiting", "%2": "idle"}
+
+    # 2 s later the child used 50 ticks (25% of a core): busy. %2 used 5 (2.5%): no change.
+    clock.now += 2
+    assert t.sample(_procs(child=5050, other=9005), TREES, agents) == {"%1": "busy"}
+
+    # Quiet again, but still inside quiet_s: no flip yet.
+    clock.now += 2
+    assert t.sample(_procs(child=5050, other=9005), TREES, agents) == {}
+    clock.now += 4
+    assert t.sample(_procs(child=5050, other=9005), TREES, agents) == {"%1": "waiting"}
+
+
+def test_output_and_new_processes_count_as_activity() -> None:
+    from amux.activity import ActivityTracker
+    from amux.procscan import ProcStat
+
+    clock = Clock()
+    t = ActivityTracker(busy_cpu=0.05, quiet_s=5.0, clock_ticks=100, monotonic=clock)
+    agents: dict[str, str | None] = {}
+    procs = _procs()
+    assert t.sample(procs, TREES, agents) == {"%1": "idle", "%2": "idle"}
+
+    clock.now += 1
+    t.note_output("%2")
+    clock.now += 1
+    assert t.sample(procs, TREES, agents) == {"%2": "busy"}
+
+    # A process that appeared since the last sample counts with all its CPU.
+    clock.now += 6
+    procs = {**procs, 21: ProcStat(ppid=20, starttime=900, cpu_ticks=80)}
+    assert t.sample(procs, {"%1": [10, 11], "%2": [20, 21]}, agents) == {}
+    clock.now += 6
+    assert t.sample(procs, {"%1": [10, 11], "%2": [20, 21]}, agents) == {"%2": "idle"}
+
+
+def test_gone_panes_are_forgotten() -> None:
+    from amux.activity import ActivityTracker
+
+    clock = Clock()
+    t = ActivityTracker(clock_ticks=100, monotonic=clock)
+    t.sample(_procs(), TREES, {})
+    t.note_output("%2")
+    clock.now += 2
+    assert t.sample(_procs(), {"%1": [10, 11]}, {}) == {}
+    assert set(t.status) == {"%1"} and "%2" not in t.output_at
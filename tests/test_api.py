@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+
+def _runtime(tmp_path: Path):
+    from amux.runtime import DaemonRuntime
+    from amux.state import DaemonStatus, PaneState
+    from amux.tmux_target import TmuxTarget
+
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "tmux.sock"), tmp_path / "state.json")
+    st = rt.store.state
+    st.daemon = DaemonStatus(pid=42, started_at=1.0, tmux_state="connected")
+    st.panes["%1"] = PaneState("%1", 10, "claude", "/src", "@1")
+    rt.handle_output("%1", b"hello\n")
+    return rt
+
+
+def test_batch_request_answers_each_op_in_order(tmp_path: Path) -> None:
+    from amux.api import ApiServer
+
+    api = ApiServer(_runtime(tmp_path), tmp_path / "api.sock")
+    line = json.dumps({"id": 3, "ops": [
+        {"op": "status"},
+        {"op": "pane", "pane_id": "%1"},
+        {"op": "pane", "pane_id": "%9"},
+        {"op": "tail", "pane_id": "%1", "bytes": 3},
+        {"op": "nope"},
+    ]}).encode() + b"\n"
+
+    resp = json.loads(api.handle_line(line))
+    assert resp["id"] == 3
+    status, pane, missing, tail, unknown = resp["results"]
+    assert status["result"]["tmux_state"] == "connected"
+    assert status["result"]["panes"] == 1
+    assert pane == {"ok": True, "result": {"pid": 10, "command": "claude", "cwd": "/src", "window": "@1"}}
+    assert missing["ok"] is False
+    assert tail["result"] == "lo\n"
+    assert unknown == {"ok": False, "error": "unknown op: 'nope'"}
+
+    assert "error" in json.loads(api.handle_line(b"{not json\n"))
+
+
+def test_malformed_ops_get_an_error_not_a_dropped_connection(tmp_path: Path) -> None:
+    from amux.api import ApiServer
+
+    api = ApiServer(_runtime(tmp_path), tmp_path / "api.sock")
+    api.handlers["boom"] = lambda _args: 1 / 0
+    line = json.dumps({"id": 1, "ops": [
+        {"op": "pane", "pane_id": [1]},
+        {"op": [1]},
+        {"op": "tail", "pane_id": {}},
+        {"op": "status_line", "window": ["@1"]},
+        {"op": "boom"},
+        {"op": "ping"},
+    ]}).encode()
+
+    pane, op, tail, status_line, boom, ping = json.loads(api.handle_line(line))["results"]
+    assert pane == {"ok": False, "error": "no such pane: [1]"}
+    assert op == {"ok": False, "error": "op must be a string"}
+    assert tail == {"ok": False, "error": "no such pane: {}"}
+    assert status_line["ok"] is False
+    assert boom == {"ok": False, "error": "internal error in boom: ZeroDivisionError"}
+    assert ping == {"ok": True, "result": "pong"}
+
+
+def test_socket_serves_concurrent_clients(tmp_path: Path) -> None:
+    from amux.api import ApiServer
+    from amux.api_client import api_call, api_request
+
+    path = tmp_path / "api.sock"
+    api = ApiServer(_runtime(tmp_path), path)
+
+    async def main() -> None:
+        await api.start()
+        assert path.stat().st_mode & 0o777 == 0o600
+        calls = [asyncio.to_thread(api_call, path, "panes") for _ in range(8)]
+        calls.append(asyncio.to_thread(api_request, path, [{"op": "ping"}, {"op": "watches"}]))
+        *panes, batch = await asyncio.gather(*calls)
+        assert all(p["%1"]["command"] == "claude" for p in panes)
+        assert batch == [{"ok": True, "result": "pong"}, {"ok": True, "result": []}]
+        await api.close()
+
+    asyncio.run(main())
+    assert not path.exists()
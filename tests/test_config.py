@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+def test_load_config_defaults_when_missing(tmp_path: Path) -> None:
+    from amux.config import load_config
+
+    cfg = load_config(tmp_path / "missing.toml")
+    assert cfg.output.buffer_bytes == 64 * 1024
+
+
+def test_load_config_overrides(tmp_path: Path) -> None:
+    from amux.config import load_config
+
+    path = tmp_path / "config.toml"
+    path.write_text("[output]\nbuffer_bytes = 1024\ntotal_bytes = 4096\n", encoding="utf-8")
+    cfg = load_config(path)
+    assert cfg.output.buffer_bytes == 1024
+    assert cfg.output.total_bytes == 4096
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[output]\nbuffer_kb = 1\n",
+        "[nope]\nx = 1\n",
+        "[output]\nbuffer_bytes = \"big\"\n",
+        "[output]\nbuffer_bytes = 0\n",
+        "[output]\ntotal_bytes = -1\n",
+        "[flow]\nresumes_per_s = 0\n",
+        "[agents]\nscan_interval_s = 0\n",
+        "[logs]\nsegment_bytes = 0\n",
+    ],
+)
+def test_load_config_rejects_bad_input(tmp_path: Path, text: str) -> None:
+    from amux.config import ConfigError, load_config
+
+    path = tmp_path / "config.toml"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ConfigError):
+        load_config(path)
+
+
+def test_amux_config_path(monkeypatch: pytest.MonkeyPatch) -> None:
+    from amux.paths import amux_config_path
+
+    monkeypatch.setenv("XDG_CONFIG_HOME", "/custom/config")
+    assert amux_config_path() == Path("/custom/config/amux/config.toml")
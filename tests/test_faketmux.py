@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import sys
+from pathlib import Path
+
+FAKE = [sys.executable, "-m", "amux.faketmux"]
+
+
+def test_fake_server_answers_refresh_queries() -> None:
+    from amux.faketmux import FakeServer
+    from amux.resync import LIST_PANES_FORMAT, parse_list_panes_payload
+
+    server = FakeServer(6, panes_per_window=4)
+    error, rows = server.answer(f"list-panes -a -F '{LIST_PANES_FORMAT}'")
+    panes = parse_list_panes_payload(b"".join(r + b"\n" for r in rows).decode())
+    assert not error
+    assert [p.window for p in panes.values()] == ["@0"] * 4 + ["@1"] * 2
+
+    assert server.answer("list-panes -t '@1' -F '#{pane_id}'") == (False, [b"%4", b"%5"])
+    assert server.answer("display-message -p -t '%2' '#{window_id}'") == (False, [b"@0"])
+    assert server.answer("list-panes -t '@9' -F '#{pane_id}'")[0] is True
+    assert server.answer("frobnicate")[0] is True
+
+
+def test_sync_client_runs_against_fake_tmux(tmp_path: Path) -> None:
+    from amux.tmux import TmuxControlClient
+
+    client = TmuxControlClient(
+        socket_path=tmp_path / "sock",
+        tmux_command=[*FAKE, "synthetic", "--panes", "50", "--output-rate", "0", "--lifecycle-rate", "0"],
+    )
+    client.start()
+    try:
+        listed, bad = client.command_many(["list-panes -a -F '#{pane_id}'", "frobnicate"])
+    finally:
+        client.close()
+    assert len(listed.payload.splitlines()) == 50
+    assert bad.error
+
+
+def test_replay_uses_recorded_responses_and_events(tmp_path: Path) -> None:
+    from amux.tmux_async import AsyncTmuxControlClient
+
+    trace = tmp_path / "session.trace"
+    trace.write_text(
+        "0.000\t<\t%begin 1 1 0\n"
+        "0.000\t<\t%end 1 1 0\n"
+        "0.010\t>\tlist-panes -a -F x\n"
+        "0.011\t<\t%begin 1 2 1\n"
+        "0.011\t<\t%42\t1\tclaude\t/src\t@7\n"
+        "0.011\t<\t%end 1 2 1\n"
+        "0.020\t<\t%window-add @8\n"
+        "0.030\t<\t%output %42 hi\\015\\012\n"
+    )
+    events: list[bytes] = []
+
+    async def main() -> str:
+        client = AsyncTmuxControlClient(
+            socket_path=tmp_path / "sock",
+            on_event=events.append,
+            tmux_command=[*FAKE, "replay", "--trace", str(trace), "--speed", "10"],
+        )
+        await client.start()
+        resp = await client.command("list-panes -a -F x")
+        await asyncio.wait_for(client.wait_closed(), timeout=5)
+        await client.close()
+        return resp.payload
+
+    assert asyncio.run(main()) == "%42\t1\tclaude\t/src\t@7\n"
+    assert events == [b"%window-add @8", b"%output %42 hi\\015\\012", b"%exit"]
+
+
+def test_record_tees_both_directions(tmp_path: Path) -> None:
+    from amux.faketmux import read_trace
+    from amux.tmux import TmuxControlClient
+
+    out = tmp_path / "rec.trace"
+    inner = " ".join([*FAKE, "synthetic", "--panes", "3", "--output-rate", "0", "--lifecycle-rate", "0"])
+    client = TmuxControlClient(
+        socket_path=tmp_path / "sock",
+        tmux_command=[*FAKE, "record", "--out", str(out), "--tmux", inner],
+    )
+    client.start()
+    try:
+        assert len(client.command("list-panes -a -F '#{pane_id}'").payload.splitlines()) == 3
+    finally:
+        client.close()
+
+    recs = [(d, line) for _t, d, line in read_trace(out)]
+    assert (">", b"list-panes -a -F '#{pane_id}'") in recs
+    assert ("<", b"%2") in recs
+
+
+def test_daemon_tracks_synthetic_server_end_to_end(tmp_path: Path) -> None:
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_async import AsyncTmuxControlClient
+    from amux.tmux_target import TmuxTarget
+
+    fake = [*FAKE, "synthetic", "--panes", "200", "--output-rate", "2000", "--lifecycle-rate", "20"]
+    cfg = AmuxConfig()
+    cfg.output.subscribe = "all"  # no watches: "auto" would switch every pane off
+    rt = DaemonRuntime(
+        TmuxTarget(socket_path=tmp_path / "sock"),
+        tmp_path / "state.json",
+        config=cfg,
+        client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=fake),
+    )
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            if any(p.window and int(p.window[1:]) >= 50 for p in rt.tracker.panes.values()):
+                break
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
+    # 200 panes in windows @0..@49, plus windows the fake opened afterwards.
+    assert len(rt.tracker.panes) >= 200
+    assert any(int(p.window[1:]) >= 50 for p in rt.tracker.panes.values() if p.window)
+    assert rt.output.used_bytes > 0
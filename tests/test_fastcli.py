@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HEAVY = ("typer", "rich", "asyncio", "subprocess", "amux.tmux", "amux.runtime")
+
+
+def _imported(argv: list[str], env: dict[str, str]) -> set[str]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "amux", *argv],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return {line.split("|")[-1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")}
+
+
+@pytest.mark.parametrize("argv", [["daemon", "where"], ["daemon", "stats"], ["daemon", "status", "--tmux-socket", "/tmp/none.sock"], ["version"], ["status-line", "--window", "@1"]])
+def test_hot_commands_do_not_import_typer_rich_or_the_daemon(tmp_path: Path, argv: list[str]) -> None:
+    env = {**os.environ, "XDG_STATE_HOME": str(tmp_path)}
+    loaded = _imported(argv, env)
+    assert "amux.fastcli" in loaded
+    assert not {m for m in loaded if m.split(".")[0] in HEAVY or m in HEAVY}
+
+
+def test_unrecognised_arguments_fall_through_to_typer() -> None:
+    from amux.fastcli import run_fast
+
+    assert run_fast(["daemon", "status", "--help"]) is False
+    assert run_fast(["daemon", "start"]) is False
+    assert run_fast([]) is False
+
+
+def test_status_falls_back_to_state_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys) -> None:
+    from amux.fastcli import run_fast
+
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    assert run_fast(["daemon", "status", "--tmux-socket", str(tmp_path / "tmux.sock")]) is True
+    out = capsys.readouterr().out
+    assert "'running': False" in out
+    assert "'tmux_state': 'unknown'" in out
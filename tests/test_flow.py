@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import sys
+from pathlib import Path
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.t = 100.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_pause_is_held_and_backs_off_while_the_pane_keeps_flooding() -> None:
+    from amux.flow import FlowControl
+
+    clock = Clock()
+    flow = FlowControl(min_hold_s=0.5, max_hold_s=2.0, resumes_per_s=100, monotonic=clock)
+    flow.on_pause("%1")
+    assert flow.paused == ["%1"]
+    assert flow.take_due() == []
+    assert flow.next_due() == 100.5
+
+    clock.t = 100.5
+    assert flow.take_due() == ["%1"]
+    assert flow.take_due() == []  # continue in flight until tmux confirms
+    flow.on_continue("%1")
+    assert flow.paused == []
+
+    holds = []
+    for _ in range(4):
+        clock.t += 0.1
+        flow.on_pause("%1")
+        holds.append(flow.panes["%1"].hold_s)
+        flow.on_continue("%1")
+    assert holds == [1.0, 2.0, 2.0, 2.0]
+
+    clock.t += 60  # quiet for a while: back to the minimum
+    flow.on_pause("%1")
+    assert flow.panes["%1"].hold_s == 0.5
+    assert flow.throttled()["%1"]["pauses"] == 6
+
+
+def test_resumes_are_rate_limited() -> None:
+    from amux.flow import FlowControl
+
+    clock = Clock()
+    flow = FlowControl(min_hold_s=0.1, resumes_per_s=2, monotonic=clock)
+    for i in range(5):
+        flow.on_pause(f"%{i}")
+    clock.t += 0.1
+    assert flow.take_due() == ["%0", "%1"]
+    assert flow.next_due() == clock.t + 0.5
+    clock.t += 0.5
+    assert flow.take_due() == ["%2"]
+
+
+def test_daemon_continues_panes_tmux_paused(tmp_path: Path) -> None:
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_async import AsyncTmuxControlClient
+    from amux.tmux_target import TmuxTarget
+
+    cfg = AmuxConfig()
+    cfg.flow.min_hold_s = 0.02
+    cfg.output.subscribe = "all"
+    fake = [sys.executable, "-m", "amux.faketmux", "synthetic", "--panes", "4", "--output-rate", "4000",
+            "--burst", "20", "--lifecycle-rate", "0", "--pause-bytes", "4000"]
+    rt = DaemonRuntime(
+        TmuxTarget(socket_path=tmp_path / "sock"),
+        tmp_path / "state.json",
+        config=cfg,
+        client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=fake),
+    )
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            if rt.flow.total_pauses >= 3 and any(f.last_continue > 0 for f in rt.flow.panes.values()):
+                break
+        assert rt.client is not None and rt.client.flow_control
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
+    report = rt.flow.throttled()
+    assert rt.flow.total_pauses >= 3
+    assert sum(r["pauses"] for r in report.values()) == rt.flow.total_pauses
+    assert rt.output.used_bytes > 0
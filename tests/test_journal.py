@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+
+def _pane(cmd: str) -> dict:
+    return {"pid": 1, "command": cmd, "cwd": "/"}
+
+
+def _store(path: Path, **kw):
+    from amux.state import load_state
+    from amux.store import StateStore
+
+    return StateStore(path, load_state(path), journal=True, fsync="never", **kw)
+
+
+def test_journal_appends_only_changes_and_load_replays_them(tmp_path: Path) -> None:
+    from amux.journal import journal_path
+    from amux.state import load_state
+
+    path = tmp_path / "state.json"
+    store = _store(path)
+    store.state.panes.update({"%1": _pane("bash"), "%2": _pane("zsh")})
+    store.mark_dirty("%1", "%2")
+    store.flush()  # first flush writes a snapshot
+    assert store.compactions == 1
+    assert not journal_path(path).exists()
+
+    store.state.panes["%1"] = _pane("claude")
+    del store.state.panes["%2"]
+    store.state.groups["build"] = {"panes": ["%1"]}
+    store.mark_dirty("%1", "%2")
+    store.flush()
+
+    recs = [json.loads(line) for line in journal_path(path).read_text().splitlines()]
+    assert [(r["op"], r.get("k")) for r in recs] == [("pane.set", "%1"), ("pane.del", "%2"), ("group.set", "build")]
+
+    st = load_state(path)
+    assert {k: p.to_dict() for k, p in st.panes.items()} == {"%1": _pane("claude")}
+    assert st.groups == {"build": {"panes": ["%1"]}}
+    assert st.journal_seq == recs[-1]["s"]
+
+    # Nothing changed: no new records.
+    store.mark_dirty("%1")
+    assert store.flush() is False
+
+
+def test_load_tolerates_torn_final_record(tmp_path: Path) -> None:
+    from amux.journal import journal_path
+    from amux.state import load_state
+
+    path = tmp_path / "state.json"
+    store = _store(path)
+    store.mark_dirty()
+    store.flush()
+    store.state.panes["%1"] = _pane("bash")
+    store.mark_dirty("%1")
+    store.flush()
+
+    with open(journal_path(path), "ab") as f:
+        f.write(b'{"s":99,"op":"pane.set","k":"%9","v":{"pi')
+
+    st = load_state(path)
+    assert list(st.panes) == ["%1"]
+
+    # A new writer starts from a fresh snapshot instead of appending to the torn tail.
+    store2 = _store(path)
+    store2.state.panes["%2"] = _pane("zsh")
+    store2.mark_dirty("%2")
+    store2.flush()
+    assert sorted(load_state(path).panes) == ["%1", "%2"]
+
+
+def test_compaction_folds_journal_into_snapshot_and_keeps_history(tmp_path: Path) -> None:
+    from amux.journal import journal_path, read_journal
+    from amux.state import load_state
+
+    path = tmp_path / "state.json"
+    store = _store(path, compact_every=3, history_generations=2)
+    store.mark_dirty()
+    store.flush()
+
+    for i in range(7):
+        store.state.panes["%1"] = _pane(f"cmd{i}")
+        store.mark_dirty("%1")
+        store.flush()
+
+    assert store.compactions == 3  # initial + after records 3 and 6
+    snapshot = json.loads(path.read_text())
+    assert snapshot["journal_seq"] == 6
+    assert [r["v"]["command"] for r in read_journal(journal_path(path))] == ["cmd6"]
+    history = [r["v"]["command"] for r in read_journal(journal_path(path).with_name("state.journal.1"))]
+    assert history == ["cmd3", "cmd4", "cmd5"]
+    assert journal_path(path).with_name("state.journal.2").exists()
+    assert load_state(path).panes["%1"]["command"] == "cmd6"
+
+
+def test_save_state_snapshot_is_not_overridden_by_older_journal(tmp_path: Path) -> None:
+    from amux.state import load_state, save_state
+
+    path = tmp_path / "state.json"
+    store = _store(path)
+    store.mark_dirty()
+    store.flush()
+    store.state.panes["%1"] = _pane("bash")
+    store.mark_dirty("%1")
+    store.flush()
+
+    # e.g. `amux daemon stop` rewriting the snapshot while the journal is still there.
+    st = load_state(path)
+    st.panes.clear()
+    save_state(path, st)
+    assert load_state(path).panes == {}
+
+
+def test_flush_diffs_only_the_panes_marked_changed(tmp_path: Path, monkeypatch) -> None:
+    import amux.journal
+    from amux.journal import journal_path, read_journal
+    from amux.resync import PaneTracker
+
+    path = tmp_path / "state.json"
+    store = _store(path)
+    tracker = PaneTracker(store.state.panes, changed=store.changed_panes)
+    rows = "".join(f"%{i}\t{i}\tbash\t/\t@1\n" for i in range(500))
+    tracker.apply_full(rows)
+    store.mark_dirty()
+    store.flush()
+
+    built = []
+    real = amux.journal.pane_json
+    monkeypatch.setattr(amux.journal, "pane_json", lambda p: built.append(p) or real(p))
+    tracker.apply("pane", "%7", "%7\t7\tclaude\t/\t@1\n")
+    tracker.apply("pane", "%9", "", error=True)  # gone
+    tracker.apply("pane", "%8", "%8\t8\tbash\t/\t@1\n")  # unchanged
+    store.state.panes["%3"].status = "busy"
+    store.mark_dirty("%3")
+    store.flush()
+
+    assert len(built) == 2
+    assert [(r["op"], r["k"]) for r in read_journal(journal_path(path))] == [
+        ("pane.set", "%3"), ("pane.set", "%7"), ("pane.del", "%9")
+    ]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import os
+
+
+def test_line_splitter_carries_partial_lines_across_chunks() -> None:
+    from amux.linereader import LineSplitter
+
+    s = LineSplitter()
+    assert s.feed(b"%begin 1 a\n%out") == [b"%begin 1 a"]
+    assert s.pending == 4
+    assert s.feed(b"put %1 x") == []
+    assert s.feed(b"\n%end 1\n") == [b"%output %1 x", b"%end 1"]
+    assert s.pending == 0
+
+
+def test_line_splitter_keeps_empty_lines() -> None:
+    from amux.linereader import LineSplitter
+
+    assert LineSplitter().feed(b"a\n\nb\n") == [b"a", b"", b"b"]
+
+
+def test_chunked_reader_reads_batches_and_reports_eof() -> None:
+    from amux.linereader import ChunkedLineReader
+
+    r, w = os.pipe()
+    try:
+        os.set_blocking(r, False)
+        reader = ChunkedLineReader(r, chunk_size=8)
+
+        assert reader.read_lines() == []  # nothing written yet
+
+        os.write(w, b"%output %1 hello\n%end 3\n")
+        got: list[bytes] = []
+        while len(got) < 2:
+            got += reader.read_lines() or []
+        assert got == [b"%output %1 hello", b"%end 3"]
+
+        os.close(w)
+        w = -1
+        assert reader.read_lines() is None
+    finally:
+        os.close(r)
+        if w >= 0:
+            os.close(w)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+
+def test_histogram_buckets_and_quantiles() -> None:
+    from amux.metrics import Histogram
+
+    h = Histogram("x_seconds", "x", buckets=(0.01, 0.1, 1.0))
+    for v in (0.005, 0.01, 0.05, 0.5, 3.0):
+        h.observe(v)
+    assert h.counts == [2, 1, 1, 1]
+    assert h.quantile(0.5) == 0.1
+    assert h.summary()["p99_le"] is None  # above the last bucket
+    assert h.summary()["count"] == 5
+
+
+def test_prometheus_text_has_cumulative_buckets_and_labels() -> None:
+    from amux.metrics import DaemonMetrics
+
+    m = DaemonMetrics()
+    m.control_lines.inc(3, "%output")
+    m.output_bytes.inc(10, '%1')
+    m.resync_seconds.observe(0.002)
+    m.resync_seconds.observe(0.3)
+    text = m.render_prometheus({"server_id": "abc"})
+
+    assert "# TYPE amux_resync_seconds histogram" in text
+    assert 'amux_resync_seconds_bucket{server_id="abc",le="0.0025"} 1' in text
+    assert 'amux_resync_seconds_bucket{server_id="abc",le="+Inf"} 2' in text
+    assert 'amux_resync_seconds_count{server_id="abc"} 2' in text
+    assert 'amux_control_lines_total{server_id="abc",type="%output"} 3' in text
+    assert 'amux_reconnects_total{server_id="abc"} 0' in text
+    assert text.endswith("\n")
+
+
+@pytest.mark.parametrize("status_line", [True, False])
+def test_runtime_counts_events_writes_and_resyncs(tmp_path: Path, status_line: bool) -> None:
+    from amux.api import ApiServer
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_target import TmuxTarget
+
+    from test_runtime import FakeClient
+
+    cfg = AmuxConfig()
+    cfg.state.write_debounce_ms = 0
+    cfg.status_line.enabled = status_line
+    rt = DaemonRuntime(
+        TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json", config=cfg, client_factory=FakeClient
+    )
+
+    async def main() -> dict:
+        task = asyncio.create_task(rt.run())
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if rt.metrics.resync_seconds.count:
+                break
+        rt.handle_event(b"%output %1 hi\\015\\012")
+        rt.handle_event(b"%window-renamed @1 x")
+        rt.store.mark_dirty()
+        rt.store.flush()
+        stats = json.loads(ApiServer(rt, tmp_path / "api.sock").handle_line(b'{"ops":[{"op":"stats"}]}\n'))
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=1.0)
+        return stats["results"][0]["result"]
+
+    stats = asyncio.run(main())
+    assert stats["control_lines_total"] == {"%output": 1.0, "%window-renamed": 1.0}
+    assert stats["output_bytes_total"] == {"%1": 4.0}
+    assert stats["resync_seconds"]["count"] == 1
+    assert stats["state_write_bytes"]["count"] >= 1
+    assert stats["state_write_seconds"]["count"] == stats["state_write_bytes"]["count"]
+    assert stats["uptime_s"] is not None
+
+    prom = (tmp_path / "amux.prom").read_text()
+    assert "amux_state_write_seconds_count" in prom
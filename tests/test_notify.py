@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class Recorder:
+    name = "recorder"
+
+    def __init__(self, delay_s: float = 0.0) -> None:
+        self.delay_s = delay_s
+        self.sent: list[tuple[str, str]] = []
+
+    async def send(self, title: str, body: str) -> None:
+        await asyncio.sleep(self.delay_s)
+        self.sent.append((title, body))
+
+
+def test_burst_for_one_group_becomes_one_summary() -> None:
+    from amux.notify import Notification, Notifier
+
+    backend = Recorder()
+    results: list[str] = []
+    notifier = Notifier(backend, coalesce_s=0.05, on_result=results.append)
+
+    async def main() -> None:
+        notifier.start()
+        for i in range(12):
+            notifier.notify(Notification(f"claude finished in %{i}", f"%{i} /src", "group:build", "{n} agents finished in group build"))
+        notifier.notify(Notification("amux: err in %3", "error: boom", "rule:err"))
+        await asyncio.sleep(0.15)
+        await notifier.stop()
+
+    asyncio.run(main())
+    assert sorted(backend.sent) == [
+        ("12 agents finished in group build", "%0 /src\n%1 /src\n%2 /src\n%3 /src\n%4 /src\n... and 7 more"),
+        ("amux: err in %3", "error: boom"),
+    ]
+    assert results == ["sent", "sent"]
+    assert notifier.report()["coalesced"] == 11 and notifier.report()["received"] == 13
+
+
+def test_slow_backend_times_out_and_full_queue_drops() -> None:
+    from amux.notify import Notification, Notifier
+
+    backend = Recorder(delay_s=10)
+    notifier = Notifier(backend, workers=1, queue_size=1, coalesce_s=0.0, timeout_s=0.05)
+
+    async def main() -> None:
+        notifier.start()
+        for key in "abc":
+            notifier.notify(Notification(key, key, key))
+            await asyncio.sleep(0.01)  # window closes; the single worker is stuck on "a"
+        await asyncio.sleep(0.2)
+        await notifier.stop(drain_s=0.2)
+
+    asyncio.run(main())
+    stats = notifier.report()
+    assert backend.sent == []
+    assert (stats["timeouts"], stats["dropped"]) == (2, 1)
+
+
+def test_stop_flushes_open_windows_to_file_backend(tmp_path: Path) -> None:
+    from amux.notify import FileBackend, Notification, Notifier
+
+    out = tmp_path / "notifications.jsonl"
+    notifier = Notifier(FileBackend(out), coalesce_s=60)
+
+    async def main() -> None:
+        notifier.start()
+        notifier.notify(Notification("done", "%1", "agents"))
+        await notifier.stop()
+
+    asyncio.run(main())
+    (line,) = out.read_text().splitlines()
+    assert {k: v for k, v in json.loads(line).items() if k != "at"} == {"title": "done", "body": "%1"}
+
+    stream = io.StringIO()
+    asyncio.run(FileBackend(stream=stream).send("t", "b"))
+    assert json.loads(stream.getvalue())["title"] == "t"
+
+
+def test_make_backend() -> None:
+    from amux.notify import CommandBackend, FileBackend, OsascriptBackend, make_backend
+
+    assert make_backend("none") is None
+    assert make_backend("auto", which=lambda _name: None) is None
+    picked = make_backend("auto", which=lambda name: "/usr/bin/notify-send" if name == "notify-send" else None)
+    assert isinstance(picked, CommandBackend) and picked.name == "notify-send"
+    assert picked.command("T", "B") == ["notify-send", "--app-name=amux", "--", "T", "B"]
+    # A matched line is not an option, and a title is not a template.
+    assert picked.command("x {body}", "-u critical oops")[-2:] == ["x {body}", "-u critical oops"]
+    assert OsascriptBackend().command('say "hi"', "b")[-1] == 'display notification "b" with title "say \\"hi\\""'
+    assert isinstance(make_backend("file"), FileBackend)
+    with pytest.raises(ValueError):
+        make_backend("pager")
+
+
+def test_command_backend_runs_and_is_killed_on_timeout(tmp_path: Path) -> None:
+    from amux.notify import CommandBackend
+
+    out = tmp_path / "out"
+    ok = CommandBackend("py", [sys.executable, "-c", f"open({str(out)!r}, 'w').write('{{title}}|{{body}}')"])
+    asyncio.run(ok.send("T", "B"))
+    assert out.read_text() == "T|B"
+
+    failing = CommandBackend("py", [sys.executable, "-c", "import sys; sys.exit('nope')"])
+    with pytest.raises(RuntimeError, match="nope"):
+        asyncio.run(failing.send("T", "B"))
+
+    hung = CommandBackend("py", [sys.executable, "-c", "import time; time.sleep(30)"])
+
+    async def main() -> None:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hung.send("T", "B"), timeout=0.2)
+
+    asyncio.run(main())
+
+
+def test_runtime_notifies_watch_matches_and_finished_agents(tmp_path: Path) -> None:
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.state import PaneState
+    from amux.tmux_target import TmuxTarget
+    from amux.watch import WatchMatch
+
+    cfg = AmuxConfig()
+    cfg.notify.backend = "file"
+    cfg.notify.file = str(tmp_path / "n.jsonl")
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json", config=cfg)
+    assert rt.notifier is not None
+
+    async def main() -> None:
+        rt.notifier.start()
+        for pane in ("%1", "%2"):
+            rt.on_watch_match(WatchMatch("err", pane, "error: boom", 0.0))
+        rt.on_agent_finished(PaneState("%3", cwd="/src", agent="claude", group="build"))
+        await rt.notifier.stop()
+
+    asyncio.run(main())
+    titles = sorted(json.loads(line)["title"] for line in (tmp_path / "n.jsonl").read_text().splitlines())
+    assert titles == ["2 panes matched err", "claude finished in %3"]
+    assert rt.metrics.notifications.values == {"sent": 2.0}
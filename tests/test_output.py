@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+
+
+def test_unescape_output_fast_path_returns_same_object() -> None:
+    from amux.output import unescape_output
+
+    data = b"plain text"
+    assert unescape_output(data) is data
+
+
+def test_unescape_output_octal_escapes() -> None:
+    from amux.output import unescape_output
+
+    assert unescape_output(b"a\\015\\012b") == b"a\r\nb"
+    assert unescape_output(b"\\134path\\033[0m") == b"\\path\x1b[0m"
+    # Malformed escapes are kept verbatim.
+    assert unescape_output(b"x\\9y") == b"x\\9y"
+
+
+def test_parse_output_line() -> None:
+    from amux.output import parse_output_line
+
+    assert parse_output_line(b"%output %5 hi\\012") == ("%5", b"hi\n")
+    assert parse_output_line(b"%output %5 ") == ("%5", b"")
+    assert parse_output_line(b"%output %5") is None
+    assert parse_output_line(b"%window-add @1") is None
+
+
+def test_parse_extended_output() -> None:
+    from amux.output import parse_extended_output
+
+    assert parse_extended_output(b"%extended-output %13 1 : flood\\015\\012") == ("%13", 1, b"flood\r\n")
+    assert parse_extended_output(b"%extended-output %2 0 extra : a : b") == ("%2", 0, b"a : b")
+    assert parse_extended_output(b"%output %1 x") is None
+    assert parse_extended_output(b"%extended-output %1 0 no-separator") is None
+
+
+def test_ring_buffer_wraps_and_keeps_latest_bytes() -> None:
+    from amux.output import RingBuffer
+
+    rb = RingBuffer(8)
+    rb.write(b"abcde")
+    assert rb.tail() == b"abcde"
+    rb.write(b"fghij")
+    assert len(rb) == 8
+    assert rb.tail() == b"cdefghij"
+    assert rb.tail(3) == b"hij"
+    assert rb.total == 10
+
+    rb.write(b"0123456789xyz")
+    assert rb.tail() == b"56789xyz"
+    assert rb.tail(0) == b""
+
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_output_buffers_cap_total_memory_by_evicting_quietest_pane() -> None:
+    from amux.output import OutputBuffers
+
+    bufs = OutputBuffers(per_pane_bytes=4, total_bytes=8)
+    bufs.append("%1", b"one")
+    bufs.append("%2", b"two")
+    bufs.append("%1", b"!")
+    bufs.append("%3", b"three")
+
+    assert "%2" not in bufs
+    assert bufs.tail("%1") == b"one!"
+    assert bufs.tail("%3") == b"hree"
+    assert bufs.tail("%2") == b""
+    assert bufs.used_bytes == 8
+
+    bufs.discard("%1")
+    assert "%1" not in bufs
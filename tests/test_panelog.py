@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+
+class Clock:
+    def __init__(self, now: float = 1_700_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _write_minutes(logs, clock: Clock, pane: str, minutes: int) -> bytes:
+    """One line per minute; returns everything written."""
+
+    out = b""
+    for i in range(minutes):
+        line = f"minute {i:03d} {'x' * 40}\n".encode()
+        logs.write(pane, line)
+        out += line
+        clock.now += 60
+    return out
+
+
+@pytest.mark.parametrize("method", ["gzip", "lzma"])
+def test_segments_roll_compress_and_seek_by_time(tmp_path: Path, method: str) -> None:
+    from amux.panelog import PaneLogs, compress_segment, list_segments, pane_dir, read_since
+
+    clock = Clock()
+    t0 = clock.now
+    logs = PaneLogs(tmp_path, segment_bytes=1500, index_bytes=1 << 20, index_interval_s=120, clock=clock)
+    written = _write_minutes(logs, clock, "%5", 60)
+    logs.flush()
+    rolled = logs.take_rolled()
+    assert len(rolled) == 2  # 60 lines of 52 bytes at 1500 bytes a segment
+    for raw in rolled:
+        compress_segment(raw, method)
+
+    segments = list_segments(pane_dir(tmp_path, "%5"))
+    assert [s.compressed for s in segments] == [True, True, False]
+    assert b"".join(read_since(tmp_path, "%5")) == written
+
+    # Index points every 2 minutes: asking for the last 15 minutes starts at most 2 minutes early.
+    tail = b"".join(read_since(tmp_path, "%5", t0 + 45 * 60))
+    assert written.endswith(tail) and tail.startswith(b"minute 04")
+    assert 15 <= tail.count(b"\n") <= 17
+    # Asking for minute 20 seeks into the middle of the first compressed segment.
+    mid = b"".join(read_since(tmp_path, "%5", t0 + 20 * 60))
+    assert mid.startswith(b"minute 020") or mid.startswith(b"minute 019")
+
+
+def test_compressed_segment_is_a_plain_gzip_file(tmp_path: Path) -> None:
+    from amux.panelog import PaneLogs, compress_segment
+
+    clock = Clock()
+    logs = PaneLogs(tmp_path, index_bytes=100, index_interval_s=1e9, clock=clock)
+    written = _write_minutes(logs, clock, "%1", 20)
+    logs.roll("%1")
+    (raw,) = logs.take_rolled()
+    gz = compress_segment(raw, "gzip")
+    assert not raw.exists() and gzip.decompress(gz.read_bytes()) == written
+    lines = raw.with_suffix(".idx").read_text().splitlines()
+    assert len(lines) == 10 and all(len(line.split()) == 3 for line in lines)
+
+
+def test_interrupted_compression_is_redone(tmp_path: Path) -> None:
+    from amux.panelog import PaneLogs, compress_segment, list_segments, pane_dir, read_since
+
+    clock = Clock()
+    logs = PaneLogs(tmp_path, clock=clock)
+    written = _write_minutes(logs, clock, "%2", 5)
+    logs.close()  # daemon stopped: the active segment stays raw
+    (raw,) = PaneLogs(tmp_path).pending_raw()
+    raw.with_name(raw.name + ".gz").write_bytes(b"\x1f\x8b torn")
+    (seg,) = list_segments(pane_dir(tmp_path, "%2"))
+    assert not seg.compressed
+    assert b"".join(read_since(tmp_path, "%2")) == written
+    compress_segment(raw)
+    assert b"".join(read_since(tmp_path, "%2")) == written
+
+
+def test_retention_by_age_and_total_size(tmp_path: Path) -> None:
+    from amux.panelog import PaneLogs, compress_segment, enforce_retention, list_segments, pane_dir
+
+    clock = Clock()
+    logs = PaneLogs(tmp_path, segment_bytes=200, clock=clock)
+    for pane in ("%1", "%2"):
+        _write_minutes(logs, clock, pane, 12)
+    gz = [compress_segment(raw) for raw in logs.take_rolled()]
+    now = time.time()
+    for i, path in enumerate(gz):
+        os.utime(path, (now - 1000 + i, now - 1000 + i))
+    assert len(gz) == 6
+
+    assert enforce_retention(tmp_path, total_bytes=0, max_age_s=999.5) == [gz[0]]
+    sizes = sum(p.stat().st_size for p in gz[1:])
+    removed = enforce_retention(tmp_path, total_bytes=sizes - 1, max_age_s=0)
+    assert removed == [gz[1]]
+    left = list_segments(pane_dir(tmp_path, "%1")) + list_segments(pane_dir(tmp_path, "%2"))
+    # The active (raw) segments are never removed.
+    assert {s.data for s in left if s.compressed} == set(gz[2:])
+    assert not gz[1].with_suffix("").with_suffix(".idx").exists()
+
+
+def test_parse_duration() -> None:
+    from amux.panelog import parse_duration
+
+    assert [parse_duration(s) for s in ("90", "30s", "10m", "1.5h", "2d")] == [90, 30, 600, 5400, 172800]
+    with pytest.raises(ValueError):
+        parse_duration("ten minutes")
+
+
+def test_daemon_logs_output_and_cli_reads_it(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from test_runtime import FakeClient
+
+    from amux.config import AmuxConfig
+    from amux.fastcli import state_paths
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_target import TmuxTarget
+
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    target = TmuxTarget(socket_path=tmp_path / "sock")
+    cfg = AmuxConfig()
+    cfg.logs.enabled = True
+    rt = DaemonRuntime(target, state_paths(target)[0], config=cfg, client_factory=FakeClient)
+    assert rt.subs.capture_all  # logs need every pane's output
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        await asyncio.sleep(0.05)
+        rt.handle_output("%1", b"old line\r\n")
+        rt.handle_output("%1", b"\x1b[31merror\x1b[0m: boom\r\n")
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
+    env = {**os.environ, "XDG_STATE_HOME": str(tmp_path)}
+    argv = [sys.executable, "-m", "amux", "logs", "%1", "--since", "10m", "--tmux-socket", str(target.socket_path)]
+    out = subprocess.run(argv, capture_output=True, env=env, check=True).stdout
+    assert out == b"old line\r\n\x1b[31merror\x1b[0m: boom\r\n"
+    missing = subprocess.run([*argv[:4], "%9", *argv[5:]], capture_output=True, env=env)
+    assert missing.returncode == 1
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+
+def _proc(root: Path, pid: int, ppid: int, argv: list[str], starttime: int = 100, comm: str = "x") -> None:
+    d = root / str(pid)
+    d.mkdir(parents=True, exist_ok=True)
+    rest = ["S", str(ppid)] + ["0"] * 17 + [str(starttime)] + ["0"] * 30
+    (d / "stat").write_text(f"{pid} ({comm}) " + " ".join(rest) + "\n")
+    (d / "cmdline").write_bytes(b"\0".join(a.encode() for a in argv) + b"\0")
+
+
+def test_parse_stat_handles_parens_in_comm() -> None:
+    from amux.procscan import parse_stat
+
+    st = parse_stat("42 (tmux: server (x)) S 7 42 42 0 -1 4194560 " + " ".join(["0"] * 12) + " 9999 0 0\n")
+    assert st is not None and (st.ppid, st.starttime) == (7, 9999)
+    assert parse_stat("garbage") is None
+
+    # utime, stime, cutime, cstime (fields 14-17) add up to cpu_ticks.
+    st = parse_stat("1 (sh) S 0 1 1 0 -1 0 0 0 0 0 7 3 2 1 20 0 1 0 55 0 0\n")
+    assert st is not None and (st.cpu_ticks, st.starttime) == (13, 55)
+
+
+def test_scanner_finds_agents_in_pane_trees_and_caches(tmp_path: Path) -> None:
+    from amux.procscan import AgentScanner
+
+    _proc(tmp_path, 10, 1, ["-zsh"])
+    _proc(tmp_path, 11, 10, ["node", "/usr/lib/node_modules/@anthropic-ai/claude-code/cli.js"])
+    _proc(tmp_path, 12, 11, ["rg", "claude"])
+    _proc(tmp_path, 20, 1, ["bash"])
+    _proc(tmp_path, 21, 20, ["python3", "-m", "aider", "--model", "x"])
+    _proc(tmp_path, 30, 1, ["bash"])
+
+    scanner = AgentScanner(proc_root=tmp_path)
+    panes = {"%1": 10, "%2": 20, "%3": 30, "%4": None}
+    assert scanner.scan(panes) == {"%1": "claude", "%2": "aider", "%3": None, "%4": None}
+    reads = scanner.cmdline_reads
+
+    # Nothing changed: no pane reported, no command line read again.
+    assert scanner.scan(panes) == {}
+    assert scanner.cmdline_reads == reads
+
+    # The agent in %2 exits and something else starts; only %2 is looked at.
+    shutil.rmtree(tmp_path / "21")
+    _proc(tmp_path, 22, 20, ["vim", "notes.md"])
+    assert scanner.scan(panes) == {"%2": None}
+    assert scanner.cmdline_reads == reads + 1
+
+    # A pid reused by a new process (different starttime) is matched afresh.
+    _proc(tmp_path, 22, 20, ["codex"], starttime=500)
+    assert scanner.scan(panes) == {"%2": "codex"}
+
+
+def test_custom_signatures_override_defaults(tmp_path: Path) -> None:
+    from amux.procscan import DEFAULT_AGENT_SIGNATURES, AgentScanner
+
+    _proc(tmp_path, 10, 1, ["bash"])
+    _proc(tmp_path, 11, 10, ["python", "my_bot.py"])
+    _proc(tmp_path, 20, 1, ["claude"])
+    sigs = {**DEFAULT_AGENT_SIGNATURES, "claude": "", "bot": r"my_bot\.py", "bad": "("}
+    scanner = AgentScanner(sigs, proc_root=tmp_path)
+    assert scanner.scan({"%1": 10, "%2": 20}) == {"%1": "bot", "%2": None}
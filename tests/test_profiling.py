@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+
+def _burn(seconds: float) -> None:
+    from amux.resync import parse_list_panes_payload
+
+    payload = "".join(f"%{i}\t{i}\tzsh\t/src\t@{i // 4}\n" for i in range(500))
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        parse_list_panes_payload(payload)
+
+
+def test_profiler_samples_cpu_and_rotates_dumps(tmp_path: Path) -> None:
+    from amux.profiling import Profiler, list_dumps, summarize
+
+    prof = Profiler(tmp_path / "profiles", interval_s=0.002, keep=2)
+    prof.start()
+    try:
+        _burn(0.2)
+        first = prof.rotate()
+        _burn(0.05)
+        prof.rotate()
+        _burn(0.05)
+    finally:
+        last = prof.stop()
+
+    assert first is not None and last is not None
+    dumps = list_dumps(tmp_path / "profiles")
+    assert len(dumps) == 2 and first not in dumps  # oldest rotated away
+    dump = json.loads(last.read_text())
+    assert dump["samples"] > 0
+    assert any("amux.resync:parse_list_panes_payload" in stack for stack in dump["stacks"])
+
+    summary = summarize(dumps, top=5)
+    assert summary["samples"] == sum(json.loads(p.read_text())["samples"] for p in dumps)
+    assert max(summary["categories"], key=summary["categories"].get) == "parsing"
+
+
+def test_categorize_uses_innermost_known_frame() -> None:
+    from amux.profiling import EVENT_LOOP, OTHER, categorize
+
+    assert categorize(["asyncio.base_events:run", "amux.runtime:handle_event", "amux.watch:feed", "re:search"]) == "matching"
+    assert categorize(["amux.runtime:resync", "amux.store:flush", "json.encoder:encode"]) == "state writes"
+    assert categorize(["amux.runtime:run", "asyncio.subprocess:create_subprocess_exec"]) == "subprocess"
+    assert categorize(["amux.runtime:handle_event"]) == OTHER
+    assert categorize(["amux.resync:parse_list_panes_payload", "amux.state:PaneState.__post_init__"]) == "parsing"
+    assert categorize(["asyncio.base_events:_run_once", "selectors:select"]) == EVENT_LOOP
+
+
+def test_api_toggles_profiling(tmp_path: Path) -> None:
+    import asyncio
+
+    from amux.api import ApiServer
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_target import TmuxTarget
+
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json")
+    api = ApiServer(rt, tmp_path / "api.sock")
+
+    async def main() -> list[dict]:
+        on = json.loads(api.handle_line(b'{"ops":[{"op":"profile","enable":true}]}\n'))
+        _burn(0.05)
+        off = json.loads(api.handle_line(b'{"ops":[{"op":"profile","enable":false},{"op":"profile","enable":1}]}\n'))
+        return on["results"] + off["results"]
+
+    on, off, bad = asyncio.run(main())
+    assert on["result"]["enabled"] is True
+    assert off["result"]["enabled"] is False and off["result"]["dumps_written"] == 1
+    assert bad["ok"] is False
+    assert len(list((tmp_path / "profiles").glob("profile-*.json"))) == 1
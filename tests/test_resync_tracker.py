@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+
+def _row(pane: str, window: str, cmd: str = "bash") -> str:
+    return f"{pane}\t100\t{cmd}\t/tmp\t{window}\n"
+
+
+def test_parse_list_panes_payload_records_window() -> None:
+    from amux.resync import parse_list_panes_payload
+
+    panes = parse_list_panes_payload(_row("%1", "@2"))
+    assert panes["%1"]["window"] == "@2"
+
+
+def test_tracker_marks_dirty_and_builds_targeted_queries() -> None:
+    from amux.resync import PaneTracker, parse_list_panes_payload
+
+    t = PaneTracker(parse_list_panes_payload(_row("%1", "@1")))
+    t.handle_event("%window-add @2")
+    t.handle_event("%layout-change @2 b25d,80x24,0,0,2 b25d,80x24,0,0,2 *")
+    t.handle_event("%pane-mode-changed %1")
+    t.handle_event("%session-changed $3 work")
+    t.handle_event("%output %1 ignored")
+    assert t.dirty
+
+    queries = t.refresh_commands()
+    assert [(k, i) for k, i, _ in queries] == [("session", "$3"), ("window", "@2"), ("pane", "%1")]
+    assert queries[1][2].startswith("list-panes -t '@2' -F ")
+    assert queries[2][2].startswith("display-message -p -t '%1' ")
+    assert not t.dirty
+
+
+def test_tracker_window_close_drops_its_panes() -> None:
+    from amux.resync import PaneTracker, parse_list_panes_payload
+
+    t = PaneTracker(parse_list_panes_payload(_row("%1", "@1") + _row("%2", "@2") + _row("%3", "@2")))
+    assert sorted(t.handle_event("%window-close @2")) == ["%2", "%3"]
+    assert list(t.panes) == ["%1"]
+    assert t.handle_event("%unlinked-window-close @9") == []
+
+
+def test_tracker_apply_window_refresh_adds_updates_and_removes() -> None:
+    from amux.resync import PaneTracker, parse_list_panes_payload
+
+    t = PaneTracker(parse_list_panes_payload(_row("%1", "@1") + _row("%2", "@1")))
+    gone = t.apply("window", "@1", _row("%1", "@1", "claude") + _row("%4", "@1"))
+    assert gone == ["%2"]
+    assert t.panes["%1"]["command"] == "claude"
+    assert "%4" in t.panes
+
+    # The window vanished before our query ran.
+    assert sorted(t.apply("window", "@1", "can't find window: @1\n", error=True)) == ["%1", "%4"]
+    assert t.panes == {}
+
+
+def test_refresh_updates_existing_pane_in_place() -> None:
+    from amux.resync import PaneTracker, parse_list_panes_payload
+
+    t = PaneTracker(parse_list_panes_payload(_row("%1", "@1") + _row("%2", "@1")))
+    pane = t.panes["%1"]
+    pane.agent = "claude"
+    assert t.apply("window", "@1", _row("%1", "@1", "node")) == ["%2"]
+    assert t.panes["%1"] is pane
+    assert (pane.command, pane.agent) == ("node", "claude")
+
+    assert t.apply_full(_row("%1", "@1", "node") + _row("%5", "@3")) == []
+    assert t.panes["%1"] is pane
+    assert t.apply_full(_row("%5", "@3")) == ["%1"]
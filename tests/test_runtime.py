@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+
+class FakeClient:
+    """Stands in for AsyncTmuxControlClient: answers every command with `payload`."""
+
+    payload = "%1\t111\tbash\t/tmp\n"
+
+    def __init__(self, *, socket_path: Path, response_timeout_s: float, on_event, **_kw) -> None:
+        self.on_event = on_event
+        self.commands: list[str] = []
+        self._closed = asyncio.Event()
+
+    @property
+    def connected(self) -> bool:
+        return not self._closed.is_set()
+
+    async def start(self) -> None:
+        return None
+
+    async def command(self, cmd: str):
+        return (await self.command_many([cmd]))[0]
+
+    async def command_many(self, cmds):
+        from amux.tmux import CommandResponse
+
+        out = []
+        for cmd in cmds:
+            self.commands.append(cmd)
+            payload = self.payload
+            if cmd.startswith("list-panes -t '@2'"):
+                payload = "%7\t222\tnode\t/src\t@2\n"
+            out.append(CommandResponse(command_id=1, command=cmd, payload=payload))
+        return out
+
+    async def wait_closed(self) -> None:
+        await self._closed.wait()
+
+    async def close(self) -> None:
+        self._closed.set()
+
+
+def test_runtime_resyncs_on_connect_and_clears_daemon_on_stop(tmp_path: Path) -> None:
+    from amux.runtime import DaemonRuntime
+    from amux.state import load_state
+    from amux.tmux_target import TmuxTarget
+
+    state_path = tmp_path / "state.json"
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), state_path, client_factory=FakeClient)
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if rt.store.state.daemon and rt.store.state.daemon.tmux_state == "connected":
+                break
+        # The daemon's pid is on disk right away; the rest follows the writer.
+        assert load_state(state_path).daemon is not None
+        rt.store.flush()
+        st = load_state(state_path)
+        assert st.daemon is not None
+        assert st.daemon.tmux_state == "connected"
+        assert st.panes["%1"]["command"] == "bash"
+
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=1.0)
+
+    asyncio.run(main())
+    assert load_state(state_path).daemon is None
+
+
+def test_runtime_tracks_lifecycle_events_incrementally(tmp_path: Path) -> None:
+    from amux.runtime import DaemonRuntime
+    from amux.state import load_state
+    from amux.tmux_target import TmuxTarget
+
+    state_path = tmp_path / "state.json"
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), state_path, client_factory=FakeClient)
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        while rt.client is None or not rt.tracker.panes:
+            await asyncio.sleep(0)
+
+        rt.handle_event(b"%window-add @2")
+        rt.handle_event(b"%layout-change @2 x x *")
+        await asyncio.sleep(0.05)
+        assert set(rt.tracker.panes) == {"%1", "%7"}
+        # One coalesced query for the burst; no second full resync.
+        assert sum(c.startswith("list-panes -t '@2'") for c in rt.client.commands) == 1
+        assert sum(c.startswith("list-panes -a") for c in rt.client.commands) == 1
+        assert rt.store.dirty
+        rt.store.flush()
+        assert "%7" in load_state(state_path).panes
+
+        rt.handle_event(b"%window-close @2")
+        assert set(rt.tracker.panes) == {"%1"}
+
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=1.0)
+
+    asyncio.run(main())
+
+
+def test_runtime_reconciles_periodically_while_connected(tmp_path: Path) -> None:
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_target import TmuxTarget
+
+    cfg = AmuxConfig()
+    cfg.resync.reconcile_interval_s = 0.01
+    rt = DaemonRuntime(
+        TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json", config=cfg, client_factory=FakeClient
+    )
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        await asyncio.sleep(0.1)
+        assert sum(c.startswith("list-panes -a") for c in rt.client.commands) >= 2
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=1.0)
+
+    asyncio.run(main())
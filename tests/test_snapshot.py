@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+from test_runtime import FakeClient
+
+
+def test_line_diff_round_trips() -> None:
+    from amux.snapshot import apply_diff, line_diff
+
+    old = ["$ make", "building a", "building b", "", "$"]
+    new = ["$ make", "building a", "building b", "error: b.c:3", "", "$ vim b.c"]
+    changes = line_diff(old, new)
+    assert changes == [(3, 3, ["error: b.c:3"]), (4, 5, ["$ vim b.c"])]
+    assert apply_diff(old, json.loads(json.dumps(changes))) == new
+    assert line_diff(new, new) == []
+
+
+def test_cache_versions_and_replies() -> None:
+    from amux.snapshot import SnapshotCache, apply_diff, snapshot_reply
+
+    cache = SnapshotCache(history=2)
+    assert cache.fresh("%1") is None
+    cache.begin("%1")
+    v1 = cache.store("%1", ["a", "b"], trusted=True)
+    assert cache.fresh("%1") is v1
+
+    cache.touch("%1")
+    assert cache.fresh("%1") is None
+    cache.begin("%1")
+    # Output that left the screen as it was keeps the version.
+    assert cache.store("%1", ["a", "b"], trusted=True).version == v1.version
+    v2 = cache.store("%1", ["a", "c"], trusted=True)
+    v3 = cache.store("%1", ["a", "c", "d"], trusted=True)
+    v4 = cache.store("%1", ["x"], trusted=False)
+    assert cache.fresh("%1") is None  # untrusted captures are never served from cache
+
+    assert snapshot_reply(v4, v4.version) == {"version": v4.version, "taken_at": round(v4.taken_at, 3), "unchanged": True}
+    diff = snapshot_reply(v4, v2.version)
+    assert diff["since"] == v2.version and apply_diff(v2.lines, diff["changes"]) == ["x"]
+    assert snapshot_reply(v4, v3.version)["changes"] == [(0, 3, ["x"])]
+    # v1 fell out of the history, and an unknown version gets the whole screen.
+    assert snapshot_reply(v4, v1.version)["lines"] == ["x"]
+    assert snapshot_reply(v4, None)["lines"] == ["x"]
+
+    cache.discard("%1")
+    assert cache.snapshots == {} and cache.stale == set()
+
+
+class ScreenClient(FakeClient):
+    screen = "$ make\nok\n"
+
+    async def command_many(self, cmds):
+        from amux.tmux import CommandResponse
+
+        out = await super().command_many(cmds)
+        return [
+            CommandResponse(command_id=1, command=r.command, payload=self.screen) if r.command.startswith("capture-pane") else r
+            for r in out
+        ]
+
+
+def test_snapshot_op_captures_only_after_output(tmp_path: Path) -> None:
+    from amux.api import ApiServer
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_target import TmuxTarget
+
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json", client_factory=ScreenClient)
+    api = ApiServer(rt, tmp_path / "api.sock")
+
+    async def snapshot(*ops: dict) -> list[dict]:
+        line = json.dumps({"id": 1, "ops": [{"op": "snapshot", "pane_id": "%1", **op} for op in ops]}).encode()
+        resp = api.handle_line(line)
+        return [r["result"] for r in json.loads(resp if isinstance(resp, bytes) else await resp)["results"]]
+
+    def captures() -> int:
+        assert rt.client is not None
+        return sum(c.startswith("capture-pane") for c in rt.client.commands)
+
+    async def settle() -> None:
+        for _ in range(100):
+            await asyncio.sleep(0)
+
+    async def main() -> None:
+        task = asyncio.create_task(rt.run())
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if "%1" in rt.tracker.panes:
+                break
+        (first,) = await snapshot({})
+        assert first["lines"] == ["$ make", "ok"]
+        await settle()  # the snapshot switched %1's output on
+
+        (again,) = await snapshot({"since": first["version"]})
+        assert again["version"] == first["version"] and again.get("unchanged")
+        n = captures()
+        assert [r.get("unchanged") for r in await snapshot({"since": first["version"]})] == [True]
+        assert captures() == n
+
+        # New output: the next request recaptures, once for concurrent requests.
+        ScreenClient.screen = "$ make\nok\n$ ls\n"
+        rt.handle_output("%1", b"$ ls\r\n")
+        a, b = await snapshot({"since": first["version"]}, {})
+        assert captures() == n + 1
+        assert a["changes"] == [[2, 2, ["$ ls"]]] and b["lines"] == ["$ make", "ok", "$ ls"]
+        assert rt.metrics.snapshots.values["captured"] == n + 1
+
+        (err,) = json.loads(await api.handle_line(b'{"ops":[{"op":"snapshot","pane_id":"%9"}]}\n'))["results"]
+        assert not err["ok"] and "no such pane" in err["error"]
+
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
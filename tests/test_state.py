@@ -93,3 +93,22 @@ def test_load_state_last_resync_at_null(tmp_path: Path) -> None:
     st = load_state(state_path)
     assert st.daemon is not None
     assert st.daemon.last_resync_at is None
+
+
+def test_pane_state_interns_and_round_trips(tmp_path: Path) -> None:
+    from amux.state import AmuxState, PaneState, load_state, save_state
+
+    a = PaneState("%1", 1, "".join(["cl", "aude"]), "/tmp", "@1")
+    b = PaneState("%2", 2, "claude", "/tmp", "@1")
+    assert a.command is b.command
+    assert not hasattr(a, "__dict__")
+    assert (a["pid"], a.get("agent", "-")) == (1, "-")
+
+    a.agent = "claude"
+    a.tags = ("review",)
+    path = tmp_path / "state.json"
+    save_state(path, AmuxState(panes={"%1": a}))
+    assert json.loads(path.read_text())["panes"]["%1"] == {
+        "pid": 1, "command": "claude", "cwd": "/tmp", "window": "@1", "agent": "claude", "tags": ["review"]
+    }
+    assert load_state(path).panes["%1"] == a
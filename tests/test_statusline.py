@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+
+def _panes(*rows: tuple[str, str, str | None]):
+    from amux.state import PaneState
+
+    return {pid: PaneState(pid, 1, "claude", "/", window, status=status) for pid, window, status in rows}
+
+
+def test_render_counts_orders_known_statuses_first() -> None:
+    from amux.statusline import render_counts
+
+    panes = _panes(("%1", "@1", "error"), ("%2", "@1", "busy"), ("%3", "@2", "busy"),
+                   ("%4", "@2", "idle"), ("%5", "@2", "waiting"), ("%6", "@2", None))
+    assert render_counts(panes.values()) == "2 busy / 1 waiting / 1 error / 1 idle"
+    assert render_counts([]) == ""
+
+
+def test_cache_rewrites_file_only_when_a_segment_changes(tmp_path: Path) -> None:
+    from amux.statusline import StatusLineCache, read_status_line
+
+    path = tmp_path / "status-line"
+    cache = StatusLineCache(path)
+    panes = _panes(("%1", "@1", "busy"), ("%2", "@2", "waiting"))
+
+    assert cache.update(panes) == {"*": "1 busy / 1 waiting", "@1": "1 busy", "@2": "1 waiting"}
+    assert cache.update(panes) == {}
+    assert cache.writes == 1
+
+    panes["%2"].status = None
+    assert cache.update(panes) == {"*": "1 busy", "@2": ""}
+    assert read_status_line(path) == "1 busy"
+    assert read_status_line(path, "@1") == "1 busy"
+    assert read_status_line(path, "@2") == ""
+    assert read_status_line(tmp_path / "missing") == ""
+
+
+def test_runtime_pushes_changed_segments_into_tmux_options(tmp_path: Path) -> None:
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.statusline import StatusLineCache
+    from amux.tmux_target import TmuxTarget
+
+    sent: list[str] = []
+
+    class Client:
+        async def command_many(self, cmds):
+            sent.extend(cmds)
+            return []
+
+    cfg = AmuxConfig()
+    cfg.status_line.tmux_option = True
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), tmp_path / "state.json", config=cfg)
+    rt.status_line = StatusLineCache(tmp_path / "status-line")
+    rt.client = Client()  # type: ignore[assignment]
+    rt.store.state.panes.update(_panes(("%1", "@1", "it's #busy")))
+
+    async def main() -> None:
+        rt._update_status_line(rt.store.state)
+        await asyncio.sleep(0)
+        rt.store.state.panes["%1"].status = None
+        rt._update_status_line(rt.store.state)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert sent == [
+        "set-option -g @amux_status '1 it'\\''s ##busy'",
+        "set-option -w -t '@1' @amux_window_status '1 it'\\''s ##busy'",
+        "set-option -g @amux_status ''",
+        "set-option -wu -t '@1' @amux_window_status",
+    ]
+
+
+def test_runtime_clears_status_line_on_shutdown(tmp_path: Path) -> None:
+    from amux.config import AmuxConfig
+    from amux.runtime import DaemonRuntime
+    from amux.statusline import read_status_line, status_line_path
+    from amux.tmux_target import TmuxTarget
+
+    from test_runtime import FakeClient
+
+    cfg = AmuxConfig()
+    cfg.status_line.tmux_option = True
+    state_path = tmp_path / "state.json"
+    rt = DaemonRuntime(TmuxTarget(socket_path=tmp_path / "sock"), state_path, config=cfg, client_factory=FakeClient)
+
+    async def main() -> list[str]:
+        task = asyncio.create_task(rt.run())
+        while rt.client is None or "%1" not in rt.tracker.panes:
+            await asyncio.sleep(0)
+        client = rt.client
+        rt.tracker.panes["%1"].status = "busy"
+        rt.store.mark_dirty("%1")
+        rt.store.flush()
+        await asyncio.sleep(0)
+        assert read_status_line(status_line_path(state_path)) == "1 busy"
+
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=1.0)
+        return client.commands
+
+    commands = asyncio.run(main())
+    assert "set-option -g @amux_status '1 busy'" in commands
+    assert commands[-1] == "set-option -gu @amux_status"
+    assert not status_line_path(state_path).exists()
+    assert read_status_line(status_line_path(state_path)) == ""
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+
+def test_flush_writes_only_when_dirty_and_changed(tmp_path: Path) -> None:
+    from amux.state import load_state
+    from amux.store import StateStore
+
+    path = tmp_path / "state.json"
+    store = StateStore(path)
+
+    assert store.flush() is False  # nothing marked dirty
+    store.state.panes["%1"] = {"pid": 1, "command": "bash", "cwd": "/"}
+    store.mark_dirty()
+    assert store.flush() is True
+    assert load_state(path).panes["%1"]["command"] == "bash"
+
+    # Dirty but identical content: skipped.
+    store.mark_dirty()
+    assert store.flush() is False
+    assert (store.writes, store.skipped) == (1, 1)
+
+
+def test_run_coalesces_bursts_into_one_write(tmp_path: Path) -> None:
+    from amux.store import StateStore
+
+    store = StateStore(tmp_path / "state.json", debounce_s=0.02)
+
+    async def main() -> None:
+        task = asyncio.create_task(store.run())
+        for i in range(50):
+            store.state.panes[f"%{i}"] = {"pid": i}
+            store.mark_dirty()
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(main())
+    assert store.writes == 1
+    assert store.dirty is False
+
+
+@pytest.mark.parametrize(("policy", "expected"), [("always", 2), ("never", 0), ("interval", 1)])
+def test_fsync_policy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, policy: str, expected: int) -> None:
+    from amux.store import StateStore
+
+    calls: list[int] = []
+    real_fsync = os.fsync
+
+    def counting_fsync(fd: int) -> None:
+        if stat.S_ISREG(os.fstat(fd).st_mode):  # ignore the directory fsync
+            calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    store = StateStore(tmp_path / "state.json", fsync=policy, fsync_interval_s=60.0)
+    for i in range(2):
+        store.state.version = i + 10
+        store.mark_dirty()
+        store.flush()
+    assert len(calls) == expected
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path: Path) -> None:
+    from amux.store import StateStore
+
+    with pytest.raises(ValueError):
+        StateStore(tmp_path / "state.json", fsync="sometimes")
+
+
+def test_failed_write_is_retried_not_lost(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import amux.store
+    from amux.state import load_state
+    from amux.store import StateStore
+
+    real = amux.store.atomic_write_text
+    failures = [OSError(28, "No space left on device")]
+
+    def flaky(*args, **kw):  # type: ignore[no-untyped-def]
+        if failures:
+            raise failures.pop()
+        return real(*args, **kw)
+
+    monkeypatch.setattr(amux.store, "atomic_write_text", flaky)
+    monkeypatch.setattr(amux.store, "WRITE_RETRY_S", 0.01)
+    path = tmp_path / "state.json"
+    store = StateStore(path, debounce_s=0.0)
+
+    async def main() -> None:
+        task = asyncio.create_task(store.run())
+        store.state.panes["%1"] = {"pid": 1, "command": "bash", "cwd": "/"}
+        store.mark_dirty()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if store.writes:
+                break
+        assert not task.done()  # the writer survived the error
+        task.cancel()
+
+    asyncio.run(main())
+    assert load_state(path).panes["%1"]["command"] == "bash"
+
+
+def test_failed_journal_append_is_caught_up_by_a_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from amux.journal import StateJournal
+    from amux.state import load_state
+    from amux.store import StateStore
+
+    path = tmp_path / "state.json"
+    store = StateStore(path, journal=True, fsync="never")
+    store.mark_dirty()
+    store.flush()
+
+    def full(*_args, **_kw):  # type: ignore[no-untyped-def]
+        raise OSError(28, "No space left on device")
+
+    store.state.panes["%1"] = {"pid": 1, "command": "bash", "cwd": "/"}
+    with monkeypatch.context() as m:
+        m.setattr(StateJournal, "append", full)
+        store.mark_dirty("%1")
+        with pytest.raises(OSError):
+            store.flush()
+    assert store.dirty
+    assert store.flush() is True
+    assert load_state(path).panes["%1"]["command"] == "bash"
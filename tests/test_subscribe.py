@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import sys
+from pathlib import Path
+
+
+def test_only_panes_someone_wants_get_output() -> None:
+    from amux.subscribe import OutputSubscriptions
+
+    now = [0.0]
+    subs = OutputSubscriptions(monotonic=lambda: now[0])
+    subs.set_watches(False, ["%2"])
+    subs.subscribe(["%3"], ttl_s=10)
+
+    # tmux starts with every pane on: only the unwanted ones need switching.
+    assert subs.changes(["%1", "%2", "%3"]) == [("%1", False)]
+    assert subs.changes(["%1", "%2", "%3"]) == []
+
+    now[0] = 11.0  # the subscription ran out
+    assert subs.changes(["%1", "%2", "%3"]) == [("%3", False)]
+    subs.set_watches(True, [])
+    assert subs.changes(["%1", "%2", "%3"]) == [("%1", True), ("%3", True)]
+
+    subs.reset()  # new control client
+    subs.set_watches(False, [])
+    assert subs.changes(["%1"]) == [("%1", False)]
+
+    # Panes running an agent keep their output: it drives busy/waiting.
+    assert subs.set_agents(["%1"]) is True
+    assert subs.set_agents(["%1"]) is False
+    assert subs.changes(["%1"]) == [("%1", True)]
+
+
+def test_capture_all_never_switches_output_off() -> None:
+    from amux.subscribe import OutputSubscriptions
+
+    subs = OutputSubscriptions(capture_all=True)
+    assert subs.changes(["%1", "%2"]) == []
+
+
+def test_subscription_commands_batch_panes() -> None:
+    from amux.subscribe import PANES_PER_COMMAND, subscription_commands
+
+    assert subscription_commands([("%1", False), ("%2", True)]) == ["refresh-client -A '%1:off' -A '%2:on'"]
+    cmds = subscription_commands([(f"%{i}", False) for i in range(PANES_PER_COMMAND + 1)])
+    assert len(cmds) == 2 and cmds[1] == f"refresh-client -A '%{PANES_PER_COMMAND}:off'"
+
+
+def test_daemon_turns_off_output_nobody_watches(tmp_path: Path) -> None:
+    from amux.api import ApiServer
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_async import AsyncTmuxControlClient
+    from amux.tmux_target import TmuxTarget
+
+    fake = [sys.executable, "-m", "amux.faketmux", "synthetic", "--panes", "8", "--output-rate", "0", "--lifecycle-rate", "0"]
+    rt = DaemonRuntime(
+        TmuxTarget(socket_path=tmp_path / "sock"),
+        tmp_path / "state.json",
+        client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=fake),
+    )
+    api = ApiServer(rt, tmp_path / "api.sock")
+
+    def off() -> set[str]:
+        return {pid for pid, on in rt.subs.enabled.items() if not on}
+
+    async def settle() -> None:
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if rt._subs_task is not None and rt._subs_task.done():
+                return
+
+    async def main() -> tuple[set[str], set[str], dict]:
+        task = asyncio.create_task(rt.run())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if len(rt.tracker.panes) == 8:
+                break
+        rt.load_watches([{"id": "w", "pattern": "error", "panes": ["%2"]}])
+        await settle()
+        first = off()
+
+        req = {"id": 1, "ops": [{"op": "subscribe", "panes": ["%5"], "ttl_s": 60}, {"op": "subscriptions"}]}
+        resp = json.loads(api.handle_line(json.dumps(req).encode()))
+        await settle()
+        second = off()
+
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+        return first, second, resp
+
+    first, second, resp = asyncio.run(main())
+    assert rt._subs_supported  # the fake accepted every `refresh-client -A`
+    assert first == {f"%{i}" for i in range(8)} - {"%2"}
+    assert second == first - {"%5"}
+    sub, report = resp["results"]
+    assert sub["result"] == {"panes": ["%5"], "ttl_s": 60}
+    assert report["result"]["watch_panes"] == ["%2"]
+    assert report["result"]["off"] == sorted(first)
+
+
+def test_tail_keeps_its_pane_output_on_under_auto(tmp_path: Path) -> None:
+    from amux.api import ApiServer
+    from amux.runtime import DaemonRuntime
+    from amux.tmux_async import AsyncTmuxControlClient
+    from amux.tmux_target import TmuxTarget
+
+    fake = [sys.executable, "-m", "amux.faketmux", "synthetic", "--panes", "4", "--output-rate", "0", "--lifecycle-rate", "0"]
+    rt = DaemonRuntime(
+        TmuxTarget(socket_path=tmp_path / "sock"),
+        tmp_path / "state.json",
+        client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=fake),
+    )
+    api = ApiServer(rt, tmp_path / "api.sock")
+
+    def tail() -> str:
+        return json.loads(api.handle_line(b'{"ops":[{"op":"tail","pane_id":"%3"}]}\n'))["results"][0]["result"]
+
+    async def settle() -> None:
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if rt._subs_task is not None and rt._subs_task.done():
+                return
+
+    async def main() -> tuple[bool, str]:
+        task = asyncio.create_task(rt.run())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if len(rt.tracker.panes) == 4:
+                break
+        await settle()
+        assert rt.subs.enabled.get("%3") is False  # nobody wanted it yet
+
+        tail()
+        await settle()
+        on = rt.subs.enabled.get("%3", True)
+        rt.handle_output("%3", b"still here\r\n")
+        text = tail()
+
+        rt.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+        return on, text
+
+    on, text = asyncio.run(main())
+    assert on
+    assert text == "still here\r\n"
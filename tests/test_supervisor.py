@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+FAKE = [sys.executable, "-m", "amux.faketmux", "synthetic", "--panes", "4", "--output-rate", "0", "--lifecycle-rate", "0"]
+
+
+def test_one_process_runs_many_servers_and_stops_them_one_by_one(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    from amux.api_client import api_call
+    from amux.fastcli import api_path, state_paths, status_info
+    from amux.runtime import DaemonRuntime
+    from amux.supervisor import Supervisor
+    from amux.tmux_async import AsyncTmuxControlClient
+    from amux.tmux_target import TmuxTarget
+
+    factory = functools.partial(
+        DaemonRuntime, client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=FAKE)
+    )
+    sup = Supervisor(runtime_factory=factory)
+    targets = [TmuxTarget(socket_path=tmp_path / f"tmux-{i}") for i in range(3)]
+
+    async def until(cond) -> None:  # type: ignore[no-untyped-def]
+        for _ in range(300):
+            if cond():
+                return
+            await asyncio.sleep(0.01)
+
+    async def main() -> list[dict]:
+        task = asyncio.create_task(sup.run(targets[:2]))
+        await until(lambda: sup.api is not None and len(sup.runtimes) == 2)
+        # A per-server `start` joins the running supervisor.
+        added = await asyncio.to_thread(api_call, sup.api_path, "add", tmux_socket=str(targets[2].socket_path))
+        assert added == {"server_id": targets[2].server_id, "added": True}
+        await until(lambda: all(len(rt.tracker.panes) == 4 for rt in sup.runtimes.values()) and len(sup.runtimes) == 3)
+
+        statuses = [await asyncio.to_thread(status_info, t) for t in targets]
+        # `amux daemon stop` for one server goes through that server's API.
+        await asyncio.to_thread(api_call, api_path(targets[0]), "stop")
+        await until(lambda: targets[0].server_id not in sup.runtimes)
+        servers = await asyncio.to_thread(api_call, sup.api_path, "servers")
+
+        sup.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+        return [statuses, servers]
+
+    statuses, servers = asyncio.run(main())
+    assert [s["server_id"] for s in statuses] == [t.server_id for t in targets]
+    assert {s["pid"] for s in statuses} == {os.getpid()}
+    assert all(s["panes"] == 4 for s in statuses)
+    assert [s["server_id"] for s in servers] == sorted(t.server_id for t in targets[1:])
+    # Each server kept its own state dir; pid files are gone once stopped.
+    assert all(state_paths(t)[0].exists() and not state_paths(t)[1].exists() for t in targets)
+    assert not sup.pid_path.exists()
+
+
+def test_discover_finds_tmux_sockets(tmp_path: Path) -> None:
+    import socket
+
+    from amux.supervisor import discover_sockets
+
+    sock_dir = tmp_path / "tmux-1000"
+    sock_dir.mkdir()
+    s = socket.socket(socket.AF_UNIX)
+    s.bind(str(sock_dir / "default"))
+    (sock_dir / "not-a-socket").write_text("")
+    try:
+        assert discover_sockets(sock_dir) == [sock_dir / "default"]
+        assert discover_sockets(tmp_path / "missing") == []
+    finally:
+        s.close()
+
+
+def test_remove_rejects_a_non_string_server_id() -> None:
+    from amux.api import ApiError
+    from amux.supervisor import Supervisor
+
+    sup = Supervisor()
+    with pytest.raises(ApiError, match="server_id must be a string"):
+        sup._remove({"server_id": ["x"]})
+    with pytest.raises(ApiError, match="not managed"):
+        sup._remove({"server_id": "nope"})
+
+
+def test_remove_before_the_server_task_starts_still_stops_it(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    from amux.runtime import DaemonRuntime
+    from amux.supervisor import Supervisor
+    from amux.tmux_async import AsyncTmuxControlClient
+    from amux.tmux_target import TmuxTarget
+
+    factory = functools.partial(
+        DaemonRuntime, client_factory=functools.partial(AsyncTmuxControlClient, tmux_command=FAKE)
+    )
+    sup = Supervisor(runtime_factory=factory)
+    target = TmuxTarget(socket_path=tmp_path / "tmux-0")
+
+    async def main() -> None:
+        assert sup.add(target)
+        task = sup._tasks[target.server_id]
+        assert sup.remove(target.server_id)  # before the task ran at all
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(main())
+    assert sup.runtimes == {}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+
+def _client(**kw):
+    from amux.tmux_async import AsyncTmuxControlClient
+
+    return AsyncTmuxControlClient(socket_path=Path("/tmp/unused.sock"), **kw)
+
+
+def test_async_client_pipelines_commands_and_routes_events() -> None:
+    async def main() -> None:
+        events: list[bytes] = []
+        c = _client(on_event=events.append)
+        reader = asyncio.StreamReader()
+        writer = _Writer()
+        c.attach(reader, writer)
+
+        task = asyncio.ensure_future(c.command_many(["list-panes", "list-windows"]))
+        await asyncio.sleep(0)
+        assert writer.data == b"list-panes\nlist-windows\n"
+
+        reader.feed_data(b"%window-add @1\n%begin 1 a\n%1\n%end 1\n%begin 2 b\n@1\n%end 2\n")
+        r1, r2 = await task
+        assert r1.payload == "%1\n"
+        assert r2.payload == "@1\n"
+        assert events == [b"%window-add @1"]
+        await c.close()
+
+    asyncio.run(main())
+
+
+def test_async_client_eof_fails_pending_commands() -> None:
+    async def main() -> None:
+        c = _client()
+        reader = asyncio.StreamReader()
+        c.attach(reader, _Writer())
+
+        fut = c.submit_many(["list-panes"])[0]
+        reader.feed_eof()
+        await c.wait_closed()
+        assert c.connected is False
+        with pytest.raises(RuntimeError):
+            await fut
+        with pytest.raises(RuntimeError):
+            c.submit_many(["list-panes"])
+
+    asyncio.run(main())
+
+
+def test_async_client_timeout() -> None:
+    from amux.tmux import TmuxTimeoutError
+
+    async def main() -> None:
+        c = _client(response_timeout_s=0.01)
+        c.attach(asyncio.StreamReader(), _Writer())
+        with pytest.raises(TmuxTimeoutError):
+            await c.command("list-panes")
+        await c.close()
+
+    asyncio.run(main())
+
+
+def test_async_client_timeout_closes_so_a_late_response_answers_nothing() -> None:
+    from amux.tmux import TmuxTimeoutError
+
+    async def main() -> None:
+        c = _client(response_timeout_s=0.01)
+        reader = asyncio.StreamReader()
+        c.attach(reader, _Writer())
+        with pytest.raises(TmuxTimeoutError):
+            await c.command("list-panes")
+        await asyncio.wait_for(c.wait_closed(), timeout=1.0)
+        assert c.connected is False
+
+        # The slow answer to list-panes shows up: nobody may take it for theirs.
+        reader.feed_data(b"%begin 1 a\n%1\n%end 1\n")
+        with pytest.raises(RuntimeError):
+            await c.command("list-windows")
+
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+
+
+def test_control_line_parse_error_and_real_tmux_end() -> None:
+    from amux.tmux import ControlLine
+
+    err = ControlLine.parse("%error 7")
+    assert err.kind == "error"
+    assert err.command_id == 7
+
+    # tmux appends extra fields after the id; only the id matters here.
+    end = ControlLine.parse("%end 1363006971 2 1")
+    assert end.kind == "end"
+    assert end.command_id == 1363006971
+
+
+def test_pipeline_resolves_futures_in_submission_order() -> None:
+    from amux.tmux import CommandPipeline
+
+    pipe = CommandPipeline()
+    futs: list[Future] = [Future() for _ in range(3)]
+    for i, f in enumerate(futs):
+        pipe.push(f"cmd-{i}", f)
+    assert pipe.in_flight == 3
+
+    for line in [
+        "%begin 10 a", "one", "%end 10",
+        "%begin 11 b", "two", "%end 11",
+        "%begin 12 c", "%end 12",
+    ]:
+        assert pipe.feed_line(line) is True
+
+    assert [f.result().payload for f in futs] == ["one\n", "two\n", ""]
+    assert pipe.in_flight == 0
+
+
+def test_pipeline_reports_events_and_error_blocks() -> None:
+    from amux.tmux import CommandPipeline
+
+    pipe = CommandPipeline()
+    f: Future = Future()
+    pipe.push("list-panes -t @99", f)
+
+    assert pipe.feed_line("%window-add @3") is False
+    assert pipe.feed_line("%output %1 hi") is False
+    assert pipe.feed_line("%begin 4 x") is True
+    assert pipe.feed_line("can't find window: @99") is True
+    assert pipe.feed_line("%error 4") is True
+
+    resp = f.result()
+    assert resp.error is True
+    assert resp.payload == "can't find window: @99\n"
+
+
+def test_pipeline_drops_unsolicited_blocks() -> None:
+    from amux.tmux import CommandPipeline
+
+    pipe = CommandPipeline()
+    assert pipe.feed_line("%begin 1 attach") is True
+    assert pipe.feed_line("%end 1") is True
+    assert pipe.in_flight == 0
+
+
+def test_pipeline_skips_blocks_tmux_ran_on_its_own_behalf() -> None:
+    from amux.tmux import CommandPipeline
+
+    pipe = CommandPipeline()
+    f: Future = Future()
+    pipe.push("list-sessions", f)
+
+    # flags=0: attach-time command, not ours.
+    pipe.feed_line("%begin 1700000000 1 0")
+    pipe.feed_line("%end 1700000000 1 0")
+    assert f.done() is False
+
+    pipe.feed_line("%begin 1700000000 2 1")
+    pipe.feed_line("0: 1 windows")
+    pipe.feed_line("%end 1700000000 2 1")
+    assert f.result().payload == "0: 1 windows\n"
+
+
+def test_pipeline_passes_notifications_inside_a_block_through() -> None:
+    from amux.tmux import CommandPipeline
+
+    pipe = CommandPipeline()
+    fut: Future = Future()
+    pipe.push("refresh-client -A '%13:continue'", fut)
+    # Captured from tmux 3.3a: the %continue lands inside the command's block.
+    assert pipe.feed_line("%begin 1792348544 432 1") is True
+    assert pipe.feed_line("%continue %13") is False
+    assert pipe.feed_raw(b"%extended-output %13 0 : flood\\015\\012") is False
+    assert pipe.feed_line("%end 1792348544 432 1") is True
+    assert fut.result().payload == ""
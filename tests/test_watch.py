@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    ("pattern", "literal"),
+    [
+        ("FAILED", "FAILED"),
+        (r"error: \d+ tests", "error: "),
+        (r"^Traceback \(most recent", "Traceback (most recent"),
+        ("colou?r mismatch", "r mismatch"),
+        ("(foo|bar)baz", "baz"),
+        ("foo|bar", None),
+        ("[A-Z]+", None),
+        ("a.b", None),
+        (r"\x41BCD", "BCD"),
+        (r"ab\x20cd", "ab"),
+        (r"\u00e9t\u00e9 done", " done"),
+        (r"\U0001F600 ok", " ok"),
+        (r"\N{BULLET} item", " item"),
+        (r"\101\102CD", "CD"),
+        (r"(a)\1234", None),
+    ],
+)
+def test_required_literal(pattern: str, literal: str | None) -> None:
+    from amux.watch import required_literal
+
+    assert required_literal(pattern) == literal
+
+
+def test_trie_regex_matches_any_word() -> None:
+    import re
+
+    from amux.watch import _trie_regex
+
+    rx = re.compile(_trie_regex([b"FAIL", b"FAILED", b"FATAL", b"panic"]))
+    assert rx.search(b"test FAILED")
+    assert rx.search(b"FATAL: x")
+    assert rx.search(b"go panic")
+    assert rx.search(b"FA IL") is None
+
+
+def _engine(*rules, **kw):
+    from amux.watch import WatchEngine, WatchRule
+
+    t = {"now": 100.0}
+    eng = WatchEngine([WatchRule.from_dict(r) for r in rules], monotonic=lambda: t["now"], **kw)
+    return eng, t
+
+
+def test_engine_reassembles_lines_split_across_chunks() -> None:
+    eng, _ = _engine({"id": "fail", "pattern": "tests? FAILED"})
+
+    assert eng.feed("%1", b"3 tests FA") == []
+    matches = eng.feed("%1", b"ILED\r\nok\n")
+    assert [(m.rule_id, m.pane_id, m.line) for m in matches] == [("fail", "%1", "3 tests FAILED")]
+
+
+def test_engine_strips_ansi_and_supports_ignore_case_and_literal_less_rules() -> None:
+    eng, _ = _engine(
+        {"id": "err", "pattern": "(?i)error", "cooldown_s": 0},
+        {"id": "prompt", "pattern": r"^\$ $", "cooldown_s": 0},
+    )
+
+    assert [m.rule_id for m in eng.feed("%1", b"\x1b[31mERROR\x1b[0m boom\n")] == ["err"]
+    assert [m.rule_id for m in eng.feed("%1", b"$ \n")] == ["prompt"]
+    assert eng.feed("%1", b"all good\n") == []
+
+
+def test_engine_cooldown_is_per_rule_and_pane() -> None:
+    eng, t = _engine({"id": "done", "pattern": "DONE", "cooldown_s": 10})
+
+    assert len(eng.feed("%1", b"DONE\n")) == 1
+    assert eng.feed("%1", b"DONE\n") == []
+    assert len(eng.feed("%2", b"DONE\n")) == 1
+
+    t["now"] += 10
+    assert len(eng.feed("%1", b"DONE\n")) == 1
+
+
+def test_engine_pane_scoped_rules_skip_other_panes() -> None:
+    eng, _ = _engine({"id": "x", "pattern": "DONE", "panes": ["%5"]})
+
+    assert eng.watches_pane("%5") is True
+    assert eng.watches_pane("%1") is False
+    assert eng.feed("%1", b"DONE\n") == []
+    assert len(eng.feed("%5", b"DONE\n")) == 1
+
+
+def test_engine_flushes_over_long_lines() -> None:
+    eng, _ = _engine({"id": "x", "pattern": "needle"}, max_line_bytes=12)
+
+    assert eng.feed("%1", b"0123456789") == []
+    assert [m.rule_id for m in eng.feed("%1", b"needle")] == ["x"]
+
+
+@pytest.mark.parametrize(
+    ("pattern", "line"),
+    [
+        (r"\x41BCD", b"ABCD\n"),
+        (r"ab\x20cd", b"xx ab cd\n"),
+        (r"\u00e9t\u00e9 done", "été done\n".encode()),
+        (r"\N{BULLET} item", "• item\n".encode()),
+        (r"\101BCD", b"ABCD\n"),
+    ],
+)
+def test_engine_escapes_are_not_taken_as_literal_text(pattern: str, line: bytes) -> None:
+    eng, _ = _engine({"id": "x", "pattern": pattern})
+
+    assert [m.rule_id for m in eng.feed("%1", line)] == ["x"]
+
+
+def test_engine_matches_with_str_regex_semantics() -> None:
+    eng, _ = _engine(
+        {"id": "word", "pattern": r"^\w+ \d+$", "cooldown_s": 0},
+        {"id": "icase", "pattern": "(?i)ÉCHEC", "cooldown_s": 0},
+        {"id": "kelvin", "pattern": "(?i)kelvin", "cooldown_s": 0},
+    )
+
+    assert [m.rule_id for m in eng.feed("%1", "naïve ٣\n".encode())] == ["word"]
+    assert [m.rule_id for m in eng.feed("%1", "build échec\n".encode())] == ["icase"]
+    assert [m.rule_id for m in eng.feed("%1", "\u212aelvin\n".encode())] == ["kelvin"]
+    assert [m.line for m in eng.feed("%1", b"KELVIN \xff\n")] == ["KELVIN \ufffd"]
+
+
+def test_engine_keeps_backreferences_of_literal_less_rules() -> None:
+    eng, _ = _engine(
+        {"id": "x", "pattern": r"(x)\1", "cooldown_s": 0},
+        {"id": "y", "pattern": r"(y)\1", "cooldown_s": 0},
+        {"id": "d", "pattern": r"^\d+$", "cooldown_s": 0},
+        {"id": "w", "pattern": r"^\w$", "cooldown_s": 0},
+    )
+
+    assert [m.rule_id for m in eng.feed("%1", b"yy\n")] == ["y"]
+    assert [m.rule_id for m in eng.feed("%1", b"xx\n")] == ["x"]
+    assert [m.rule_id for m in eng.feed("%1", b"42\n")] == ["d"]
+    assert eng.feed("%1", b"xy\n") == []
+
+
+def test_engine_discard_forgets_cooldowns() -> None:
+    eng, _ = _engine({"id": "done", "pattern": "DONE", "cooldown_s": 10})
+
+    assert len(eng.feed("%1", b"DONE\n")) == 1
+    eng.discard("%1")
+    assert eng._next_allowed == {}
+    assert len(eng.feed("%1", b"DONE\n")) == 1